@@ -0,0 +1,59 @@
+"""
+Benchmark codec pipelines on a sample volume and report the best one.
+
+usage: python benchmarks/bench_codecs.py [input] [--chunk CHUNK]
+                                         [--samples SAMPLES]
+                                         [--codecs CODECS [CODECS ...]]
+"""
+import argparse
+import os.path as op
+
+import nibabel as nib
+import numpy as np
+
+from niizarr._codecs import _candidate_codecs, _measure_codecs, _sample_chunks
+
+HERE = op.dirname(op.abspath(__file__))
+DEFAULT_INPUT = op.join(HERE, "..", "tests", "data", "example4d.nii.gz")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_codecs', description='Benchmark codec pipelines.')
+    parser.add_argument('input', nargs='?', default=DEFAULT_INPUT,
+                        help='Input nifti file.')
+    parser.add_argument('--chunk', type=int, default=64,
+                        help='Spatial chunk size.')
+    parser.add_argument('--samples', type=int, default=16,
+                        help='Number of chunks to sample.')
+    parser.add_argument('--codecs', nargs='+', default=None,
+                        help='Candidate pipelines. Default: all lossless '
+                             'candidates for the data type.')
+    args = parser.parse_args(args)
+
+    img = nib.load(args.input)
+    data = np.asarray(img.dataobj.get_unscaled())
+    # nifti order (x, y, z, ...) -> zarr order (..., z, y, x)
+    data = data.transpose(list(range(data.ndim))[::-1])
+    chunks = (1,) * (data.ndim - 3) + (args.chunk,) * 3
+    samples = _sample_chunks(data, chunks, args.samples)
+    specs = args.codecs or _candidate_codecs(data.dtype)
+
+    results = _measure_codecs(samples, specs)
+    nbytes = results[0]["nbytes"]
+    print(f"{len(samples)} chunks, {nbytes / 2**20:.2f} MiB, {data.dtype}")
+    print(f"{'codecs':<50} {'ratio':>7} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for result in sorted(results, key=lambda r: -r["ratio"]):
+        print(f"{result['codecs']:<50} "
+              f"{result['ratio']:7.2f} "
+              f"{nbytes / result['encode_time'] / 1e6:9.1f} "
+              f"{nbytes / result['decode_time'] / 1e6:9.1f}")
+
+    smallest = max(results, key=lambda r: r["ratio"])
+    fastest = min(results, key=lambda r: r["decode_time"])
+    print(f"smallest:       {smallest['codecs']}")
+    print(f"fastest decode: {fastest['codecs']}")
+
+
+if __name__ == '__main__':
+    main()
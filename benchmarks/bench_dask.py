@@ -0,0 +1,96 @@
+"""
+Benchmark the dask graph of `zarr2nii` on a volume with many chunks:
+the single-layer graph built in nifti order, versus the previous
+pipeline (`from_zarr`, new axes, transpose and integer slicing).
+
+For each version, report the time to build the image, the number of
+graph layers and tasks, the time to optimize the graph of a small
+region, and the time to compute that region and the whole volume.
+
+usage: python benchmarks/bench_dask.py [--size SIZE] [--chunk CHUNK]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import dask
+import dask.array
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, zarr2nii
+from niizarr._compat import _open_zarr
+from niizarr._zarr2nii import _open_level
+
+
+def layered(path):
+    """Image built with the previous multi-layer graph."""
+    array, header, NiftiImage, axes = _open_level(_open_zarr(path, mode="r"))
+    array = dask.array.from_zarr(array)
+    nifti_ndim = len(header.get_data_shape())
+    array = array[(Ellipsis,) + (None,) * max(0, 5 - array.ndim)]
+    perm, i = [], len(axes)
+    for name in 'xyztc':
+        if name in axes:
+            perm += [axes.index(name)]
+        else:
+            perm += [i]
+            i += 1
+    array = array.transpose(perm)
+    array = array[(slice(None),) * nifti_ndim
+                  + (0,) * (array.ndim - nifti_ndim)]
+    return NiftiImage(array, None, header)
+
+
+def timeit(fn, repeat):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - tic)
+    return best, out
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_dask', description='Benchmark the dask graph of zarr2nii.')
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size of the (cubic) volume.')
+    parser.add_argument('--chunk', type=int, default=8,
+                        help='Chunk size.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of repeats (best time is reported).')
+    args = parser.parse_args(args)
+
+    shape = [args.size] * 3
+    img = Nifti1Image(np.random.rand(*shape).astype(np.float32), np.eye(4))
+    nchunks = (args.size // args.chunk) ** 3
+    print(f"volume: {shape}, chunk: {args.chunk}, chunks: {nchunks}")
+    print(f"{'graph':>8} {'build (s)':>10} {'layers':>7} {'tasks':>7} "
+          f"{'optimize (s)':>13} {'region (s)':>11} {'volume (s)':>11}")
+    region = tuple(slice(n // 2 - 10, n // 2 + 10) for n in shape)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.nii.zarr")
+        nii2zarr(img, path, chunk=args.chunk, nb_levels=1)
+        versions = {
+            "layered": lambda: layered(path),
+            "single": lambda: zarr2nii(path),
+        }
+        with dask.config.set(scheduler="synchronous"):
+            for name, build in versions.items():
+                t_build, out = timeit(build, args.repeat)
+                array = out.dataobj
+                graph = array.__dask_graph__()
+                t_opt, _ = timeit(
+                    lambda: dask.optimize(array[region]), args.repeat)
+                t_region, _ = timeit(
+                    lambda: array[region].compute(), args.repeat)
+                t_volume, _ = timeit(array.compute, args.repeat)
+                print(f"{name:>8} {t_build:10.3f} {len(graph.layers):7d} "
+                      f"{len(graph):7d} {t_opt:13.3f} {t_region:11.3f} "
+                      f"{t_volume:11.3f}")
+
+
+if __name__ == '__main__':
+    main()
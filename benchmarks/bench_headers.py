@@ -0,0 +1,66 @@
+"""
+Benchmark bulk header parsing against a per-file loop.
+
+usage: python benchmarks/bench_headers.py [--count COUNT] [--repeat REPEAT]
+"""
+import argparse
+import time
+
+import numpy as np
+from nibabel import Nifti1Header, Nifti2Header
+
+from niizarr import bin2nii, nii2json, nii2json_many
+
+
+def make_buffers(count, seed=0):
+    """Random nifti-1/nifti-2 headers, in both byte orders."""
+    rng = np.random.default_rng(seed)
+    buffers = []
+    for i in range(count):
+        klass = (Nifti1Header, Nifti2Header)[i % 2]
+        header = klass(endianness="<>"[(i // 2) % 2])
+        header.set_data_shape(tuple(rng.integers(1, 512, 3)) + (i % 7 + 1,))
+        header.set_data_dtype((np.uint8, np.int16, np.float32)[i % 3])
+        header.set_zooms(tuple(rng.random(4) + 0.5))
+        header.set_xyzt_units("mm", "sec")
+        header["descrip"] = f"subject {i:06d}".encode()
+        header.set_sform(np.diag(list(rng.random(3)) + [1]), code=2)
+        buffers.append(header.binaryblock)
+    return buffers
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_headers', description='Benchmark bulk header parsing.')
+    parser.add_argument('--count', type=int, default=100000,
+                        help='Number of headers.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of repetitions (the fastest is kept).')
+    args = parser.parse_args(args)
+
+    buffers = make_buffers(args.count)
+    print(f"{args.count} headers")
+
+    loop = bulk = columnar = float("inf")
+    for _ in range(args.repeat):
+        tic = time.perf_counter()
+        expected = [nii2json(bin2nii(buffer)) for buffer in buffers]
+        loop = min(loop, time.perf_counter() - tic)
+        tic = time.perf_counter()
+        result = nii2json_many(buffers)
+        bulk = min(bulk, time.perf_counter() - tic)
+        tic = time.perf_counter()
+        nii2json_many(buffers, columnar=True)
+        columnar = min(columnar, time.perf_counter() - tic)
+    assert result == expected
+
+    print(f"{'method':<24} {'time (s)':>9} {'headers/s':>11} {'speedup':>8}")
+    for name, duration in (("per-file loop", loop),
+                           ("nii2json_many (dicts)", bulk),
+                           ("nii2json_many (columns)", columnar)):
+        print(f"{name:<24} {duration:9.3f} {args.count / duration:11.0f} "
+              f"{loop / duration:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
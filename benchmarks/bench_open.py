@@ -0,0 +1,87 @@
+"""
+Benchmark the time to open a nifti-zarr on a high-latency store, with
+and without consolidated metadata.
+
+Every metadata request to the store is delayed by `--latency` seconds,
+which simulates a remote (e.g., object storage) backend.
+
+usage: python benchmarks/bench_open.py [--latency LATENCY] [--repeat REPEAT]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr
+from niizarr._compat import _open_zarr, pyzarr_version
+
+METADATA_KEYS = ("zarr.json", ".zarray", ".zattrs", ".zgroup", ".zmetadata")
+
+
+def latency_store(path, latency):
+    """Read-only local store whose metadata requests are delayed."""
+    from zarr.storage import LocalStore, WrapperStore
+
+    class LatencyStore(WrapperStore):
+        requests = 0
+
+        async def _delay(self, key):
+            if key.endswith(METADATA_KEYS):
+                LatencyStore.requests += 1
+                await asyncio.sleep(latency)
+
+        async def get(self, key, prototype, byte_range=None):
+            await self._delay(key)
+            return await self._store.get(key, prototype, byte_range)
+
+        async def exists(self, key):
+            await self._delay(key)
+            return await self._store.exists(key)
+
+    return LatencyStore(LocalStore(path, read_only=True))
+
+
+def open_levels(store):
+    """Open the group, its header and all pyramid levels."""
+    omz = _open_zarr(store, mode="r")
+    omz["nifti"][:]
+    for dataset in omz.attrs["ome"]["multiscales"][0]["datasets"]:
+        omz[dataset["path"]].shape
+    return omz
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_open', description='Benchmark opening a nifti-zarr.')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Latency of each metadata request (s).')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of repetitions (the fastest is kept).')
+    args = parser.parse_args(args)
+    if pyzarr_version < 3:
+        raise SystemExit("This benchmark requires zarr-python >= 3")
+
+    img = Nifti1Image(np.zeros([256, 256, 256], dtype=np.uint8), np.eye(4))
+    print(f"latency: {args.latency * 1000:.0f} ms per metadata request")
+    print(f"{'metadata':<14} {'requests':>9} {'time (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.nii.zarr")
+        for consolidated in (False, True):
+            nii2zarr(img, path, chunk=64, consolidated=consolidated)
+            duration = float("inf")
+            for _ in range(args.repeat):
+                store = latency_store(path, args.latency)
+                type(store).requests = 0
+                tic = time.perf_counter()
+                open_levels(store)
+                duration = min(duration, time.perf_counter() - tic)
+            name = "consolidated" if consolidated else "per-array"
+            print(f"{name:<14} {type(store).requests:>9} {duration:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark opening many remote nifti-zarrs from a thread pool, with the
+shared filesystem pool of `_open_zarr` and with a store per open.
+
+The remote server is simulated by an in-memory fsspec filesystem that
+behaves like an HTTP client with a keep-alive connection pool: every
+request pays `--latency`, and every new connection pays `--connect`
+(TCP and TLS handshakes).
+
+usage: python benchmarks/bench_remote.py [--opens OPENS] [--threads THREADS]
+                                         [--latency LATENCY] [--connect CONNECT]
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fsspec
+import numpy as np
+from fsspec.asyn import AsyncFileSystem
+from nibabel import Nifti1Image
+
+from niizarr import clear_remote_pool, nii2zarr, zarr2nii
+from niizarr._compat import pyzarr_version
+
+URL = "slow://bucket/image.nii.zarr"
+
+
+class SlowFileSystem(AsyncFileSystem):
+    """In-memory object store with simulated network costs."""
+
+    protocol = "slow"
+    objects = {}
+    connections = 0
+
+    def __init__(self, latency=0.0, connect=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency, self.connect = latency, connect
+        self._idle = 0
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        if path.startswith("slow://"):
+            path = path[len("slow://"):]
+        return path.rstrip("/")
+
+    async def _request(self):
+        # keep-alive connection pool: reuse an idle connection, or pay
+        # the connection setup (TCP + TLS handshakes)
+        if self._idle:
+            self._idle -= 1
+        else:
+            type(self).connections += 1
+            await asyncio.sleep(self.connect)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._idle += 1
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        await self._request()
+        path = self._strip_protocol(path)
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        return self.objects[path][start:end]
+
+    async def _pipe_file(self, path, value, **kwargs):
+        await self._request()
+        self.objects[self._strip_protocol(path)] = bytes(value)
+
+    async def _exists(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        return path in self.objects or any(
+            k.startswith(path + "/") for k in self.objects)
+
+    async def _info(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        if path in self.objects:
+            return {"name": path, "size": len(self.objects[path]), "type": "file"}
+        if await self._exists(path):
+            return {"name": path, "size": 0, "type": "directory"}
+        raise FileNotFoundError(path)
+
+    async def _ls(self, path, detail=True, **kwargs):
+        path = self._strip_protocol(path)
+        names = set()
+        for key in self.objects:
+            if key.startswith(path + "/"):
+                names.add(path + "/" + key[len(path) + 1:].split("/")[0])
+        infos = [await self._info(n) for n in sorted(names)]
+        return infos if detail else [i["name"] for i in infos]
+
+    async def _rm_file(self, path, **kwargs):
+        self.objects.pop(self._strip_protocol(path), None)
+
+    async def _rm(self, path, recursive=False, **kwargs):
+        paths = path if isinstance(path, list) else [path]
+        for p in paths:
+            p = self._strip_protocol(p)
+            for key in list(self.objects):
+                if key == p or (recursive and key.startswith(p + "/")):
+                    del self.objects[key]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_remote', description='Benchmark opening remote nifti-zarrs.')
+    parser.add_argument('--opens', type=int, default=64,
+                        help='Number of nifti-zarrs opened (and read).')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Number of threads opening nifti-zarrs.')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='Latency of each request (s).')
+    parser.add_argument('--connect', type=float, default=0.1,
+                        help='Cost of opening a connection (s).')
+    args = parser.parse_args(args)
+    if pyzarr_version < 3:
+        raise SystemExit("This benchmark requires zarr-python >= 3")
+    from zarr.storage import FsspecStore
+
+    fsspec.register_implementation("slow", SlowFileSystem, clobber=True)
+    nii2zarr(Nifti1Image(np.zeros([64, 64, 64], dtype=np.float32), np.eye(4)),
+             URL, chunk=32)
+    options = {"latency": args.latency, "connect": args.connect}
+
+    def per_open(_):
+        store = FsspecStore.from_url(URL, storage_options=options,
+                                     read_only=True)
+        return zarr2nii(store).get_fdata()
+
+    def pooled(_):
+        return zarr2nii(URL, **options).get_fdata()
+
+    print(f"{args.opens} opens from {args.threads} threads, "
+          f"latency: {args.latency * 1000:.0f} ms, "
+          f"connect: {args.connect * 1000:.0f} ms")
+    print(f"{'filesystem':<12} {'connections':>11} {'time (s)':>9}")
+    for name, fn in (("per-open", per_open), ("shared pool", pooled)):
+        clear_remote_pool()
+        SlowFileSystem.connections = 0
+        tic = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(fn, range(args.opens)))
+        duration = time.perf_counter() - tic
+        print(f"{name:<12} {SlowFileSystem.connections:>11} {duration:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark resampling a nifti-zarr onto a coarser, rotated grid from a
+high-latency store, with `resample` and by loading the finest level
+with `zarr2nii` and resampling it in memory.
+
+Every request to the store is delayed by `--latency` seconds, which
+simulates a remote (e.g., object storage) backend.
+
+usage: python benchmarks/bench_resample.py [--latency LATENCY] [--size SIZE]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from nibabel import Nifti1Image
+from scipy import ndimage
+
+from niizarr import nii2zarr, resample, zarr2nii
+from niizarr._compat import pyzarr_version
+
+from bench_slice import latency_store
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_resample', description='Benchmark resampling.')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Latency of each request (s).')
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size of the (cubic) volume.')
+    parser.add_argument('--chunk', type=int, default=64,
+                        help='Chunk size.')
+    parser.add_argument('--voxel', type=float, default=2.0,
+                        help='Voxel size of the target grid (source: 1).')
+    args = parser.parse_args(args)
+    if pyzarr_version < 3:
+        raise SystemExit("This benchmark requires zarr-python >= 3")
+
+    shape = [args.size] * 3
+    img = Nifti1Image(np.random.rand(*shape).astype(np.float32), np.eye(4))
+    theta = np.pi / 12
+    rot = np.array([[np.cos(theta), -np.sin(theta), 0, 0],
+                    [np.sin(theta), np.cos(theta), 0, 0],
+                    [0, 0, 1, 0],
+                    [0, 0, 0, 1]])
+    affine = rot @ np.diag([args.voxel] * 3 + [1])
+    out_shape = [int(args.size / args.voxel)] * 3
+    print(f"volume: {shape}, chunk: {args.chunk}, target: {out_shape} "
+          f"at {args.voxel} mm, latency: {args.latency * 1000:.0f} ms "
+          f"per request")
+    print(f"{'method':<22} {'time (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.nii.zarr")
+        nii2zarr(img, path, chunk=args.chunk)
+
+        tic = time.perf_counter()
+        nii = zarr2nii(latency_store(path, args.latency))
+        data = np.asarray(nii.dataobj)
+        ndimage.affine_transform(data, affine, output_shape=out_shape,
+                                 order=1)
+        print(f"{'zarr2nii + in memory':<22} "
+              f"{time.perf_counter() - tic:9.3f}")
+
+        for level in (0, None):
+            tic = time.perf_counter()
+            resample(latency_store(path, args.latency), affine, out_shape,
+                     level=level)
+            name = "resample (level 0)" if level == 0 else "resample"
+            print(f"{name:<22} {time.perf_counter() - tic:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark reading 2D planes of a nifti-zarr from a high-latency store,
+with `SliceReader` and with a dask-backed image from `zarr2nii`.
+
+Every request to the store is delayed by `--latency` seconds, which
+simulates a remote (e.g., object storage) backend.
+
+usage: python benchmarks/bench_slice.py [--latency LATENCY] [--size SIZE]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import SliceReader, nii2zarr, zarr2nii
+from niizarr._compat import pyzarr_version
+
+
+def latency_store(path, latency):
+    """Read-only local store whose requests are delayed."""
+    from zarr.storage import LocalStore, WrapperStore
+
+    class LatencyStore(WrapperStore):
+        async def get(self, key, prototype, byte_range=None):
+            await asyncio.sleep(latency)
+            return await self._store.get(key, prototype, byte_range)
+
+    return LatencyStore(LocalStore(path, read_only=True))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_slice', description='Benchmark reading planes.')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Latency of each request (s).')
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size of the (cubic) volume.')
+    parser.add_argument('--chunk', type=int, default=64,
+                        help='Chunk size.')
+    parser.add_argument('--planes', type=int, default=8,
+                        help='Number of consecutive planes read.')
+    args = parser.parse_args(args)
+    if pyzarr_version < 3:
+        raise SystemExit("This benchmark requires zarr-python >= 3")
+
+    shape = [args.size] * 3
+    img = Nifti1Image(np.random.rand(*shape).astype(np.float32), np.eye(4))
+    print(f"volume: {shape}, chunk: {args.chunk}, "
+          f"latency: {args.latency * 1000:.0f} ms per request")
+    print(f"{'reader':<12} {'plane':<9} {'open (s)':>9} {'first (s)':>10} "
+          f"{'next (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.nii.zarr")
+        nii2zarr(img, path, chunk=args.chunk)
+        center = args.size // 2
+        for axis in ("x", "y", "z"):
+            slicer = {"x": lambda k: (k, slice(None), slice(None)),
+                      "y": lambda k: (slice(None), k, slice(None)),
+                      "z": lambda k: (slice(None), slice(None), k)}[axis]
+
+            tic = time.perf_counter()
+            nii = zarr2nii(latency_store(path, args.latency))
+            opened = time.perf_counter() - tic
+            times = []
+            for k in range(center, center + args.planes):
+                tic = time.perf_counter()
+                np.asarray(nii.dataobj[slicer(k)])
+                times.append(time.perf_counter() - tic)
+            print(f"{'zarr2nii':<12} {axis:<9} {opened:9.3f} "
+                  f"{times[0]:10.3f} {np.mean(times[1:]):9.3f}")
+
+            tic = time.perf_counter()
+            reader = SliceReader(latency_store(path, args.latency))
+            opened = time.perf_counter() - tic
+            times = []
+            for k in range(center, center + args.planes):
+                tic = time.perf_counter()
+                reader.plane(k, axis)
+                times.append(time.perf_counter() - tic)
+            print(f"{'SliceReader':<12} {axis:<9} {opened:9.3f} "
+                  f"{times[0]:10.3f} {np.mean(times[1:]):9.3f}")
+
+
+if __name__ == '__main__':
+    main()
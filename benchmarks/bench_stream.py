@@ -0,0 +1,65 @@
+"""
+Benchmark writing a nifti-zarr to a nifti file from a high-latency
+store, with and without read-ahead.
+
+Every request to the store is delayed by `--latency` seconds, which
+simulates a remote (e.g., object storage) backend.
+
+usage: python benchmarks/bench_stream.py [--latency LATENCY] [--size SIZE]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, zarr2nii
+from niizarr._compat import pyzarr_version
+
+
+def latency_store(path, latency):
+    """Read-only local store whose requests are delayed."""
+    from zarr.storage import LocalStore, WrapperStore
+
+    class LatencyStore(WrapperStore):
+        async def get(self, key, prototype, byte_range=None):
+            await asyncio.sleep(latency)
+            return await self._store.get(key, prototype, byte_range)
+
+    return LatencyStore(LocalStore(path, read_only=True))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        'bench_stream', description='Benchmark streaming a nifti-zarr.')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Latency of each request (s).')
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size of the (cubic) volume.')
+    parser.add_argument('--chunk', type=int, default=32,
+                        help='Chunk size.')
+    args = parser.parse_args(args)
+    if pyzarr_version < 3:
+        raise SystemExit("This benchmark requires zarr-python >= 3")
+
+    shape = [args.size] * 3
+    img = Nifti1Image(np.random.rand(*shape).astype(np.float32), np.eye(4))
+    print(f"volume: {shape}, chunk: {args.chunk}, "
+          f"latency: {args.latency * 1000:.0f} ms per request")
+    print(f"{'prefetch':>8} {'time (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "image.nii.zarr")
+        out = os.path.join(tmp, "image.nii")
+        nii2zarr(img, path, chunk=args.chunk, nb_levels=1)
+        for prefetch in (0, 1, 2, 4, 8):
+            tic = time.perf_counter()
+            zarr2nii(latency_store(path, args.latency), out,
+                     prefetch=prefetch)
+            print(f"{prefetch:>8} {time.perf_counter() - tic:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,17 @@ except (ImportError, ModuleNotFoundError):
     # Unset __version__ rather than failing.
     __version__ = None
 
-from ._header import bin2nii  # noqa: F401
-from ._nii2zarr import nii2zarr, nii2json, write_nifti_header, write_ome_metadata  # noqa: F401
-from ._zarr2nii import zarr2nii, default_nifti_header  # noqa: F401
+from ._header import bin2nii, bin2nii_many  # noqa: F401
+from ._nii2zarr import nii2zarr, nii2json, nii2json_many, write_nifti_header, write_ome_metadata, append  # noqa: F401
+from ._zarr2nii import zarr2nii, default_nifti_header, iter_slabs  # noqa: F401
+from ._view import open_niizarr, NiftiZarrArray  # noqa: F401
+from ._pyramid import build_pyramid, update_region  # noqa: F401
+from ._rechunk import rechunk  # noqa: F401
+from ._migrate import migrate  # noqa: F401
+from ._read_header import read_header, read_headers  # noqa: F401
+from ._remote import configure_remote, clear_remote_pool  # noqa: F401
+from ._cache import ChunkCache  # noqa: F401
+from ._slice import SliceReader  # noqa: F401
+from ._stats import read_stats  # noqa: F401
+from ._labels import read_label, read_label_volumes  # noqa: F401
+from ._resample import resample  # noqa: F401
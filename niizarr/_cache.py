@@ -0,0 +1,367 @@
+"""Local (memory or disk) cache of the chunks of remote nifti-zarrs."""
+import hashlib
+import json
+import os
+import os.path as op
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
+
+from ._compat import pyzarr_version
+
+# Metadata documents are never cached, so that readers see updates
+METADATA_KEYS = ("zarr.json", ".zarray", ".zattrs", ".zgroup", ".zmetadata")
+
+# Default size of the cache (bytes)
+DEFAULT_CACHE_SIZE = 512 * 2**20
+
+# Caches shared by all opens (see `_get_cache`)
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class ChunkCache:
+    """
+    Least-recently-used cache of encoded chunks, in memory or on disk.
+
+    Entries are keyed by the URL of the chunk (and byte range, for
+    partial reads of shards). Each entry keeps the validator (ETag or
+    modification time) of the object it was read from. When `validate`
+    is True, the validator is checked against the store before a cached
+    chunk is returned, so that modified chunks are downloaded again.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum size of the cache, in bytes. Least recently used
+        entries are evicted first.
+    directory : str, optional
+        Directory of an on-disk cache, which persists across processes.
+        If None, the cache lives in memory.
+    validate : bool, optional
+        Check the ETag/modification time of cached chunks before
+        returning them. This costs a metadata (HEAD) request per read,
+        but no download. Disable it for immutable datasets.
+    """
+
+    def __init__(
+            self,
+            max_bytes: int = DEFAULT_CACHE_SIZE,
+            directory: Optional[str] = None,
+            validate: bool = True,
+    ) -> None:
+        self.max_bytes = int(max_bytes)
+        if directory is not None:
+            directory = op.expanduser(os.fspath(directory))
+        self.directory = directory
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        # key -> (size, validator, data or None if on disk)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return op.join(self.directory, name + ".chunk")
+
+    def _load_index(self) -> None:
+        """Rebuild the index of an on-disk cache, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".chunk"):
+                continue
+            path = op.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    meta = json.loads(f.readline())
+                entries.append((op.getmtime(path), meta))
+            except (OSError, ValueError):
+                continue
+        for _, meta in sorted(entries, key=lambda x: x[0]):
+            self._entries[meta["key"]] = (meta["size"], meta["validator"],
+                                          None)
+            self.nbytes += meta["size"]
+        self._evict()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Cached bytes and validator of a key, or None.
+
+        Hits and misses are counted by the reader (see `count`), once
+        the validator of the entry has been checked.
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            size, validator, data = entry
+        if data is None:
+            try:
+                path = self._path(key)
+                with open(path, "rb") as f:
+                    f.readline()
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                self.pop(key)
+                return None
+        return data, validator
+
+    def count(self, hit: bool) -> None:
+        """Count a read served from the cache (hit) or from the store."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key: str, data: bytes,
+            validator: Optional[str] = None) -> None:
+        """Insert (or replace) an entry, and evict old entries."""
+        data = bytes(data)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        if self.directory is not None:
+            meta = {"key": key, "size": size, "validator": validator}
+            path = self._path(key)
+            # concurrent writers of the same key use distinct files
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode() + b"\n")
+                f.write(data)
+            os.replace(tmp, path)
+            data = None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[0]
+            self._entries[key] = (size, validator, data)
+            self.nbytes += size
+            self._evict()
+
+    def pop(self, key: str) -> None:
+        """Remove an entry (if it exists)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self.nbytes -= entry[0]
+            ondisk = entry[2] is None
+        if ondisk:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for key in list(self._entries):
+            self.pop(key)
+
+    def _evict(self) -> None:
+        # must be called with the lock held
+        while self.nbytes > self.max_bytes and self._entries:
+            key, (size, _, data) = self._entries.popitem(last=False)
+            self.nbytes -= size
+            if data is None:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+
+
+def _get_cache(cache: Union[bool, str, int, ChunkCache]) -> ChunkCache:
+    """
+    Resolve the `cache` argument of readers.
+
+    True or "memory" selects a shared in-memory cache, an integer a
+    shared in-memory cache of that size, and any other string a shared
+    on-disk cache in that directory.
+    """
+    if isinstance(cache, ChunkCache):
+        return cache
+    if cache is True or cache == "memory":
+        key = ("memory", DEFAULT_CACHE_SIZE)
+    elif isinstance(cache, int) and not isinstance(cache, bool):
+        key = ("memory", cache)
+    elif isinstance(cache, (str, os.PathLike)):
+        key = ("disk", op.abspath(op.expanduser(os.fspath(cache))))
+    else:
+        raise TypeError(f"Invalid cache: {cache!r}")
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            if key[0] == "memory":
+                _CACHES[key] = ChunkCache(key[1])
+            else:
+                _CACHES[key] = ChunkCache(directory=key[1])
+        return _CACHES[key]
+
+
+def _validator(info: dict) -> Optional[str]:
+    """ETag or modification time of an object, from its fsspec info."""
+    for name in ("ETag", "etag", "mtime", "LastModified", "last_modified",
+                 "created"):
+        if info.get(name, None) is not None:
+            return str(info[name])
+    return None
+
+
+def _is_metadata(key: str) -> bool:
+    return key.endswith(METADATA_KEYS)
+
+
+def _unwrap(store: Any) -> Any:
+    """Innermost store of a chain of wrapper stores."""
+    while hasattr(store, "_store"):
+        store = store._store
+    return store
+
+
+if pyzarr_version == 3:
+    from zarr.storage import WrapperStore
+
+    class _CachedStore(WrapperStore):
+        """Store that reads chunks through a `ChunkCache`."""
+
+        def __init__(self, store: Any, cache: ChunkCache) -> None:
+            super().__init__(store)
+            self.cache = cache
+            inner = _unwrap(store)
+            self._fs = getattr(inner, "fs", None)
+            if self._fs is not None:
+                protocol = self._fs.protocol
+                if not isinstance(protocol, str):
+                    protocol = protocol[0]
+                self._prefix = f"{protocol}://{inner.path.rstrip('/')}/"
+            else:
+                root = getattr(inner, "root", None)
+                root = id(inner) if root is None else root
+                self._prefix = f"{type(inner).__name__}:{root}/"
+
+        def _with_store(self, store: Any) -> "_CachedStore":
+            return type(self)(store, self.cache)
+
+        async def _validator(self, key: str) -> Optional[str]:
+            if self._fs is None:
+                return None
+            path = self._prefix.split("://", 1)[-1] + key
+            try:
+                return _validator(await self._fs._info(path))
+            except (OSError, NotImplementedError):
+                return None
+
+        async def get(self, key, prototype, byte_range=None):
+            if _is_metadata(key):
+                return await self._store.get(key, prototype, byte_range)
+            entry_key = self._prefix + key
+            if byte_range is not None:
+                entry_key += f"#{byte_range!r}"
+            validate = self.cache.validate and self._fs is not None
+            entry = self.cache.get(entry_key)
+            validator = None
+            if validate:
+                validator = await self._validator(key)
+            if entry is not None:
+                data, cached_validator = entry
+                if not validate or cached_validator == validator:
+                    self.cache.count(hit=True)
+                    return prototype.buffer.from_bytes(data)
+                self.cache.pop(entry_key)
+            self.cache.count(hit=False)
+            value = await self._store.get(key, prototype, byte_range)
+            if value is not None:
+                self.cache.put(entry_key, value.to_bytes(), validator)
+            return value
+
+        async def set(self, key, value):
+            self._invalidate(key)
+            return await self._store.set(key, value)
+
+        async def delete(self, key):
+            self._invalidate(key)
+            return await self._store.delete(key)
+
+        def _invalidate(self, key):
+            entry_key = self._prefix + key
+            for cached_key in list(self.cache._entries):
+                if cached_key == entry_key or \
+                        cached_key.startswith(entry_key + "#"):
+                    self.cache.pop(cached_key)
+
+else:
+    from collections.abc import MutableMapping
+
+    class _CachedStore(MutableMapping):
+        """Store that reads chunks through a `ChunkCache`."""
+
+        def __init__(self, store: Any, cache: ChunkCache) -> None:
+            self._store = store
+            self.cache = cache
+            self._fs = getattr(store, "fs", None)
+            root = getattr(store, "path", None)
+            root = id(store) if root is None else root
+            self._prefix = f"{type(store).__name__}:{root}/"
+
+        def _validator(self, key):
+            if self._fs is None:
+                return None
+            normalize = getattr(self._store, "_normalize_key", str)
+            path = self._store.path.rstrip("/") + "/" + normalize(key)
+            try:
+                return _validator(self._fs.info(path))
+            except (OSError, NotImplementedError):
+                return None
+
+        def __getitem__(self, key):
+            if _is_metadata(key):
+                return self._store[key]
+            entry_key = self._prefix + key
+            validate = self.cache.validate and self._fs is not None
+            entry = self.cache.get(entry_key)
+            validator = self._validator(key) if validate else None
+            if entry is not None:
+                data, cached_validator = entry
+                if not validate or cached_validator == validator:
+                    self.cache.count(hit=True)
+                    return data
+                self.cache.pop(entry_key)
+            self.cache.count(hit=False)
+            value = self._store[key]
+            self.cache.put(entry_key, value, validator)
+            return value
+
+        def __setitem__(self, key, value):
+            self.cache.pop(self._prefix + key)
+            self._store[key] = value
+
+        def __delitem__(self, key):
+            self.cache.pop(self._prefix + key)
+            del self._store[key]
+
+        def __contains__(self, key):
+            return key in self._store
+
+        def __iter__(self):
+            return iter(self._store)
+
+        def __len__(self):
+            return len(self._store)
+
+        def listdir(self, path=None):
+            return self._store.listdir(path)
+
+
+def _cache_store(store: Any, cache: Union[bool, str, int, ChunkCache]) -> Any:
+    """Wrap a zarr store so that its chunks are read through a cache."""
+    return _CachedStore(store, _get_cache(cache))
@@ -0,0 +1,372 @@
+"""Codec pipelines (filters + compressors) for Zarr v2 and v3 arrays."""
+import time
+from typing import Any, Dict, List, Literal, Optional, Sequence, Union
+
+import numpy as np
+
+# Stages that transform the array values (array -> array in Zarr v3)
+ARRAY_FILTERS = ("delta", "bitround")
+# Stages that transform the encoded bytes (bytes -> bytes in Zarr v3)
+BYTES_FILTERS = ("shuffle",)
+COMPRESSORS = ("blosc", "zstd", "zlib", "gzip", "lz4")
+
+BLOSC_SHUFFLE = {"noshuffle": 0, "shuffle": 1, "bitshuffle": 2}
+
+CodecSpec = Union[str, dict, Sequence[Union[str, dict]]]
+
+
+def _parse_value(value: str) -> Union[int, float, str]:
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_codecs(spec: CodecSpec) -> List[dict]:
+    """
+    Parse a codec pipeline specification.
+
+    Parameters
+    ----------
+    spec : str | dict | list[str | dict]
+        Codec pipeline. Stages are applied in order, from the array
+        values to the stored bytes. In string form, stages are separated
+        by "+" and options are given after a ":" as comma-separated
+        "key=value" pairs, e.g. "delta+shuffle+zstd:level=5" or
+        "blosc:cname=zstd,clevel=5,shuffle=bitshuffle".
+        In dictionary form, each stage is `{"name": ..., **options}`.
+
+    Returns
+    -------
+    list[dict]
+        One `{"name": ..., **options}` dictionary per stage.
+    """
+    if isinstance(spec, (str, dict)):
+        spec = [spec]
+    stages = []
+    for stage in spec:
+        if isinstance(stage, dict):
+            stage = dict(stage)
+            stage["name"] = stage["name"].lower()
+            stages.append(stage)
+            continue
+        for substage in stage.split("+"):
+            name, _, options = substage.strip().partition(":")
+            stage = {"name": name.strip().lower()}
+            for option in filter(None, options.split(",")):
+                key, _, value = option.partition("=")
+                stage[key.strip()] = _parse_value(value.strip())
+            stages.append(stage)
+    for stage in stages:
+        if stage["name"] not in ARRAY_FILTERS + BYTES_FILTERS + COMPRESSORS:
+            raise ValueError('Unknown codec', stage["name"])
+    return stages
+
+
+def _format_codecs(stages: List[dict]) -> str:
+    """Format a parsed codec pipeline back into its string form."""
+    formatted = []
+    for stage in stages:
+        options = ",".join(
+            f"{key}={value}" for key, value in stage.items() if key != "name"
+        )
+        formatted.append(stage["name"] + (":" + options if options else ""))
+    return "+".join(formatted)
+
+
+def _check_stage(stage: dict, dtype: np.dtype) -> None:
+    name = stage["name"]
+    if name == "delta" and dtype.kind not in "iu":
+        raise ValueError(
+            f"The delta filter is only lossless for integer data, "
+            f"not {dtype}")
+    if name == "bitround":
+        if dtype.kind != "f":
+            raise ValueError(
+                f"The bitround filter only applies to floating point "
+                f"data, not {dtype}")
+        if "keepbits" not in stage:
+            raise ValueError("The bitround filter requires `keepbits`")
+
+
+def _make_numcodec(stage: dict, dtype: np.dtype) -> Any:
+    import numcodecs
+
+    options = {key: value for key, value in stage.items() if key != "name"}
+    name = stage["name"]
+    if name == "delta":
+        return numcodecs.Delta(dtype=dtype.str, **options)
+    if name == "bitround":
+        return numcodecs.BitRound(**options)
+    if name == "shuffle":
+        options.setdefault("elementsize", dtype.itemsize)
+        return numcodecs.Shuffle(**options)
+    if name == "blosc":
+        if isinstance(options.get("shuffle"), str):
+            options["shuffle"] = BLOSC_SHUFFLE[options["shuffle"]]
+        return numcodecs.Blosc(**options)
+    if name == "zstd":
+        return numcodecs.Zstd(**options)
+    if name == "zlib":
+        return numcodecs.Zlib(**options)
+    if name == "gzip":
+        return numcodecs.GZip(**options)
+    if name == "lz4":
+        return numcodecs.LZ4(**options)
+    raise ValueError('Unknown codec', name)
+
+
+# Stages that zarr-python 3 does not implement natively
+NUMCODECS_V3 = ("delta", "bitround", "shuffle", "zlib", "lz4")
+
+
+def _numcodecs_v3() -> Any:
+    """
+    Module that hosts the Zarr v3 wrappers of numcodecs codecs, or None
+    if they are not available (numcodecs >= 0.16 with zarr < 3.1.3).
+    """
+    import zarr.codecs
+    if hasattr(zarr.codecs, "Delta"):
+        # zarr-python >= 3.1 hosts the numcodecs wrappers
+        return zarr.codecs
+    try:
+        import numcodecs.zarr3
+    except ImportError:
+        return None
+    return numcodecs.zarr3
+
+
+def _make_v3codec(stage: dict, dtype: np.dtype) -> Any:
+    import zarr.codecs
+
+    options = {key: value for key, value in stage.items() if key != "name"}
+    name = stage["name"]
+    numcodecs_zarr3 = None
+    if name in NUMCODECS_V3:
+        numcodecs_zarr3 = _numcodecs_v3()
+        if numcodecs_zarr3 is None:
+            raise ValueError(
+                f"The {name} codec is not available in Zarr v3 with this "
+                f"version of zarr-python and numcodecs (it requires "
+                f"zarr-python >= 3.1.3, or numcodecs < 0.16)")
+    if name == "delta":
+        return numcodecs_zarr3.Delta(dtype=dtype.str, **options)
+    if name == "bitround":
+        return numcodecs_zarr3.BitRound(**options)
+    if name == "shuffle":
+        options.setdefault("elementsize", dtype.itemsize)
+        return numcodecs_zarr3.Shuffle(**options)
+    if name == "blosc":
+        if isinstance(options.get("shuffle"), int):
+            options["shuffle"] = {
+                v: k for k, v in BLOSC_SHUFFLE.items()
+            }[options["shuffle"]]
+        options.setdefault("typesize", dtype.itemsize)
+        return zarr.codecs.BloscCodec(**options)
+    if name == "zstd":
+        return zarr.codecs.ZstdCodec(**options)
+    if name == "zlib":
+        return numcodecs_zarr3.Zlib(**options)
+    if name == "gzip":
+        return zarr.codecs.GzipCodec(**options)
+    if name == "lz4":
+        return numcodecs_zarr3.LZ4(**options)
+    raise ValueError('Unknown codec', name)
+
+
+def _make_codecs(
+        spec: CodecSpec,
+        zarr_version: Literal[2, 3],
+        dtype: Any,
+) -> Dict[str, Any]:
+    """
+    Build the filters and compressors of a codec pipeline.
+
+    Parameters
+    ----------
+    spec : str | dict | list[str | dict]
+        Codec pipeline (see `_parse_codecs`).
+    zarr_version : {2, 3}
+        Zarr format version.
+    dtype : np.dtype
+        Data type of the array.
+
+    Returns
+    -------
+    dict
+        Keyword arguments `filters` and `compressors` for `_create_array`.
+        With Zarr v2, filters are numcodecs filters and `compressors`
+        is a single numcodecs compressor. With Zarr v3, filters are
+        array -> array codecs and `compressors` is a list of
+        bytes -> bytes codecs.
+    """
+    dtype = np.dtype(dtype)
+    stages = _parse_codecs(spec)
+    for stage in stages:
+        _check_stage(stage, dtype)
+
+    if zarr_version == 2:
+        ncompressors = sum(stage["name"] in COMPRESSORS for stage in stages)
+        if ncompressors > 1 or (
+                ncompressors and stages[-1]["name"] not in COMPRESSORS):
+            raise ValueError(
+                "Zarr v2 pipelines accept a single compressor, "
+                "in last position")
+        codecs = [_make_numcodec(stage, dtype) for stage in stages]
+        if ncompressors:
+            return {"filters": codecs[:-1] or None,
+                    "compressors": codecs[-1]}
+        return {"filters": codecs or None, "compressors": None}
+
+    elif zarr_version == 3:
+        filters, compressors = [], []
+        for stage in stages:
+            if stage["name"] in ARRAY_FILTERS:
+                if compressors:
+                    raise ValueError(
+                        f"Array filter {stage['name']} must come before "
+                        f"bytes filters and compressors")
+                filters.append(_make_v3codec(stage, dtype))
+            else:
+                compressors.append(_make_v3codec(stage, dtype))
+        return {"filters": filters or None, "compressors": compressors or None}
+
+    raise ValueError(f"zarr version {zarr_version} is not supported")
+
+
+# Default candidates used when benchmarking or auto-selecting a pipeline
+CANDIDATE_CODECS = [
+    "blosc:cname=lz4,clevel=5,shuffle=shuffle",
+    "blosc:cname=lz4,clevel=5,shuffle=bitshuffle",
+    "blosc:cname=zstd,clevel=3,shuffle=shuffle",
+    "blosc:cname=zstd,clevel=5,shuffle=bitshuffle",
+    "zstd:level=3",
+    "zstd:level=9",
+    "shuffle+zstd:level=3",
+    "delta+shuffle+zstd:level=3",
+    "delta+blosc:cname=zstd,clevel=5,shuffle=shuffle",
+]
+
+
+def _candidate_codecs(dtype: Any) -> List[str]:
+    """Default candidate pipelines that are lossless for `dtype`."""
+    dtype = np.dtype(dtype)
+    candidates = []
+    for spec in CANDIDATE_CODECS:
+        try:
+            for stage in _parse_codecs(spec):
+                _check_stage(stage, dtype)
+        except ValueError:
+            continue
+        candidates.append(spec)
+    return candidates
+
+
+def _sample_chunks(
+        data: np.ndarray,
+        chunks: Sequence[int],
+        nb_samples: int = 8,
+        seed: Optional[int] = 0,
+) -> List[np.ndarray]:
+    """
+    Extract a random sample of chunks from an array.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Array, in Zarr order.
+    chunks : list[int]
+        Chunk shape, in Zarr order.
+    nb_samples : int
+        Maximum number of chunks to sample.
+    seed : int, optional
+        Seed of the random generator.
+
+    Returns
+    -------
+    list[np.ndarray]
+        Sampled chunks (edge chunks are not padded).
+    """
+    grid = [int(np.ceil(n / c)) for n, c in zip(data.shape, chunks)]
+    nb_chunks = int(np.prod(grid))
+    rng = np.random.default_rng(seed)
+    indices = rng.choice(nb_chunks, min(nb_samples, nb_chunks), replace=False)
+    samples = []
+    for index in zip(*np.unravel_index(np.sort(indices), grid)):
+        slicer = tuple(
+            slice(i * c, (i + 1) * c) for i, c in zip(index, chunks)
+        )
+        samples.append(np.ascontiguousarray(data[slicer]))
+    return samples
+
+
+def _measure_codecs(
+        samples: List[np.ndarray],
+        specs: Optional[List[CodecSpec]] = None,
+        repeat: int = 3,
+) -> List[dict]:
+    """
+    Measure the compression ratio and speed of codec pipelines.
+
+    Pipelines are measured with their numcodecs implementation, which
+    uses the same algorithms as their Zarr v3 counterparts.
+
+    Parameters
+    ----------
+    samples : list[np.ndarray]
+        Chunks to compress.
+    specs : list[str | dict | list], optional
+        Candidate pipelines. Default: all lossless candidates for the
+        data type of the samples.
+    repeat : int
+        Number of repetitions (the fastest one is kept).
+
+    Returns
+    -------
+    list[dict]
+        For each pipeline: "codecs" (string form), "nbytes" (raw size),
+        "cbytes" (compressed size), "ratio", "encode_time" and
+        "decode_time" (in seconds, for all samples).
+    """
+    dtype = samples[0].dtype
+    if specs is None:
+        specs = _candidate_codecs(dtype)
+    nbytes = sum(sample.nbytes for sample in samples)
+    results = []
+    for spec in specs:
+        stages = _parse_codecs(spec)
+        for stage in stages:
+            _check_stage(stage, dtype)
+        codecs = [_make_numcodec(stage, dtype) for stage in stages]
+
+        def encode(chunk):
+            for codec in codecs:
+                chunk = codec.encode(chunk)
+            return chunk
+
+        def decode(chunk):
+            for codec in reversed(codecs):
+                chunk = codec.decode(chunk)
+            return chunk
+
+        encode_time = decode_time = float("inf")
+        for _ in range(max(1, repeat)):
+            tic = time.perf_counter()
+            encoded = [encode(sample) for sample in samples]
+            encode_time = min(encode_time, time.perf_counter() - tic)
+            tic = time.perf_counter()
+            for chunk in encoded:
+                decode(chunk)
+            decode_time = min(decode_time, time.perf_counter() - tic)
+        cbytes = sum(len(memoryview(chunk).cast("B")) for chunk in encoded)
+        results.append({
+            "codecs": _format_codecs(stages),
+            "nbytes": nbytes,
+            "cbytes": cbytes,
+            "ratio": nbytes / max(cbytes, 1),
+            "encode_time": encode_time,
+            "decode_time": decode_time,
+        })
+    return results
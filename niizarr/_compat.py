@@ -1,3 +1,6 @@
+import json
+import os
+import warnings
 from typing import Literal, Optional, Union, Any
 
 import zarr
@@ -58,6 +61,7 @@ def _open_zarr(
         out: Union[str, Any],
         mode: Literal["r", "w"] = "w",
         store_opt: Optional[dict] = None,
+        cache: Optional[Any] = None,
         **kwargs: dict
 ) -> Union[zarr.Group, zarr.Array]:
     store_opt = store_opt or {}
@@ -79,7 +83,11 @@ def _open_zarr(
         return out
 
     if not isinstance(out, StoreLike):
-        if pyzarr_version == 3:
+        from ._remote import _is_remote, _remote_store
+        if _is_remote(out):
+            # shared filesystem (and connection pool) per protocol/options
+            out = _remote_store(out, store_opt, mode)
+        elif pyzarr_version == 3:
             read_only = mode == "r"
             if fsspec:
                 storage_options = dict(store_opt)
@@ -98,13 +106,128 @@ def _open_zarr(
                 out = FsspecStore(out, mode=mode, **store_opt)
             else:
                 out = LocalStore(out, **store_opt)
+    if cache is not None and cache is not False:
+        from ._cache import _cache_store
+        out = _cache_store(out, cache)
     if mode == "w":
         out = zarr.group(store=out, overwrite=True, **kwargs)
+    elif pyzarr_version == 3:
+        # Opening as a group first fetches all candidate metadata
+        # documents in a single round trip. Consolidated metadata is
+        # only used for reading, so that writers never see stale shapes.
+        try:
+            out = zarr.open_group(
+                store=out, mode=mode,
+                use_consolidated=None if mode == "r" else False,
+                **kwargs)
+        except (zarr.errors.ContainsArrayError, FileNotFoundError):
+            out = zarr.open(store=out, mode=mode, **kwargs)
     else:
-        out = zarr.open(store=out, mode=mode, **kwargs)
+        store, out = out, None
+        if mode == "r":
+            try:
+                out = zarr.open_consolidated(store=store, mode=mode, **kwargs)
+            except KeyError:
+                pass
+        if out is None:
+            out = zarr.open(store=store, mode=mode, **kwargs)
     return out
 
 
+def _store_location(obj: Any) -> Optional[str]:
+    """
+    Normalized location of a path, store, group or array, used to tell
+    whether two of them point to the same data (None if unknown).
+    """
+    path = ""
+    if isinstance(obj, (zarr.Group, zarr.Array)):
+        if pyzarr_version == 3:
+            obj, path = obj.store_path.store, obj.store_path.path
+        else:
+            obj, path = obj.store, obj.path
+    elif pyzarr_version == 3 and isinstance(obj, zarr.storage.StorePath):
+        obj, path = obj.store, obj.path
+    # unwrap caching, consolidated metadata and other wrapper stores
+    while True:
+        inner = getattr(obj, "_store", None)
+        if inner is None and not isinstance(obj, (zarr.Group, zarr.Array)):
+            inner = getattr(obj, "store", None)
+        if inner is None or inner is obj or isinstance(
+                inner, (str, bytes, os.PathLike)):
+            break
+        obj = inner
+    # in-memory stores are identified by their dictionary
+    obj = getattr(obj, "_store_dict", obj)  # zarr 3 MemoryStore
+    if isinstance(getattr(obj, "root", None), dict):  # zarr 2 MemoryStore
+        obj = obj.root
+    if isinstance(obj, dict):
+        obj = f"memory://{id(obj)}"
+    elif hasattr(obj, "fs") and hasattr(obj, "path"):
+        protocol = obj.fs.protocol
+        protocol = protocol[0] if isinstance(protocol, (list, tuple)) \
+            else protocol
+        obj = f"{protocol}://{obj.path}"
+    elif hasattr(obj, "root"):
+        obj = obj.root
+    elif isinstance(getattr(obj, "path", None), str):
+        obj = obj.path
+    if isinstance(obj, os.PathLike):
+        obj = os.fspath(obj)
+    if not isinstance(obj, str):
+        return None
+    protocol, root = (obj.split("://", 1) if "://" in obj
+                      else ("file", obj))
+    if protocol in ("file", "local"):
+        protocol, root = "file", os.path.realpath(root)
+    location = f"{protocol}://{root.rstrip('/')}"
+    if path:
+        location += "/" + path.strip("/")
+    return location
+
+
+def _same_store(a: Any, b: Any) -> Optional[bool]:
+    """
+    Whether two paths, stores, groups or arrays hold the same data
+    (None if the location of either cannot be determined).
+    """
+    if a is b:
+        return True
+    a, b = _store_location(a), _store_location(b)
+    if a is None or b is None:
+        return None
+    return a == b
+
+
+def _consolidate(omz: zarr.Group, if_exists: bool = False) -> None:
+    """
+    Write the consolidated metadata of a group.
+
+    Parameters:
+        omz : zarr.Group
+            Group whose metadata (and that of all its members) is
+            consolidated in `.zmetadata` (Zarr v2) or in its `zarr.json`
+            (Zarr v3).
+        if_exists : bool
+            Only refresh consolidated metadata that already exists.
+    """
+    if pyzarr_version == 3:
+        if if_exists:
+            current = zarr.open_group(store=omz.store, path=omz.path,
+                                      mode="r", use_consolidated=None)
+            if current.metadata.consolidated_metadata is None:
+                return
+        with warnings.catch_warnings():
+            # consolidated metadata is not (yet) part of the v3 spec
+            warnings.filterwarnings(
+                "ignore", message="Consolidated metadata is currently")
+            zarr.consolidate_metadata(omz.store, path=omz.path)
+    else:
+        key = (omz.path + "/" if omz.path else "") + ".zmetadata"
+        if if_exists and key not in omz.store:
+            return
+        zarr.consolidate_metadata(omz.store, path=omz.path)
+
+
 def _create_array(
         out: zarr.Group,
         name: Union[int, str],
@@ -158,3 +281,97 @@ def _create_array(
         return
     if pyzarr_version == 2:
         out.create_dataset(name=name, **kwargs, compressor=compressor)
+
+
+def _array_options(arr: zarr.Array) -> dict:
+    """
+    Storage options of an existing array, as accepted by `_create_array`.
+
+    Parameters:
+        arr : zarr.Array
+            Existing array.
+
+    Returns:
+        dict
+            Keys "dtype", "fill_value", "chunks", "shards" (None if the
+            array is not sharded), "filters", "compressors" and
+            "dimension_separator".
+    """
+    if pyzarr_version == 3:
+        if arr.metadata.zarr_format == 2:
+            separator = arr.metadata.dimension_separator
+        else:
+            separator = arr.metadata.chunk_key_encoding.separator
+        return {
+            "dtype": arr.dtype,
+            "fill_value": arr.fill_value,
+            "chunks": arr.chunks,
+            "shards": arr.shards,
+            "filters": arr.filters or None,
+            "compressors": arr.compressors or None,
+            "dimension_separator": separator,
+        }
+    return {
+        "dtype": arr.dtype,
+        "fill_value": arr.fill_value,
+        "chunks": arr.chunks,
+        "shards": None,
+        "filters": arr.filters,
+        "compressors": arr.compressor,
+        "dimension_separator": arr._dimension_separator or ".",
+    }
+
+
+def _resize(arr: zarr.Array, shape: tuple) -> None:
+    """
+    Resize an existing array.
+
+    Older versions of zarr-python 2 drop the dimension separator from
+    the metadata of a resized array, so that new chunks are written
+    with "." separators. It is restored.
+
+    Parameters:
+        arr : zarr.Array
+            Existing array.
+        shape : tuple[int]
+            New shape.
+    """
+    arr.resize(shape)
+    separator = getattr(arr, "_dimension_separator", None)
+    if pyzarr_version == 3 or not separator:
+        return
+    key = arr._key_prefix + ".zarray"
+    meta = json.loads(arr._store[key])
+    if meta.get("dimension_separator") != separator:
+        meta["dimension_separator"] = separator
+        arr._store[key] = json.dumps(meta, indent=4, sort_keys=True,
+                                     ensure_ascii=True).encode()
+
+
+def _empty_chunks_policy(arr: zarr.Array,
+                         write_empty_chunks: bool = False) -> zarr.Array:
+    """
+    Same array, with the given policy for chunks that only contain the
+    fill value (which are not stored if `write_empty_chunks` is False).
+
+    Parameters:
+        arr : zarr.Array
+            Existing array.
+        write_empty_chunks : bool
+            Whether chunks that only contain the fill value are stored.
+
+    Returns:
+        zarr.Array
+    """
+    if pyzarr_version == 3:
+        if hasattr(arr, "with_config"):
+            return arr.with_config({"write_empty_chunks": write_empty_chunks})
+        # zarr-python 3.0: rebuild the array with a new configuration
+        import dataclasses
+        from zarr.core.array import AsyncArray
+        config = dataclasses.replace(arr._async_array._config,
+                                     write_empty_chunks=write_empty_chunks)
+        return zarr.Array(AsyncArray(arr.metadata, arr.store_path,
+                                     config=config))
+    return zarr.Array(arr.store, path=arr.path, chunk_store=arr.chunk_store,
+                      write_empty_chunks=write_empty_chunks)
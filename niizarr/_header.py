@@ -1,7 +1,7 @@
 import re
 import sys
 import warnings
-from typing import Literal, Tuple
+from typing import Literal, Sequence, Tuple, Union
 
 import numpy as np
 from nibabel import (Nifti1Image, Nifti1Header, Nifti2Image, Nifti2Header)
@@ -82,6 +82,19 @@ HEADERTYPE2 = np.dtype([
     ("unused_str", "S15"),
 ])
 
+# Union of the fields of both header versions, in native byte order and
+# with the widest type, used to parse many headers at once.
+# `vox_offset` is a float in nifti-1 and an integer in nifti-2.
+HEADERTYPE_ANY = np.dtype([
+    (name, np.dtype("f8") if name == "vox_offset"
+     else HEADERTYPE2.fields[name][0].newbyteorder("="))
+    if name in HEADERTYPE2.names
+    else (name, HEADERTYPE1.fields[name][0].newbyteorder("="))
+    for name in HEADERTYPE2.names + tuple(
+        name for name in HEADERTYPE1.names if name not in HEADERTYPE2.names
+    )
+])
+
 
 class Recoder:
     def __init__(self, obj=None):
@@ -385,3 +398,92 @@ def get_nibabel_klass(header: np.ndarray) -> Tuple[type, type]:
     else:
         raise ValueError(
             f"sizeof_hdr {header['sizeof_hdr']} does not match any Nifti header specification")
+
+
+def _stack_headers(buffers: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Copy the leading bytes of many buffers into a single array.
+
+    Returns
+    -------
+    raw : (N, 544) np.ndarray[uint8]
+        Header bytes (and extension flag), zero-padded.
+    length : (N,) np.ndarray[int]
+        Number of bytes available in each buffer.
+    """
+    size = NIFTI_2_HEADER_SIZE + 4
+    raw = np.zeros((len(buffers), size), dtype=np.uint8)
+    length = np.zeros(len(buffers), dtype=int)
+    for i, buffer in enumerate(buffers):
+        buffer = np.frombuffer(buffer, dtype=np.uint8)[:size]
+        raw[i, :len(buffer)] = buffer
+        length[i] = len(buffer)
+    return raw, length
+
+
+def _header_versions(raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nifti version (0 if invalid) and byte order of stacked headers."""
+    sizeof_hdr = {
+        order: raw[:, :4].copy().view(order + "i4")[:, 0]
+        for order in (SYS_BYTEORDER, SYS_BYTEORDER_SWAPPED)
+    }
+    version = np.zeros(len(raw), dtype=int)
+    byteorder = np.full(len(raw), SYS_BYTEORDER)
+    for order in (SYS_BYTEORDER_SWAPPED, SYS_BYTEORDER):
+        for v, size in ((1, NIFTI_1_HEADER_SIZE), (2, NIFTI_2_HEADER_SIZE)):
+            mask = sizeof_hdr[order] == size
+            version[mask] = v
+            byteorder[mask] = order
+    return version, byteorder
+
+
+def bin2nii_many(buffers: Union[Sequence[bytes], np.ndarray]) -> np.ndarray:
+    """
+    Parse many binary headers in one vectorized pass.
+
+    Parameters
+    ----------
+    buffers : list[bytes] | (N, K) np.ndarray[uint8]
+        Binary header data (nifti-1 and/or nifti-2, any byte order).
+
+    Returns
+    -------
+    headers : (N,) np.ndarray[HEADERTYPE_ANY]
+        Headers, in native byte order. Nifti-1 and nifti-2 headers are
+        distinguished by `sizeof_hdr`; fields that do not exist in a
+        version are zero.
+    """
+    if isinstance(buffers, np.ndarray) and buffers.ndim == 2:
+        raw = np.zeros((len(buffers), NIFTI_2_HEADER_SIZE + 4), np.uint8)
+        raw[:, :buffers.shape[1]] = buffers[:, :raw.shape[1]]
+    else:
+        raw, _ = _stack_headers(buffers)
+    version, byteorder = _header_versions(raw)
+    if not version.all():
+        raise ValueError('Are these nifti headers?',
+                         np.flatnonzero(version == 0).tolist())
+
+    headers = np.zeros(len(raw), dtype=HEADERTYPE_ANY)
+    for v, size, dtype in ((1, NIFTI_1_HEADER_SIZE, HEADERTYPE1),
+                           (2, NIFTI_2_HEADER_SIZE, HEADERTYPE2)):
+        for order in (SYS_BYTEORDER, SYS_BYTEORDER_SWAPPED):
+            mask = (version == v) & (byteorder == order)
+            if not mask.any():
+                continue
+            group = np.ascontiguousarray(raw[mask, :size])
+            group = group.view(dtype.newbyteorder(order))[:, 0]
+            for name in dtype.names:
+                headers[name][mask] = group[name]
+
+    magic, inverse = np.unique(headers["magic"], return_inverse=True)
+    magic = np.array([
+        re.sub(r'[\x00-\x1f]+', '', m.decode()) for m in magic.tolist()
+    ])[inverse.reshape(-1)]
+    version = version.astype(str)
+    valid = ((magic == np.char.add("n+", version))
+             | (magic == np.char.add("ni", version)))
+    if not valid.all():
+        warnings.warn(
+            f"Magic String does not match NIFTI version for "
+            f"{int((~valid).sum())} header(s)")
+    return headers
@@ -0,0 +1,314 @@
+"""Index of the chunks occupied by each label of a label volume."""
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+from scipy import ndimage
+
+from ._compat import _create_array, _open_zarr
+
+# Name of the subgroup that holds the index
+INDEX = "label_index"
+
+# Number of rows per chunk of the index arrays
+INDEX_CHUNK = 2**16
+
+
+def _chunk_rows(chunk: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Rows of the index for the non-zero labels of one chunk.
+
+    The bounding box of each label, in voxels of the chunk, is stored
+    as (start, stop) along the spatial dimensions (zarr order), along
+    with its number of voxels and the sum of their spatial coordinates.
+    """
+    values, inverse = np.unique(chunk, return_inverse=True)
+    inverse = inverse.reshape(chunk.shape)
+    objects = ndimage.find_objects(inverse + 1)
+    keep = np.flatnonzero(values != 0)
+    bbox = np.asarray([
+        [s.start for s in objects[i][-3:]] + [s.stop for s in objects[i][-3:]]
+        for i in keep
+    ], dtype=np.int64).reshape([-1, 6])
+    flat = inverse.ravel()
+    counts = np.bincount(flat, minlength=len(values))
+    sums = np.stack([
+        np.bincount(flat, minlength=len(values), weights=np.broadcast_to(
+            np.arange(n).reshape([-1] + [1] * (chunk.ndim - 1 - d)),
+            chunk.shape).ravel())
+        for d, n in enumerate(chunk.shape) if d >= chunk.ndim - 3
+    ], -1)
+    return {
+        "labels": values[keep],
+        "bbox": bbox,
+        "counts": counts[keep].astype(np.int64),
+        "sums": sums[keep].reshape([-1, 3]),
+    }
+
+
+def _label_rows(
+        data: np.ndarray,
+        block: Sequence[int],
+        offset: Sequence[int] = (),
+) -> Dict[str, np.ndarray]:
+    """
+    Rows of the index for all chunks of a region aligned with chunks.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Label volume, or region of it, in zarr order.
+    block : sequence[int]
+        Chunk shape.
+    offset : sequence[int]
+        Position of the region, in chunks.
+
+    Returns
+    -------
+    dict
+        Arrays "labels" (nrows,), "chunks" (nrows, ndim), "bbox"
+        (nrows, 6), "counts" (nrows,) and "sums" (nrows, 3), with
+        bounding boxes and coordinates in voxels of the level.
+    """
+    offset = list(offset) + [0] * (data.ndim - len(offset))
+    ranges = [range(math.ceil(n / c)) for n, c in zip(data.shape, block)]
+    rows = []
+    for index in itertools.product(*ranges):
+        chunk = data[tuple(slice(i * c, (i + 1) * c)
+                           for i, c in zip(index, block))]
+        chunk_rows = _chunk_rows(chunk)
+        coords = [i + o for i, o in zip(index, offset)]
+        origin = [i * c for i, c in zip(coords[-3:], block[-3:])]
+        chunk_rows["bbox"] += np.asarray(origin * 2, dtype=np.int64)
+        chunk_rows["sums"] += \
+            chunk_rows["counts"][:, None] * np.asarray(origin, dtype=float)
+        chunk_rows["chunks"] = np.tile(
+            np.asarray(coords, dtype=np.int64),
+            (len(chunk_rows["labels"]), 1))
+        rows.append(chunk_rows)
+    return _concat_rows(rows, data.dtype, data.ndim)
+
+
+def _concat_rows(rows: Sequence[dict], dtype: np.dtype,
+                 ndim: int) -> Dict[str, np.ndarray]:
+    """Concatenate rows and sort them by label, then chunk."""
+    if not rows:
+        return {
+            "labels": np.zeros([0], dtype=dtype),
+            "chunks": np.zeros([0, ndim], dtype=np.int64),
+            "bbox": np.zeros([0, 6], dtype=np.int64),
+            "counts": np.zeros([0], dtype=np.int64),
+            "sums": np.zeros([0, 3], dtype=np.float64),
+        }
+    table = {key: np.concatenate([row[key] for row in rows])
+             for key in rows[0]}
+    order = np.lexsort(tuple(table["chunks"].T[::-1]) + (table["labels"],))
+    return {key: value[order] for key, value in table.items()}
+
+
+def _write_label_index(omz: zarr.Group, table: Dict[str, np.ndarray],
+                       block: Sequence[int]) -> None:
+    """Write the label index (`label_index` subgroup)."""
+    group = omz.require_group(INDEX)
+    for key, value in table.items():
+        _create_array(
+            group, key,
+            shape=value.shape,
+            chunks=(max(1, min(len(value), INDEX_CHUNK)),) + value.shape[1:],
+            dtype=value.dtype,
+            fill_value=0,
+            dimension_separator='/',
+            overwrite=True,
+        )
+        if value.size:
+            group[key][...] = value
+    group.attrs["block"] = list(block)
+
+
+def _read_label_index(group: zarr.Group) -> Dict[str, np.ndarray]:
+    return {key: np.asarray(arr[...]) for key, arr in group.arrays()}
+
+
+def _refresh_label_index(omz: zarr.Group,
+                         region: Optional[Sequence[slice]] = None) -> None:
+    """
+    Recompute the rows of the chunks of the finest level that intersect
+    a region (in zarr order), from the stored data, after it was
+    modified. Nothing is done if the group does not have an index.
+    """
+    if INDEX not in omz:
+        return
+    from ._pyramid import _level_paths
+    arr = omz[_level_paths(omz)[0]]
+    group = omz[INDEX]
+    block = list(group.attrs["block"])
+    if region is None:
+        region = [slice(None)] * arr.ndim
+    start, box = [], []
+    for s, c, n in zip(region, block, arr.shape):
+        a, b, _ = s.indices(n)
+        start.append(a // c)
+        box.append(slice(a // c * c, min(math.ceil(b / c) * c, n)))
+    stop = [math.ceil(b.stop / c) for b, c in zip(box, block)]
+
+    table = _read_label_index(group)
+    inside = np.all((table["chunks"] >= start) & (table["chunks"] < stop),
+                    axis=1)
+    table = {key: value[~inside] for key, value in table.items()}
+    rows = _label_rows(arr[tuple(box)], block, start)
+    table = _concat_rows([table, rows], arr.dtype, arr.ndim)
+    _write_label_index(omz, table, block)
+
+
+def _copy_label_index(inp: zarr.Group, out: zarr.Group) -> None:
+    """Copy the label index of a nifti-zarr."""
+    if INDEX not in inp:
+        return
+    _write_label_index(out, _read_label_index(inp[INDEX]),
+                       inp[INDEX].attrs["block"])
+
+
+def read_label(
+        inp: Union[str, Any],
+        label: Union[int, float],
+        *,
+        max_workers: int = 8,
+        **store_opt
+) -> Tuple[np.ndarray, Tuple[slice, ...]]:
+    """
+    Read the voxels of one label of a label nifti-zarr.
+
+    Only the chunks that contain the label are fetched, using the index
+    built by `nii2zarr` (see `label_index`).
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | path
+        Label nifti-zarr.
+    label : number
+        Label value (non-zero).
+    max_workers : int, optional
+        Number of chunks fetched concurrently.
+    **store_opt
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    mask : np.ndarray[bool]
+        Mask of the label in its bounding box, in nifti order
+        (x, y, z[, t[, c]]).
+    bbox : tuple[slice]
+        Bounding box of the label in the finest level, in nifti order.
+    """
+    from ._pyramid import _axis_names, _level_paths
+    omz = _open_zarr(inp, mode="r", store_opt=store_opt)
+    if INDEX not in omz:
+        raise ValueError("This nifti-zarr does not have a label index.")
+    group = omz[INDEX]
+    block = list(group.attrs["block"])
+    arr = omz[_level_paths(omz)[0]]
+    axes = _axis_names(omz, arr.ndim)
+
+    labels = group["labels"][...]
+    first = int(np.searchsorted(labels, label, side="left"))
+    last = int(np.searchsorted(labels, label, side="right"))
+    if first == last:
+        raise ValueError(f"Label {label} is not in this nifti-zarr.")
+    chunks = group["chunks"][first:last]
+    bbox = group["bbox"][first:last]
+
+    # bounding box in zarr order: whole chunks along batch dimensions
+    nbatch = arr.ndim - 3
+    start = [int(c) * b for c, b in zip(chunks[:, :nbatch].min(0), block)]
+    stop = [min((int(c) + 1) * b, n) for c, b, n in
+            zip(chunks[:, :nbatch].max(0), block, arr.shape)]
+    start += bbox[:, :3].min(0).tolist()
+    stop += bbox[:, 3:].max(0).tolist()
+    mask = np.zeros([b - a for a, b in zip(start, stop)], dtype=bool)
+
+    def fetch(coords):
+        src = tuple(
+            slice(max(c * b, a), min((c + 1) * b, z))
+            for c, b, a, z in zip(coords, block, start, stop))
+        return src, arr[src]
+
+    with ThreadPoolExecutor(max(1, max_workers)) as pool:
+        for src, data in pool.map(fetch, chunks.tolist()):
+            dst = tuple(slice(s.start - a, s.stop - a)
+                        for s, a in zip(src, start))
+            mask[dst] = data == label
+
+    # zarr order -> nifti order
+    perm = [axes.index(name) for name in "xyztc" if name in axes]
+    bbox = tuple(slice(start[i], stop[i]) for i in perm)
+    return mask.transpose(perm), bbox
+
+
+def read_label_volumes(
+        inp: Union[str, Any],
+        **store_opt
+) -> Dict[Union[int, float], dict]:
+    """
+    Volume and centroid of each label of a label nifti-zarr.
+
+    These are aggregated from the voxel counts stored in the label index
+    built by `nii2zarr`, without reading the voxels. Time points and
+    channels, if any, are summed together.
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | path
+        Label nifti-zarr.
+    **store_opt
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    dict
+        For each (non-zero) label, a dictionary with keys "count"
+        (number of voxels), "volume" (in mm^3) and "centroid" (world
+        coordinates, in mm).
+    """
+    from ._pyramid import _axis_names, _level_paths
+    from ._units import convert_unit
+    from ._zarr2nii import _nifti_header
+    omz = _open_zarr(inp, mode="r", store_opt=store_opt)
+    if INDEX not in omz:
+        raise ValueError("This nifti-zarr does not have a label index.")
+    group = omz[INDEX]
+    if "counts" not in group:
+        raise ValueError("The label index of this nifti-zarr does not have "
+                         "voxel counts. Convert it again to add them.")
+    arr = omz[_level_paths(omz)[0]]
+    ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+    header, _ = _nifti_header(omz, arr, ome)
+
+    # rows are sorted by label
+    labels = group["labels"][...]
+    if not len(labels):
+        return {}
+    labels, first = np.unique(labels, return_index=True)
+    counts = np.add.reduceat(group["counts"][...], first)
+    sums = np.add.reduceat(group["sums"][...], first, axis=0)
+
+    # zarr order -> nifti order
+    axes = _axis_names(omz, arr.ndim)[-3:]
+    voxels = (sums / counts[:, None])[:, [axes.index(name) for name in "xyz"]]
+    affine = header.get_best_affine()
+    world = voxels @ affine[:3, :3].T + affine[:3, 3]
+
+    unit = header.get_xyzt_units()[0]
+    scale = 1.0 if unit == "unknown" else convert_unit(1.0, unit, "mm")
+    zooms = (list(header.get_zooms()[:3]) + [1.0] * 3)[:3]
+    voxel_volume = float(np.prod(zooms)) * scale ** 3
+    return {
+        label.item(): {
+            "count": int(count),
+            "volume": float(count) * voxel_volume,
+            "centroid": (centroid * scale).tolist(),
+        }
+        for label, count, centroid in zip(labels, counts, world)
+    }
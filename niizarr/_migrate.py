@@ -0,0 +1,248 @@
+"""Migrate a Zarr v2 / OME 0.4 nifti-zarr to Zarr v3 / OME 0.5."""
+import argparse
+import itertools
+import math
+import sys
+from argparse import ArgumentDefaultsHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple, Union
+
+import numpy as np
+import zarr
+
+from ._codecs import _make_codecs
+from ._compat import _consolidate, _create_array, _open_zarr, pyzarr_version
+from ._nii2zarr import _expand_level_sizes
+from ._pyramid import _axis_names, _level_paths
+from ._rechunk import _batch_sizes, _copy_blocks
+from ._labels import _copy_label_index
+from ._stats import _copy_stats
+
+# OME 0.4 group attributes that move under the "ome" key in OME 0.5
+OME_KEYS = ("multiscales", "omero", "labels", "image-label", "plate", "well")
+
+
+def _convert_attrs(attrs: dict) -> dict:
+    """Convert OME 0.4 group attributes to OME 0.5."""
+    attrs = dict(attrs)
+    if "ome" in attrs:
+        return attrs
+    ome = {"version": "0.5"}
+    for key in OME_KEYS:
+        if key in attrs:
+            ome[key] = attrs.pop(key)
+    if "multiscales" in ome:
+        ome["multiscales"] = [
+            {key: value for key, value in multiscale.items()
+             if key != "version"}
+            for multiscale in ome["multiscales"]
+        ]
+    if len(ome) > 1:
+        attrs["ome"] = ome
+    return attrs
+
+
+def _convert_codecs(arr: zarr.Array) -> Optional[dict]:
+    """
+    Zarr v3 codecs that produce the same bytes as the codecs of a
+    Zarr v2 array, or None if they cannot be expressed in Zarr v3.
+    """
+    stages = []
+    codecs = list(arr.filters or []) + list(arr.compressors or [])
+    for codec in codecs:
+        stage = dict(codec.get_config())
+        stage["name"] = stage.pop("id")
+        if stage["name"] == "delta":
+            stage.pop("dtype", None)
+        stages.append(stage)
+    if not stages:
+        return {"filters": None, "compressors": None}
+    try:
+        return _make_codecs(stages, 3, arr.dtype)
+    except (ValueError, TypeError):
+        return None
+
+
+def _raw_copy(src: zarr.Array, dst: zarr.Array, max_workers: int = 1) -> int:
+    """
+    Copy the encoded chunks of `src` into `dst` without decoding them.
+
+    Returns
+    -------
+    int
+        Number of chunks copied (missing chunks are skipped).
+    """
+    from zarr.core.buffer import default_buffer_prototype
+    from zarr.core.sync import sync
+
+    prototype = default_buffer_prototype()
+    src_store, src_path = src.store_path.store, src.store_path.path
+    dst_store, dst_path = dst.store_path.store, dst.store_path.path
+    grid = [int(math.ceil(n / c)) for n, c in zip(src.shape, src.chunks)]
+
+    def copy(index):
+        key = src.metadata.encode_chunk_key(index)
+        data = sync(src_store.get(f"{src_path}/{key}", prototype=prototype))
+        if data is None:
+            return 0
+        key = dst.metadata.encode_chunk_key(index)
+        sync(dst_store.set(f"{dst_path}/{key}", data))
+        return 1
+
+    indices = itertools.product(*map(range, grid))
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers) as pool:
+            return sum(pool.map(copy, indices))
+    return sum(map(copy, indices))
+
+
+def migrate(
+        inp: Union[str, Any],
+        out: Union[str, Any],
+        *,
+        shard: Optional[Union[int, Tuple[int], List[Tuple[int]]]] = None,
+        shard_channel: Optional[int] = None,
+        shard_time: Optional[int] = None,
+        max_workers: int = 1,
+) -> dict:
+    """
+    Convert a Zarr v2 (OME 0.4) nifti-zarr to Zarr v3 (OME 0.5).
+
+    Array metadata are rewritten in `zarr.json` documents and OME
+    attributes are moved under the `ome` key. When the filters and
+    compressor of a level have a Zarr v3 equivalent (C order,
+    little-endian data, no sharding), its encoded chunks are copied
+    verbatim. Otherwise, chunks are decoded and re-encoded, block by
+    block and in parallel. The pyramid is never recomputed.
+
+    Parameters
+    ----------
+    inp : zarr.Store, zarr.Group or path
+        Input Zarr v2 nifti-zarr.
+    out : zarr.Store, zarr.Group or path
+        Output Zarr v3 nifti-zarr.
+    shard : int or tuple of int or list of tuple of int, optional
+        Shard size for spatial dimensions, in nifti order (x, y, z).
+        A list of tuples allows different shard sizes to be used at each
+        pyramid level. Chunks are kept as is.
+    shard_channel, shard_time : int, optional
+        Shard size of the channel and time dimensions. If 0, combine all
+        channels/timepoints in a single shard. Default: chunk size.
+    max_workers : int, optional
+        Number of chunks (or blocks) copied concurrently.
+
+    Returns
+    -------
+    dict
+        For each level path, whether chunks were copied verbatim.
+    """
+    if pyzarr_version < 3:
+        raise ValueError("Writing Zarr v3 requires zarr-python >= 3")
+    inp = _open_zarr(inp, mode="r")
+    if inp.metadata.zarr_format != 2:
+        raise ValueError("The input is not a Zarr v2 group")
+    out = _open_zarr(out, zarr_version=3)
+
+    paths = _level_paths(inp)
+    axes = _axis_names(inp, inp[paths[0]].ndim)
+    nbatch = len(axes) - 3
+    if shard:
+        shard = _expand_level_sizes(shard)
+
+    verbatim = {}
+    for i, path in enumerate(paths):
+        src = inp[path]
+        codecs = _convert_codecs(src)
+        opts = {}
+        if shard:
+            shard_i = tuple(shard[min(i, len(shard) - 1)][::-1])
+            opts["shards"] = _batch_sizes(
+                axes[:nbatch], src.chunks, src.shape,
+                shard_time, shard_channel) + shard_i
+        verbatim[path] = bool(
+            codecs is not None
+            and not shard
+            and src.metadata.order == "C"
+            and src.dtype.byteorder != ">"
+        )
+        if codecs is None:
+            # no v3 equivalent: re-encode with the default codecs
+            codecs = {"filters": None, "compressors": "auto"}
+        fill_value = src.fill_value
+        if fill_value is None:
+            fill_value = np.zeros([], dtype=src.dtype).item()
+        _create_array(
+            out, path,
+            shape=src.shape,
+            chunks=src.chunks,
+            dtype=src.dtype,
+            fill_value=fill_value,
+            dimension_separator='/',
+            dimension_names=axes,
+            **codecs,
+            **opts,
+        )
+        out[path].attrs.update(dict(src.attrs))
+        if verbatim[path]:
+            _raw_copy(src, out[path], max_workers)
+        else:
+            _copy_blocks(src, out[path], opts.get("shards", src.chunks),
+                         max_workers)
+
+    if "nifti" in inp:
+        header = inp["nifti"][:]
+        _create_array(
+            out,
+            'nifti',
+            shape=[len(header)],
+            chunks=len(header),
+            dtype='u1',
+            compressors=None,
+            fill_value=None,
+            dimension_separator='/',
+            overwrite=True,
+        )
+        out['nifti'][:] = header
+        out['nifti'].attrs.update(dict(inp['nifti'].attrs))
+    _copy_stats(inp, out)
+    _copy_label_index(inp, out)
+
+    out.attrs.update(_convert_attrs(inp.attrs))
+    _consolidate(out)
+    return verbatim
+
+
+def cli(args=None):
+    """    Command-line entrypoint"""
+    parser = argparse.ArgumentParser(
+        'niizarr-migrate',
+        description='Convert a Zarr v2 (OME 0.4) nifti-zarr to '
+                    'Zarr v3 (OME 0.5).',
+        formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        'input', help='Input Zarr v2 directory.')
+    parser.add_argument(
+        'output', help='Output Zarr v3 directory.')
+    parser.add_argument(
+        '--shard', type=int, default=None,
+        help='Spatial shard size. Default: no sharding.')
+    parser.add_argument(
+        '--shard-time', type=int, default=None,
+        help='Shard size of the time dimension (0: single shard).')
+    parser.add_argument(
+        '--shard-channel', type=int, default=None,
+        help='Shard size of the channel dimension (0: single shard).')
+    parser.add_argument(
+        '--max-workers', type=int, default=1,
+        help='Number of chunks copied concurrently.')
+
+    args = args or sys.argv[1:]
+    args = parser.parse_args(args)
+
+    migrate(
+        args.input, args.output,
+        shard=args.shard,
+        shard_time=args.shard_time,
+        shard_channel=args.shard_channel,
+        max_workers=args.max_workers,
+    )
@@ -1,13 +1,18 @@
 import argparse
+import base64
 import io
+import itertools
 import json
 import math
 import re
 import sys
 import warnings
 from argparse import ArgumentDefaultsHelpFormatter
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
 from typing import (
-    Literal, Union, List, Optional, Callable, Generator, Any, Tuple
+    Literal, Union, List, Optional, Callable, Generator, Any, Tuple, Sequence
 )
 
 import nibabel as nib
@@ -18,14 +23,24 @@ from nibabel.nifti2 import Nifti2Header, Nifti2Image
 from numpy import ndarray
 from skimage.transform import pyramid_gaussian, pyramid_laplacian
 
+from ._codecs import (
+    _make_codecs, _candidate_codecs, _measure_codecs, _sample_chunks
+)
 from ._compat import (
     _make_compressor, _open_zarr, _create_array, _load_nifti_from_stream,
+    _consolidate, _empty_chunks_policy, _resize,
     pyzarr_version
 )
 from ._header import (
     UNITS, DTYPES, INTENTS, INTENTS_P, SLICEORDERS, XFORMS,
     bin2nii, get_magic_string, SYS_BYTEORDER, JNIFTI_ZARR,
-    SYS_BYTEORDER_SWAPPED
+    SYS_BYTEORDER_SWAPPED, bin2nii_many, _stack_headers
+)
+from ._labels import (
+    _concat_rows, _label_rows, _refresh_label_index, _write_label_index
+)
+from ._stats import (
+    _PyramidStats, _has_stats, _histogram_edges, _refresh_stats
 )
 
 try:
@@ -34,7 +49,8 @@ except ImportError:
     pass
 
 def nii2json(header: Union[Nifti1Header, Nifti2Header, ndarray],
-             extensions: bool = False) -> dict:
+             extensions: bool = False,
+             intensity_range: Optional[Tuple[float, float]] = None) -> dict:
     """
     Convert a nifti header to a JSON serializable dictionary.
 
@@ -44,6 +60,10 @@ def nii2json(header: Union[Nifti1Header, Nifti2Header, ndarray],
         Nifti header object.
     extensions : bool, optional
         Whether nifti extensions are present.
+    intensity_range : (float, float), optional
+        Minimum and maximum intensities of the data, used for
+        `MinIntensity` and `MaxIntensity` if `cal_min` and `cal_max`
+        are both zero.
 
     Returns
     -------
@@ -121,6 +141,11 @@ def nii2json(header: Union[Nifti1Header, Nifti2Header, ndarray],
         jsonheader["ScaleSlope"] = 0.0
     if not math.isfinite(jsonheader["ScaleOffset"]):
         jsonheader["ScaleOffset"] = 0.0
+    if intensity_range is not None \
+            and all(map(math.isfinite, intensity_range)) \
+            and jsonheader["MinIntensity"] == jsonheader["MaxIntensity"] == 0:
+        jsonheader["MinIntensity"] = float(intensity_range[0])
+        jsonheader["MaxIntensity"] = float(intensity_range[1])
 
     if nii_version == 1:
         unused_fields = {
@@ -154,6 +179,191 @@ def nii2json(header: Union[Nifti1Header, Nifti2Header, ndarray],
     return jsonheader
 
 
+def _map_unique(values: ndarray, fn: Callable) -> ndarray:
+    """Apply `fn` to each unique value of an array (object output)."""
+    unique, inverse = np.unique(values, return_inverse=True)
+    mapped = np.empty(len(unique), dtype=object)
+    mapped[:] = [fn(value) for value in unique.tolist()]
+    return mapped[inverse.reshape(-1)]
+
+
+def _clean_string(value: bytes) -> str:
+    return re.sub(r'[\n\r\t\00]*', '', value.decode())
+
+
+def nii2json_many(
+        headers: Union[Sequence[Union[bytes, Nifti1Header, Nifti2Header]],
+                       ndarray],
+        extensions: Optional[Union[bool, Sequence[bool]]] = None,
+        columnar: bool = False,
+) -> Union[List[dict], dict]:
+    """
+    Convert many nifti headers to JSON form in one vectorized pass.
+
+    The result is identical to calling `nii2json` on each header, but
+    headers are parsed into a single structured array (`bin2nii_many`)
+    and each field is converted for all headers at once.
+
+    Parameters
+    ----------
+    headers : list[bytes | Nifti1Header | Nifti2Header] | ndarray
+        Binary headers (nifti-1 and/or nifti-2, any byte order), nibabel
+        headers, or the output of `bin2nii_many`.
+    extensions : bool | list[bool], optional
+        Whether nifti extensions are present. By default, read from the
+        extension flag that follows binary headers (if present), or from
+        nibabel headers.
+    columnar : bool, optional
+        If True, return a dictionary of columns (one array of length N
+        per key, with nested keys joined by "."), instead of a list of
+        dictionaries.
+
+    Returns
+    -------
+    list[dict] | dict[str, ndarray]
+        Nifti headers in JSON form following JNIfTI specification.
+    """
+    flags = None
+    if isinstance(headers, ndarray) and headers.dtype.names:
+        header = headers
+    else:
+        headers = list(headers)
+        if headers and isinstance(headers[0], (Nifti1Header, Nifti2Header)):
+            flags = [len(h.extensions) != 0 for h in headers]
+            headers = [h.structarr.tobytes() for h in headers]
+        raw, length = _stack_headers(headers)
+        header = bin2nii_many(raw)
+        if flags is None:
+            offset = header["sizeof_hdr"].astype(int)
+            has_flag = length >= offset + 4
+            flags = has_flag & (raw[np.arange(len(raw)),
+                                    np.minimum(offset, raw.shape[1] - 1)] != 0)
+    if extensions is None:
+        extensions = flags if flags is not None else False
+    extensions = np.broadcast_to(np.asarray(extensions, dtype=bool),
+                                 [len(header)])
+
+    nb = len(header)
+    ndim = header["dim"][:, 0]
+    is_nii1 = header["sizeof_hdr"] == 348
+    intent = _map_unique(header["intent_code"], INTENTS.__getitem__)
+    nb_params = np.array([INTENTS_P[code] for code in intent.tolist()],
+                         dtype=int)
+    vox_offset = header["vox_offset"].astype(object)
+    vox_offset[~is_nii1] = header["vox_offset"][~is_nii1].astype(int)
+    scl_slope = header["scl_slope"].copy()
+    scl_slope[~np.isfinite(scl_slope)] = 0
+    scl_inter = header["scl_inter"].copy()
+    scl_inter[~np.isfinite(scl_inter)] = 0
+
+    def params(k):
+        values = header["intent_p"][:, k].astype(object)
+        values[nb_params <= k] = None
+        return values
+
+    def ragged(field):
+        values = np.empty(nb, dtype=object)
+        values[:] = [row[1:1 + n] for row, n in
+                     zip(header[field].tolist(), ndim.tolist())]
+        return values
+
+    def decode(field):
+        return _map_unique(header[field], _clean_string)
+
+    def first(column, value):
+        # fields that only exist in nifti-1 headers
+        column = column.astype(object)
+        column[~is_nii1] = value
+        return column
+
+    columns = {
+        "NIIHeaderSize": header["sizeof_hdr"],
+        "DimInfo.Freq": header["dim_info"] & 0x03,
+        "DimInfo.Phase": (header["dim_info"] >> 2) & 0x03,
+        "DimInfo.Slice": (header["dim_info"] >> 4) & 0x03,
+        "Dim": ragged("dim"),
+        "Param1": params(0),
+        "Param2": params(1),
+        "Param3": params(2),
+        "Intent": intent,
+        "DataType": _map_unique(header["datatype"], DTYPES.__getitem__),
+        "BitDepth": header["bitpix"],
+        "FirstSliceID": header["slice_start"],
+        "VoxelSize": ragged("pixdim"),
+        "Orientation.x": np.where(header["pixdim"][:, 0] == 0, "r", "l"),
+        "Orientation.y": np.full(nb, "a"),
+        "Orientation.z": np.full(nb, "s"),
+        "NIIByteOffset": vox_offset,
+        "ScaleSlope": scl_slope,
+        "ScaleOffset": scl_inter,
+        "LastSliceID": header["slice_end"],
+        "SliceType": _map_unique(header["slice_code"],
+                                 SLICEORDERS.__getitem__),
+        "Unit.L": _map_unique(header["xyzt_units"] & 0x07,
+                              UNITS.__getitem__),
+        "Unit.T": _map_unique(header["xyzt_units"] & 0x38,
+                              UNITS.__getitem__),
+        "MaxIntensity": header["cal_max"],
+        "MinIntensity": header["cal_min"],
+        "SliceTime": header["slice_duration"],
+        "TimeOffset": header["toffset"],
+        "Description": decode("descrip"),
+        "AuxFile": decode("aux_file"),
+        "QForm": _map_unique(header["qform_code"], XFORMS.__getitem__),
+        "SForm": _map_unique(header["sform_code"], XFORMS.__getitem__),
+        "Quatern.b": header["quatern"][:, 0],
+        "Quatern.c": header["quatern"][:, 1],
+        "Quatern.d": header["quatern"][:, 2],
+        "QuaternOffset.x": header["qoffset"][:, 0],
+        "QuaternOffset.y": header["qoffset"][:, 1],
+        "QuaternOffset.z": header["qoffset"][:, 2],
+        "Affine": header["sform"],
+        "Name": decode("intent_name"),
+        "NIFTIExtension": [[int(flag), 0, 0, 0]
+                           for flag in extensions.tolist()],
+        # `nii2json` decodes the bytes of the (integer) datatype field
+        "A75DataTypeName": first(_map_unique(
+            header["datatype"],
+            lambda code: _clean_string(int(code).to_bytes(2, "little"))
+        ), ""),
+        "A75DBName": first(decode("db_name"), ""),
+        "A75Extends": first(header["extents"], 0),
+        "A75SessionError": first(header["session_error"], 0),
+        "A75Regular": first(header["regular"], 0),
+        "A75GlobalMax": first(header["glmax"], 0),
+        "A75GlobalMin": first(header["glmin"], 0),
+    }
+    columns["NIIFormat"] = _map_unique(
+        header["magic"],
+        lambda magic: _clean_string(
+            re.sub(rb'[\x00-\x1f]+', b'', magic))
+    )
+    # same key order as `nii2json`
+    order = list(columns)
+    order.insert(order.index("NIFTIExtension"),
+                 order.pop(order.index("NIIFormat")))
+    columns = {key: columns[key] for key in order}
+    if columnar:
+        return {key: np.asarray(value) for key, value in columns.items()}
+
+    # list of dictionaries
+    keys = [key.split(".") for key in columns]
+    values = [
+        value.tolist() if isinstance(value, ndarray) else value
+        for value in columns.values()
+    ]
+    jsonheaders = []
+    for row in zip(*values):
+        jsonheader = {}
+        for key, value in zip(keys, row):
+            if len(key) == 1:
+                jsonheader[key[0]] = value
+            else:
+                jsonheader.setdefault(key[0], {})[key[1]] = value
+        jsonheaders.append(jsonheader)
+    return jsonheaders
+
+
 def _make_pyramid3d(
         data3d: np.ndarray,
         nb_levels: int,
@@ -221,6 +431,443 @@ def _make_pyramid3d(
         yield np.stack(level).reshape(batch + level[0].shape)
 
 
+def _expand_level_sizes(
+        size: Union[int, Tuple[int], List[Tuple[int]]]
+) -> List[Tuple[int]]:
+    """
+    Expand a chunk or shard specification into one 3-tuple per level.
+
+    Parameters
+    ----------
+    size : int | tuple[int] | list[tuple[int]]
+        Spatial size, in NIfTI order (x, y, z). A list of tuples
+        specifies one size per pyramid level; the last entry is reused
+        for any remaining level.
+
+    Returns
+    -------
+    list[tuple[int]]
+        Spatial size of each specified level, in NIfTI order.
+    """
+    if isinstance(size, (list, tuple)) and size and \
+            all(isinstance(s, (list, tuple)) for s in size):
+        return [_expand_level_sizes(s)[0] for s in size]
+    size = tuple(size) if isinstance(size, (list, tuple)) else (size,)
+    size = size + size[-1:] * max(0, 3 - len(size))
+    return [tuple(size[:3])]
+
+
+def _level_chunk(
+        shape: Tuple[int],
+        chunk: Tuple[int],
+        chunk_mode: Literal["fixed", "bytes"] = "fixed",
+) -> Tuple[int]:
+    """
+    Compute the spatial chunk size of a pyramid level.
+
+    Parameters
+    ----------
+    shape : tuple[int]
+        Spatial shape of the level, in Zarr order (z, y, x).
+    chunk : tuple[int]
+        Requested spatial chunk size, in Zarr order (z, y, x).
+    chunk_mode : {"fixed", "bytes"}
+        If "fixed", `chunk` is returned as is.
+        If "bytes", the chunk is clipped to the level shape and then
+        doubled along the axes that still span several chunks, so that
+        the number of voxels per chunk stays close to that of `chunk`.
+
+    Returns
+    -------
+    tuple[int]
+        Spatial chunk size, in Zarr order (z, y, x).
+    """
+    if chunk_mode == "fixed":
+        return tuple(chunk)
+    if chunk_mode != "bytes":
+        raise ValueError(f"Unknown chunk mode {chunk_mode}")
+    budget = int(np.prod(chunk))
+    level_chunk = [min(c, n) for c, n in zip(chunk, shape)]
+    while int(np.prod(level_chunk)) * 2 <= budget:
+        growable = [i for i in range(len(shape)) if level_chunk[i] < shape[i]]
+        if not growable:
+            break
+        i = min(growable, key=lambda i: level_chunk[i])
+        level_chunk[i] = min(level_chunk[i] * 2, shape[i])
+    return tuple(level_chunk)
+
+
+def _level_shard(
+        shape: Tuple[int],
+        chunk: Tuple[int],
+        shard: Tuple[int],
+        level_chunk: Tuple[int],
+) -> Tuple[int]:
+    """
+    Compute the spatial shard size of a pyramid level.
+
+    The number of chunks per shard along each axis is taken from the
+    requested (`chunk`, `shard`) pair, and capped by the number of
+    chunks needed to cover the level, so that shards of coarse levels
+    do not extend far beyond the array.
+
+    Parameters
+    ----------
+    shape : tuple[int]
+        Spatial shape of the level, in Zarr order (z, y, x).
+    chunk, shard : tuple[int]
+        Requested spatial chunk and shard sizes, in Zarr order.
+    level_chunk : tuple[int]
+        Spatial chunk size of the level, in Zarr order.
+
+    Returns
+    -------
+    tuple[int]
+        Spatial shard size, in Zarr order (z, y, x).
+    """
+    return tuple(
+        lc * min(max(1, s // c), int(math.ceil(n / lc)))
+        for n, c, s, lc in zip(shape, chunk, shard, level_chunk)
+    )
+
+
+def _pyramid_shapes(
+        shape: Tuple[int],
+        nb_levels: int,
+        no_pyramid_axis: Optional[Union[str, int]] = None,
+) -> List[Tuple[int]]:
+    """
+    Compute the shape of each pyramid level without computing the pyramid.
+
+    Parameters
+    ----------
+    shape : tuple[int]
+        Shape of the finest level, in Zarr order (..., z, y, x).
+    nb_levels : int
+        Number of pyramid levels.
+    no_pyramid_axis : Optional[Union[str, int]], optional
+        The axis that should not be downsampled.
+
+    Returns
+    -------
+    list[tuple[int]]
+        Shape of each level, in Zarr order. As in `_make_pyramid3d`,
+        the pyramid stops early if a level has the same shape as the
+        previous one.
+    """
+    no_pyramid_axis = {
+        'x': 2,
+        'y': 1,
+        'z': 0,
+    }.get(no_pyramid_axis, no_pyramid_axis)
+    if isinstance(no_pyramid_axis, str):
+        no_pyramid_axis = int(no_pyramid_axis)
+
+    batch, nxyz = tuple(shape[:-3]), tuple(shape[-3:])
+    shapes = [batch + nxyz]
+    for _ in range(nb_levels - 1):
+        prev_nxyz, nxyz = nxyz, tuple(
+            n if i == no_pyramid_axis else int(math.ceil(n / 2))
+            for i, n in enumerate(nxyz)
+        )
+        if nxyz == prev_nxyz:
+            break
+        shapes.append(batch + nxyz)
+    return shapes
+
+
+def _iter_batch_blocks(
+        batch_shape: Tuple[int],
+        block_shape: Tuple[int],
+        offset: Tuple[int] = (),
+) -> Generator[Tuple[slice], None, None]:
+    """
+    Iterate over blocks of the batch (time, channel) dimensions.
+
+    Parameters
+    ----------
+    batch_shape : tuple[int]
+        Shape of the batch dimensions.
+    block_shape : tuple[int]
+        Size of a block along each batch dimension.
+    offset : tuple[int]
+        Position of the first element in the stored array. Blocks are
+        aligned with the block grid of the stored array.
+
+    Yields
+    ------
+    tuple[slice]
+        Slicer of the block, relative to the first element. A single
+        empty slicer is yielded when there is no batch dimension.
+    """
+    offset = tuple(offset) + (0,) * (len(batch_shape) - len(offset))
+
+    def axis_blocks(n, b, o):
+        start = 0
+        while start < n:
+            stop = min(n, ((start + o) // b + 1) * b - o)
+            yield slice(start, stop)
+            start = stop
+
+    ranges = [
+        list(axis_blocks(n, b, o))
+        for n, b, o in zip(batch_shape, block_shape, offset)
+    ]
+    yield from itertools.product(*ranges)
+
+
+class _LazyVolume:
+    """
+    Unscaled voxels of a nifti image, read from its data object on
+    demand.
+
+    Indexing with integers and slices only reads the selected region
+    (e.g., one block of timepoints) from the data object, so that the
+    image never needs to be loaded in full.
+
+    Parameters
+    ----------
+    dataobj : ArrayProxy | np.ndarray
+        Data object of the image, in nifti order.
+    perm : list[int], optional
+        Nifti axis of each axis of the volume.
+    """
+
+    def __init__(self, dataobj: Any,
+                 perm: Optional[Sequence[int]] = None) -> None:
+        self.dataobj = dataobj
+        self.perm = list(range(len(dataobj.shape)) if perm is None
+                         else perm)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(self.dataobj.shape[i] for i in self.perm)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.perm)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.dataobj.dtype)
+
+    def transpose(self, perm: Sequence[int]) -> "_LazyVolume":
+        return _LazyVolume(self.dataobj, [self.perm[i] for i in perm])
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (self.ndim - len(key))
+        # selection in nifti order
+        slicer = [slice(None)] * self.ndim
+        for k, i in zip(key, self.perm):
+            slicer[i] = k
+        slicer = tuple(slicer)
+        if hasattr(self.dataobj, "_get_unscaled"):
+            # nibabel ArrayProxy
+            data = self.dataobj._get_unscaled(slicer)
+        else:
+            data = self.dataobj[slicer]
+        # nifti order -> order of the volume (on axes that are not dropped)
+        kept = [i for i in range(self.ndim) if isinstance(slicer[i], slice)]
+        order = [kept.index(i) for k, i in zip(key, self.perm)
+                 if isinstance(k, slice)]
+        return np.asarray(data).transpose(order)
+
+
+def _infer_fill_value(data: np.ndarray) -> Optional[Union[int, float]]:
+    """
+    Background value of a volume: the most frequent (finite) value on
+    the faces of its spatial dimensions, if it covers at least half of
+    them, else 0.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Volume, in Zarr order (..., z, y, x).
+
+    Returns
+    -------
+    number or None
+        Fill value, or None if the data type does not have one
+        (e.g., RGB).
+    """
+    if data.dtype.fields is not None:
+        return None
+    faces = []
+    for axis in range(data.ndim - 3, data.ndim):
+        index = (slice(None),) * axis
+        faces += [data[index + (0,)].ravel(), data[index + (-1,)].ravel()]
+    faces = np.concatenate(faces)
+    if faces.dtype.kind in "fc":
+        faces = faces[np.isfinite(faces)]
+    if faces.size == 0:
+        return np.zeros([], dtype=data.dtype).item()
+    values, counts = np.unique(faces, return_counts=True)
+    if counts.max() * 2 < faces.size:
+        return np.zeros([], dtype=data.dtype).item()
+    return values[counts.argmax()].item()
+
+
+def _count_empty_chunks(
+        data: np.ndarray,
+        chunks: Tuple[int],
+        fill_value: Any,
+) -> Tuple[int, int]:
+    """
+    Count the chunks of a block that only contain the fill value.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Block, aligned with chunks, with the data type of the array.
+    chunks : tuple[int]
+        Chunk shape.
+    fill_value : number
+        Fill value of the array.
+
+    Returns
+    -------
+    nb_chunks : int
+        Number of chunks in the block.
+    nb_empty : int
+        Number of chunks that only contain the fill value.
+    """
+    isnan = isinstance(fill_value, float) and math.isnan(fill_value)
+    ranges = [range(math.ceil(n / c)) for n, c in zip(data.shape, chunks)]
+    nb_chunks = nb_empty = 0
+    for index in itertools.product(*ranges):
+        chunk = data[tuple(slice(i * c, (i + 1) * c)
+                           for i, c in zip(index, chunks))]
+        nb_chunks += 1
+        nb_empty += bool(np.all(np.isnan(chunk) if isnan
+                                else chunk == fill_value))
+    return nb_chunks, nb_empty
+
+
+def _pyramid_block(
+        block: np.ndarray,
+        nb_levels: int,
+        pyramid_fn: Callable = pyramid_gaussian,
+        label: bool = False,
+        no_pyramid_axis: Optional[Union[str, int]] = None,
+) -> List[np.ndarray]:
+    """Compute all pyramid levels of a block (picklable worker)."""
+    return list(_make_pyramid3d(block, nb_levels, pyramid_fn, label,
+                                no_pyramid_axis))
+
+
+def _write_pyramid(
+        omz: zarr.Group,
+        data: np.ndarray,
+        nb_levels: int,
+        pyramid_fn: Callable = pyramid_gaussian,
+        label: bool = False,
+        no_pyramid_axis: Optional[Union[str, int]] = None,
+        block_shape: Tuple[int] = (),
+        max_workers: int = 1,
+        parallel: Literal['thread', 'process'] = 'thread',
+        offset: Tuple[int] = (),
+        stats: Optional[_PyramidStats] = None,
+        write_empty_chunks: bool = False,
+        empty_chunks: Optional[List[dict]] = None,
+        label_rows: Optional[List[dict]] = None,
+) -> None:
+    """
+    Compute the pyramid of each batch block and write it to its slice.
+
+    Timepoints and channels are processed independently, so that memory
+    scales with the number of blocks in flight rather than with the
+    number of volumes.
+
+    Parameters
+    ----------
+    omz : zarr.Group
+        Zarr group whose level arrays ("0", "1", ...) already exist.
+    data : np.ndarray
+        Finest level, in Zarr order (..., z, y, x).
+    nb_levels : int
+        Number of pyramid levels.
+    pyramid_fn : Callable, optional
+        Function to generate pyramid levels.
+    label : bool, optional
+        Whether the data is a label volume.
+    no_pyramid_axis : Optional[Union[str, int]], optional
+        The axis that should not be downsampled.
+    block_shape : tuple[int]
+        Size of a block along each batch dimension. Blocks should be
+        aligned with chunks (or shards), so that concurrent blocks never
+        write into the same stored object.
+    max_workers : int
+        Number of blocks processed concurrently.
+    parallel : {'thread', 'process'}
+        Type of worker pool used when `max_workers > 1`.
+    offset : tuple[int]
+        Position of `data` along the batch dimensions of the arrays.
+    stats : _PyramidStats, optional
+        Accumulator of the per-chunk statistics of each level, which is
+        updated as blocks are written.
+    write_empty_chunks : bool
+        Store chunks that only contain the fill value of the array.
+    empty_chunks : list[dict], optional
+        Counters of each level (keys "chunks" and "skipped"), which are
+        incremented with the number of chunks written and of chunks
+        skipped because they only contain the fill value.
+    label_rows : list[dict], optional
+        Rows of the label index of the finest level, which are appended
+        for each block written (see `_label_rows`).
+    """
+    offset = tuple(offset) + (0,) * (data.ndim - 3 - len(offset))
+    arrays = [_empty_chunks_policy(omz[str(i)], write_empty_chunks)
+              for i in range(nb_levels)]
+
+    def write(slicer, levels):
+        out_slicer = tuple(
+            slice(s.start + o, s.stop + o) for s, o in zip(slicer, offset)
+        )
+        for i, level in enumerate(levels):
+            arrays[i][out_slicer] = level
+            if stats is not None:
+                stats.update(i, out_slicer, level)
+            if empty_chunks is not None:
+                nb_chunks, nb_empty = _count_empty_chunks(
+                    np.asarray(level, dtype=arrays[i].dtype),
+                    arrays[i].chunks, arrays[i].fill_value)
+                empty_chunks[i]["chunks"] += nb_chunks
+                empty_chunks[i]["skipped"] += nb_empty
+        if label_rows is not None:
+            chunks = arrays[0].chunks
+            label_rows.append(_label_rows(
+                np.asarray(levels[0], dtype=data.dtype), chunks,
+                [s.start // c for s, c in zip(out_slicer, chunks)]))
+
+    args = (nb_levels, pyramid_fn, label, no_pyramid_axis)
+    blocks = _iter_batch_blocks(data.shape[:-3], block_shape, offset)
+    if max_workers <= 1:
+        for slicer in blocks:
+            write(slicer, _pyramid_block(data[slicer], *args))
+        return
+
+    if parallel == 'thread':
+        Executor = ThreadPoolExecutor
+    elif parallel == 'process':
+        Executor = ProcessPoolExecutor
+    else:
+        raise ValueError('Unknown parallel backend', parallel)
+    with Executor(max_workers) as executor:
+        pending = {}
+        for slicer in blocks:
+            future = executor.submit(_pyramid_block, data[slicer], *args)
+            pending[future] = slicer
+            # bound the number of pyramids held in memory
+            if len(pending) >= 2 * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(pending.pop(future), future.result())
+        for future in wait(pending)[0]:
+            write(pending.pop(future), future.result())
+
+
 def write_ome_metadata(
     omz: zarr.Group,
     axes: List[str],
@@ -370,11 +1017,104 @@ def write_ome_metadata(
         raise ValueError(f"Unsupported ome_version {ome_version}")
 
 
+def _update_niizarr_attrs(omz: zarr.Group, **attrs: Any) -> None:
+    """
+    Update the `niizarr` entry of the group attributes.
+
+    This entry holds implementation-specific metadata (e.g., how the
+    data was compressed), which is not part of the NIfTI-Zarr
+    specification.
+
+    Parameters
+    ----------
+    omz : zarr.Group
+        Zarr group to write metadata
+    **attrs
+        Keys to set in the `niizarr` entry.
+    """
+    niizarr_attrs = dict(omz.attrs.get("niizarr", {}))
+    niizarr_attrs.update(attrs)
+    omz.attrs["niizarr"] = niizarr_attrs
+
+
+def _select_codecs(
+        data: np.ndarray,
+        chunks: Tuple[int],
+        dtype: Any,
+        objective: Literal['size', 'speed', 'balanced'] = 'balanced',
+        nb_samples: int = 8,
+) -> Tuple[str, dict]:
+    """
+    Select a codec pipeline by compressing a sample of chunks.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Array, in Zarr order.
+    chunks : tuple[int]
+        Chunk shape, in Zarr order.
+    dtype : np.dtype
+        Data type in which the array is stored.
+    objective : {'size', 'speed', 'balanced'}
+        Selection criterion.
+    nb_samples : int
+        Number of chunks to sample.
+
+    Returns
+    -------
+    codecs : str
+        Selected codec pipeline.
+    selection : dict
+        Objective, selected pipeline and measurements of all candidates.
+    """
+    dtype = np.dtype(dtype)
+    samples = [
+        sample.astype(dtype)
+        for sample in _sample_chunks(data, chunks, nb_samples)
+    ]
+    results = _measure_codecs(samples, _candidate_codecs(dtype))
+    if objective == 'size':
+        best = max(results, key=lambda r: r['ratio'])
+    elif objective == 'speed':
+        best = min(results, key=lambda r: r['decode_time'])
+    elif objective == 'balanced':
+        best = max(results, key=lambda r: r['ratio'] / r['decode_time'])
+    else:
+        raise ValueError('Unknown objective', objective)
+    selection = {
+        'objective': objective,
+        'codecs': best['codecs'],
+        'nb_samples': len(samples),
+        'candidates': results,
+    }
+    return best['codecs'], selection
+
+
 def write_nifti_header(
         omz: zarr.Group,
-        header: Union[Nifti1Header, Nifti2Header]
+        header: Union[Nifti1Header, Nifti2Header],
+        header_in_attrs: bool = False,
+        intensity_range: Optional[Tuple[float, float]] = None,
 ) -> None:
-    jsonheader = nii2json(header)
+    """
+    Write the binary and JSON nifti headers of a nifti-zarr.
+
+    Parameters
+    ----------
+    omz : zarr.Group
+        Zarr group to write the header to
+    header : Nifti1Header | Nifti2Header
+        Nifti header
+    header_in_attrs : bool, optional
+        Also store the binary header, base64-encoded, in the `niizarr`
+        entry of the group attributes, so that readers get it along with
+        the group metadata instead of fetching the `nifti` array.
+    intensity_range : (float, float), optional
+        Minimum and maximum intensities of the data, which fill the
+        JSON `MinIntensity` and `MaxIntensity` if the header does not
+        set them (see `nii2json`).
+    """
+    jsonheader = nii2json(header, intensity_range=intensity_range)
     # Write nifti header (binary)
     stream = io.BytesIO()
     header.write_to(stream)
@@ -394,20 +1134,55 @@ def write_nifti_header(
         overwrite=True,
     )
     omz['nifti'][:] = bin_data
+    if header_in_attrs:
+        _write_header_attrs(omz, bin_data.tobytes())
 
     # Write nifti header (JSON)
     omz['nifti'].attrs.update(jsonheader)
     return
 
 
+def _write_header_attrs(omz: zarr.Group, buffer: bytes) -> None:
+    """Store a base64-encoded copy of the binary nifti header."""
+    _update_niizarr_attrs(
+        omz, nifti_header=base64.b64encode(buffer).decode("ascii"))
+
+
+def _read_nifti_header(omz: zarr.Group) -> Optional[bytes]:
+    """
+    Read the binary nifti header of a nifti-zarr.
+
+    The copy embedded in the group attributes (see `write_nifti_header`)
+    is preferred, as it does not require any request. Otherwise, the
+    `nifti` array is read.
+
+    Parameters
+    ----------
+    omz : zarr.Group
+        Nifti-zarr group.
+
+    Returns
+    -------
+    bytes or None
+        Binary header, or None if the group does not have one.
+    """
+    encoded = omz.attrs.get("niizarr", {}).get("nifti_header", None)
+    if encoded is not None:
+        return base64.b64decode(encoded)
+    if "nifti" not in omz:
+        return None
+    return np.asarray(omz["nifti"]).tobytes()
+
+
 def nii2zarr(
         inp: Union[Nifti1Image, Nifti2Image, Any],
         out: Union[str, Any],
         *,
-        chunk: Union[int, Tuple[int]] = 64,
+        chunk: Union[int, Tuple[int], List[Tuple[int]]] = 64,
         chunk_channel: int = 1,
         chunk_time: int = 1,
-        shard: Optional[Union[int, Tuple[int]]] = None,
+        chunk_mode: Literal['fixed', 'bytes'] = 'fixed',
+        shard: Optional[Union[int, Tuple[int], List[Tuple[int]]]] = None,
         shard_channel: Optional[int] = None,
         shard_time: Optional[int] = None,
         nb_levels: int = -1,
@@ -415,11 +1190,20 @@ def nii2zarr(
         label: Optional[bool] = None,
         no_time: bool = False,
         no_pyramid_axis: Optional[Union[str, int]] = None,
-        fill_value: Optional[Union[int, float, complex]] = None,
-        compressor: Literal['blosc', 'zlib'] = 'blosc',
+        fill_value: Optional[Union[int, float, complex, Literal['auto']]] = None,
+        write_empty_chunks: bool = False,
+        compressor: Literal['blosc', 'zlib', 'auto'] = 'blosc',
         compressor_options: dict = {},
+        auto_objective: Literal['size', 'speed', 'balanced'] = 'balanced',
+        codecs: Optional[Union[str, dict, List[Union[str, dict]]]] = None,
         zarr_version: Literal[2, 3] = 3,
         ome_version: Literal["auto", "0.4", "0.5"] = "auto",
+        max_workers: int = 1,
+        parallel: Literal['thread', 'process'] = 'thread',
+        consolidated: bool = True,
+        header_in_attrs: bool = False,
+        stats: bool = False,
+        label_index: Optional[bool] = None,
         validate: bool = False,
 ) -> None:
     """
@@ -432,18 +1216,28 @@ def nii2zarr(
     out : zarr.Store, zarr.Group or path
         Output zarr object/path.
         If object, it must be opened with "w" capability.
-    chunk : int or tuple of int, optional
+    chunk : int or tuple of int or list of tuple of int, optional
         Chunk size for spatial dimensions.
         The tuple allows different chunk sizes to be used along each dimension.
+        A list of tuples allows different chunk sizes to be used at each
+        pyramid level (the last one is used for all remaining levels).
     chunk_channel : int, optional
         Chunk size of the channel dimension. If 0, combine all channels
         in a single chunk.
     chunk_time : int, optional
         Chunk size for the time dimension. If 0, combine all timepoints
         in a single chunk.
-    shard : int or tuple of int, optional
+    chunk_mode : {'fixed', 'bytes'}, optional
+        How the spatial chunk size of coarser levels is chosen.
+        If 'fixed', use `chunk` at every level.
+        If 'bytes', clip the chunk to the shape of each level and enlarge
+        it along the other axes, so that the number of voxels per chunk
+        stays roughly constant. Shards are adapted accordingly.
+    shard : int or tuple of int or list of tuple of int, optional
         Shard size for spatial dimensions.
         The tuple allows different shard sizes to be used along each dimension.
+        A list of tuples allows different shard sizes to be used at each
+        pyramid level (the last one is used for all remaining levels).
     shard_channel : int, optional
         Shard size of the channel dimension. If 0, combine all channels
         in a single shard.
@@ -464,18 +1258,75 @@ def nii2zarr(
     no_pyramid_axis : {'x', 'y', 'z'}
         Axis that should not be downsampled. If None, downsample
         across all three dimensions.
-    fill_value : number
-        Value to use for missing tiles
-    compressor : {'blosc', 'zlib'}
-        Compression to use
+    fill_value : number or 'auto'
+        Value to use for missing tiles.
+        If 'auto', use the background value of the volume: the most
+        frequent value on its faces (if it covers at least half of
+        them), else 0.
+    write_empty_chunks : bool, optional
+        Store chunks that only contain the fill value. By default,
+        they are skipped (if there is a fill value). The number of
+        skipped chunks and the (uncompressed) bytes saved at each level
+        are recorded in the group attributes, under
+        `niizarr.empty_chunks`.
+    compressor : {'blosc', 'zlib', 'auto'}
+        Compression to use.
+        If 'auto', compress a random sample of level-0 chunks with a set
+        of candidate pipelines and use the best one for `auto_objective`.
+        The decision and measurements are stored in the group attributes,
+        under `niizarr.compression`.
     compressor_options : dict, optional
         Options for the compressor.
+    auto_objective : {'size', 'speed', 'balanced'}, optional
+        Criterion used by `compressor='auto'`: smallest output ('size'),
+        fastest decoding ('speed') or largest product of compression ratio
+        and decoding throughput ('balanced').
+    codecs : str | dict | list[str | dict], optional
+        Codec pipeline, which overrides `compressor` if provided.
+        Stages are applied in order, from the array values to the stored
+        bytes, and are separated by "+" in string form. Options follow
+        a ":" as comma-separated "key=value" pairs, e.g.
+        "delta+shuffle+zstd:level=5" or
+        "blosc:cname=zstd,clevel=5,shuffle=bitshuffle".
+        Filters: "delta" (integers), "shuffle", "bitround" (floats, lossy,
+        requires `keepbits`). Compressors: "blosc", "zstd", "zlib",
+        "gzip", "lz4".
     zarr_version : {2, 3}, optional
         Zarr format version. Default: 3. Falls back to 2 if zarr-python < 3 is installed.
     ome_version : {"auto", "0.4", "0.5"}, optional
         OME-Zarr version. Default: "auto", which selects the most recent
         version compatible with `zarr_version` ("0.5" for Zarr v3, "0.4" for
         Zarr v2).
+    max_workers : int, optional
+        Number of timepoints/channels (or blocks of timepoints/channels,
+        when they share a chunk or shard) whose pyramid is computed
+        concurrently. Each block is written to its slice of every level
+        as soon as it is ready.
+    parallel : {'thread', 'process'}, optional
+        Type of worker pool used when `max_workers > 1`.
+    consolidated : bool, optional
+        Write consolidated metadata (`.zmetadata` in Zarr v2, embedded
+        in the group `zarr.json` in Zarr v3), so that the group and all
+        its arrays can be opened with a single request.
+    header_in_attrs : bool, optional
+        Also store the binary nifti header, base64-encoded, in the group
+        attributes (`niizarr.nifti_header`). Readers then do not need to
+        fetch the `nifti` array. This is not part of the NIfTI-Zarr
+        specification: the `nifti` array is always written.
+    stats : bool, optional
+        Compute the intensity statistics (min, max, mean, count and
+        histogram) of every chunk of every level while it is written.
+        They are stored in the `stats` subgroup, and the statistics of
+        each level in the group attributes (`niizarr.stats`); see
+        `read_stats`. If the header does not set `cal_min`/`cal_max`,
+        the range of the data is used for the JSON `MinIntensity` and
+        `MaxIntensity`.
+    label_index : bool, optional
+        Index the chunks of the finest level that contain each
+        (non-zero) label, with the bounding box of the label in each
+        chunk, so that `read_label` only fetches these chunks. The
+        index is stored in the `label_index` subgroup. By default, it
+        is built for label volumes.
     validate : bool, optional
         Validate the Zarr with the `ome-zarr-models` package.
 
@@ -528,9 +1379,8 @@ def nii2zarr(
     nbheader = inp.header
     if no_time and len(inp.shape) > 3 and inp.shape[3] != 1:
         # add singleton time dimension
-        nbheader = Nifti1Image(
-            inp.dataobj[:, :, :, None], inp.affine, inp.header
-        ).header
+        nbheader = inp.header.copy()
+        nbheader.set_data_shape(inp.shape[:3] + (1,) + inp.shape[3:])
 
     # nibabel consumed these two values
     if hasattr(inp.dataobj, "_slope") and hasattr(inp.dataobj, "_inter"):
@@ -543,10 +1393,10 @@ def nii2zarr(
     #   or data type.
     jsonheader = nii2json(nbheader)
 
-    if hasattr(inp.dataobj, "get_unscaled"):
-        data = np.asarray(inp.dataobj.get_unscaled())
-    else:
-        data = np.asarray(inp.dataobj)
+    # voxels are read block by block, when they are written
+    data = _LazyVolume(inp.dataobj)
+    if isinstance(fill_value, str) and fill_value == 'auto':
+        fill_value = _infer_fill_value(data)
     if fill_value:
         if np.issubdtype(data.dtype, np.complexfloating):
             fill_value = complex(fill_value)
@@ -606,7 +1456,8 @@ def nii2zarr(
         label = jsonheader['Intent'] in ("label", "neuronames")
     pyramid_fn = pyramid_gaussian if method[0] == 'g' else pyramid_laplacian
 
-    chunksize = np.array((chunk,) * 3 if isinstance(chunk, int) else chunk)
+    chunk = _expand_level_sizes(chunk)
+    chunksize = np.array(chunk[0])
     nxyz = np.array(data.shape[-3:])
 
     if nb_levels == -1:
@@ -614,8 +1465,7 @@ def nii2zarr(
         default_nb_levels = max(default_nb_levels, 1)
         nb_levels = default_nb_levels
 
-    data = list(_make_pyramid3d(data, nb_levels, pyramid_fn, label,
-                                no_pyramid_axis))
+    shapes = _pyramid_shapes(data.shape, nb_levels, no_pyramid_axis)
 
     # Fix data type
     # If nifti was swapped when loading it, we want to swapped it back
@@ -633,37 +1483,132 @@ def nii2zarr(
         data_type = byteorder + data_type
 
     # Prepare array metadata at each level
-    compressor = _make_compressor(compressor, zarr_version=zarr_version,
-                                  **compressor_options)
-
-    chunk = tuple(chunk) if isinstance(chunk, (list, tuple)) else (chunk,)
-    chunk = chunk + chunk[-1:] * max(0, 3 - len(chunk)) + chunk_tc
-    chunk = tuple(chunk[i] for i in perm)
+    if not codecs and compressor == 'auto':
+        level0_chunk = chunk_tc + tuple(chunk[0][::-1])
+        codecs, selection = _select_codecs(
+            data, level0_chunk, data_type, auto_objective
+        )
+        _update_niizarr_attrs(out, compression=selection)
+    if codecs:
+        codecs = _make_codecs(codecs, zarr_version, data_type)
+    else:
+        codecs = {
+            'compressors': _make_compressor(
+                compressor, zarr_version=zarr_version, **compressor_options
+            )
+        }
 
     opts = {
-        'chunks': chunk,
         'dimension_separator': '/',
         'order': 'C',
         'dtype': data_type,
         'fill_value': fill_value,
-        'compressors': compressor,
         'dimension_names': axes,
+        **codecs,
     }
 
     if shard:
-        shard = tuple(shard) if isinstance(shard, (list, tuple)) else (shard,)
-        shard = shard + shard[-1:] * max(0, 3 - len(shard)) + shard_tc
-        shard = tuple(shard[i] for i in perm)
-        opts['shards'] = shard
+        shard = _expand_level_sizes(shard)
+
+    for i, shape in enumerate(shapes):
+        # chunk and shard sizes are specified in nifti order (x, y, z)
+        level_opts = dict(opts)
+        chunk_i = chunk[min(i, len(chunk) - 1)][::-1]
+        level_chunk = _level_chunk(
+            shape[-3:], chunk_i, chunk_mode if i > 0 else 'fixed'
+        )
+        level_opts['chunks'] = chunk_tc + level_chunk
+        if shard:
+            shard_i = shard[min(i, len(shard) - 1)][::-1]
+            if chunk_mode != 'fixed' and i > 0:
+                shard_i = _level_shard(
+                    shape[-3:], chunk_i, shard_i, level_chunk
+                )
+            level_opts['shards'] = shard_tc + tuple(shard_i)
+        _create_array(out, str(i), shape=shape, **level_opts)
+
+    # timepoints/channels are read and written block by block
+    block_shape = shard_tc if shard else chunk_tc
+
+    # per-chunk statistics, computed while the pyramid is written
+    pyramid_stats = None
+    if stats and _has_stats(data.dtype):
+        slope, inter = nbheader.get_slope_inter()
+        slope = 1.0 if slope is None else float(slope)
+        inter = 0.0 if inter is None else float(inter)
+        pyramid_stats = _PyramidStats(
+            [out[str(i)] for i in range(len(shapes))],
+            _histogram_edges(
+                (data[slicer] for slicer in
+                 _iter_batch_blocks(data.shape[:-3], block_shape)),
+                slope, inter),
+            slope, inter,
+        )
+
+    # the label index of the finest level is built as blocks are written
+    if label_index is None:
+        label_index = label
+    label_rows = None
+    if label_index and data.dtype.fields is None:
+        label_rows = []
+
+    # count the chunks that are not stored because they only contain
+    # the (explicit) fill value
+    empty_chunks = None
+    if not write_empty_chunks and fill_value is not None:
+        empty_chunks = [{"chunks": 0, "skipped": 0} for _ in shapes]
+
+    # compute and write the pyramid of each timepoint/channel block
+    _write_pyramid(
+        out, data, len(shapes), pyramid_fn, label, no_pyramid_axis,
+        block_shape=block_shape,
+        max_workers=max_workers,
+        parallel=parallel,
+        stats=pyramid_stats,
+        write_empty_chunks=write_empty_chunks,
+        empty_chunks=empty_chunks,
+        label_rows=label_rows,
+    )
 
-    for i, d in enumerate(data):
-        _create_array(out, str(i), shape=d.shape, **opts)
-        out[str(i)][:] = d
+    if empty_chunks is not None:
+        for i, level in enumerate(empty_chunks):
+            level["bytes"] = level["skipped"] * out[str(i)].dtype.itemsize \
+                * math.prod(out[str(i)].chunks)
+        fill = out["0"].fill_value
+        fill = fill.item() if hasattr(fill, "item") else fill
+        _update_niizarr_attrs(out, empty_chunks={
+            "fill_value": fill if not isinstance(fill, complex)
+            else [fill.real, fill.imag],
+            "chunks": sum(level["chunks"] for level in empty_chunks),
+            "skipped": sum(level["skipped"] for level in empty_chunks),
+            "bytes": sum(level["bytes"] for level in empty_chunks),
+            "levels": empty_chunks,
+        })
+
+    if label_rows is not None:
+        _write_label_index(
+            out, _concat_rows(label_rows, data.dtype, data.ndim),
+            out["0"].chunks)
+
+    intensity_range = None
+    if pyramid_stats is not None:
+        level0 = pyramid_stats.write(out)[0]
+        intensity_range = (level0["min"], level0["max"])
 
     # write xarray metadata
-    for i in range(len(data)):
+    for i in range(len(shapes)):
         out[str(i)].attrs['_ARRAY_DIMENSIONS'] = ARRAY_DIMENSIONS
 
+    # record how the pyramid was built, so that it can be extended,
+    # unless it can be inferred (see `_read_pyramid_params`)
+    intent_label = jsonheader['Intent'] in ("label", "neuronames")
+    if method[0] != 'g' or label != intent_label or no_pyramid_axis:
+        _update_niizarr_attrs(out, pyramid={
+            'method': 'gaussian' if method[0] == 'g' else 'laplacian',
+            'label': bool(label),
+            'no_pyramid_axis': no_pyramid_axis,
+        })
+
     write_ome_metadata(
         out,
         axes=axes,
@@ -676,7 +1621,10 @@ def nii2zarr(
         ome_version=ome_version
     )
 
-    write_nifti_header(out, nbheader)
+    write_nifti_header(out, nbheader, header_in_attrs, intensity_range)
+
+    if consolidated:
+        _consolidate(out)
 
     if validate and 'ome_zarr_models' in globals():
         try:
@@ -692,6 +1640,173 @@ def nii2zarr(
     return
 
 
+def _read_pyramid_params(omz: zarr.Group) -> dict:
+    """
+    Read the parameters used to build the pyramid of a nifti-zarr.
+
+    Groups written by older versions do not record them, in which case
+    a gaussian pyramid is assumed, label volumes are detected from the
+    intent code, and the axis that is not downsampled (if any) is
+    detected from the shapes of the first two levels.
+
+    Parameters
+    ----------
+    omz : zarr.Group
+        Nifti-zarr group.
+
+    Returns
+    -------
+    dict
+        Keys "method", "label" and "no_pyramid_axis".
+    """
+    params = dict(omz.attrs.get("niizarr", {}).get("pyramid", {}))
+    if "method" not in params:
+        params["method"] = "gaussian"
+    if "label" not in params:
+        intent = omz["nifti"].attrs.get("Intent", "") if "nifti" in omz else ""
+        params["label"] = intent in ("label", "neuronames")
+    if "no_pyramid_axis" not in params:
+        params["no_pyramid_axis"] = None
+        if "1" in omz:
+            shape0, shape1 = omz["0"].shape[-3:], omz["1"].shape[-3:]
+            for i, (n0, n1) in enumerate(zip(shape0, shape1)):
+                if n0 == n1 and n0 > 1:
+                    params["no_pyramid_axis"] = i
+    return params
+
+
+def append(
+        inp: Union[Nifti1Image, Nifti2Image, ndarray, Any],
+        out: Union[str, Any],
+        *,
+        max_workers: int = 1,
+        parallel: Literal['thread', 'process'] = 'thread',
+) -> None:
+    """
+    Append timepoints to an existing nifti-zarr.
+
+    The time axis of every pyramid level is resized, and only the
+    pyramid of the new timepoints is computed and written. The time
+    dimension of the binary and JSON nifti headers is updated.
+
+    Parameters
+    ----------
+    inp : Nifti1Image | Nifti2Image | ndarray | file-like | path
+        New timepoint(s). Arrays are in nifti order: (x, y, z) for a
+        single timepoint, (x, y, z, t) or (x, y, z, t, c). Arrays must
+        hold stored (unscaled) values.
+    out : zarr.Store, zarr.Group or path
+        Nifti-zarr to extend. It must have a time axis.
+    max_workers : int, optional
+        Number of timepoints/channels processed concurrently.
+    parallel : {'thread', 'process'}, optional
+        Type of worker pool used when `max_workers > 1`.
+
+    Returns
+    -------
+    None
+    """
+    omz = _open_zarr(out, mode="a")
+    ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+    buffer = _read_nifti_header(omz) if ome else None
+    if buffer is None:
+        raise ValueError("This is not a nifti-zarr.")
+    axes = [axis["name"] for axis in ome[0]["axes"]]
+    if "t" not in axes:
+        raise ValueError("This nifti-zarr does not have a time axis.")
+    paths = [dataset["path"] for dataset in ome[0]["datasets"]]
+    shape0 = omz[paths[0]].shape
+
+    # Load new data
+    if isinstance(inp, ndarray):
+        data = inp
+    else:
+        if not isinstance(inp, (Nifti1Image, Nifti2Image)):
+            if hasattr(inp, 'read'):
+                inp = _load_nifti_from_stream(inp)
+            else:
+                inp = nib.load(inp)
+        header = bin2nii(buffer)
+        slope, inter = header['scl_slope'].item(), header['scl_inter'].item()
+        if not math.isfinite(slope) or slope == 0:
+            slope, inter = 1.0, 0.0
+        if hasattr(inp.dataobj, "get_unscaled"):
+            data = np.asarray(inp.dataobj.get_unscaled())
+            new_slope = getattr(inp.dataobj, "slope", 1.0)
+            new_inter = getattr(inp.dataobj, "inter", 0.0)
+        else:
+            data = np.asarray(inp.dataobj)
+            new_slope, new_inter = 1.0, 0.0
+        if (new_slope, new_inter) != (slope, inter):
+            raise ValueError(
+                f"Scaling of the new data ({new_slope}, {new_inter}) "
+                f"differs from that of the nifti-zarr ({slope}, {inter})")
+
+    # nifti order (x, y, z, t, c) -> zarr order
+    if data.ndim > 5:
+        raise ValueError('Too many dimensions for a nifti-zarr')
+    data = data.reshape(data.shape + (1,) * (5 - data.ndim))
+    perm = ["xyztc".index(axis) for axis in axes]
+    extra = [i for i, axis in enumerate("xyztc") if axis not in axes]
+    if any(data.shape[i] != 1 for i in extra):
+        raise ValueError(
+            f"The nifti-zarr does not have a channel axis, but the new "
+            f"data has {data.shape[4]} channels")
+    data = data.transpose(perm + extra).reshape([data.shape[i] for i in perm])
+    t = axes.index("t")
+    if data.shape[:t] + data.shape[t + 1:] != shape0[:t] + shape0[t + 1:]:
+        raise ValueError(
+            f"Shape of the new data {data.shape} does not match the "
+            f"shape of the nifti-zarr {shape0}")
+    nt = data.shape[t]
+    t0 = shape0[t]
+
+    # Resize every level along the time axis
+    for path in paths:
+        shape = list(omz[path].shape)
+        shape[t] += nt
+        _resize(omz[path], tuple(shape))
+
+    # Compute and write the pyramid of the new timepoints
+    params = _read_pyramid_params(omz)
+    pyramid_fn = (pyramid_gaussian if params["method"][0] == 'g'
+                  else pyramid_laplacian)
+    block_shape = getattr(omz[paths[0]], "shards", None) or \
+        omz[paths[0]].chunks
+    offset = (0,) * len(shape0[:-3])
+    offset = offset[:t] + (t0,) + offset[t + 1:]
+    _write_pyramid(
+        omz, data, len(paths), pyramid_fn, params["label"],
+        params["no_pyramid_axis"],
+        block_shape=tuple(block_shape[:-3]),
+        max_workers=max_workers,
+        parallel=parallel,
+        offset=offset,
+    )
+
+    # Update the time dimension of the nifti header (binary and JSON)
+    buffer = bytearray(buffer)
+    header = np.frombuffer(buffer, dtype=bin2nii(bytes(buffer)).dtype, count=1)
+    header['dim'][0, 0] = max(header['dim'][0, 0], 4)
+    header['dim'][0, 4] = t0 + nt
+    omz['nifti'][:] = np.frombuffer(buffer, dtype=np.uint8)
+    if "nifti_header" in omz.attrs.get("niizarr", {}):
+        _write_header_attrs(omz, bytes(buffer))
+    dim = list(omz['nifti'].attrs['Dim'])
+    dim += [1] * max(0, 4 - len(dim))
+    dim[3] = t0 + nt
+    omz['nifti'].attrs['Dim'] = dim
+
+    # statistics of the new timepoints
+    region = [slice(None)] * len(shape0)
+    region[t] = slice(t0, t0 + nt)
+    for level in range(len(paths)):
+        _refresh_stats(omz, level, region)
+    _refresh_label_index(omz, region)
+
+    _consolidate(omz, if_exists=True)
+
+
 def cli(args=None):
     """    Command-line entrypoint"""
     parser = argparse.ArgumentParser(
@@ -703,6 +1818,10 @@ def cli(args=None):
         'output', default=None, nargs="?",
         help='Output zarr directory. '
              'When not specified, write to input directory.')
+    parser.add_argument(
+        '--append', action='store_true',
+        help='Append the timepoints of the input to an existing output, '
+             'instead of overwriting it.')
     parser.add_argument(
         '--chunk', type=int, default=64, help='Spatial chunk size.')
     parser.add_argument(
@@ -717,6 +1836,11 @@ def cli(args=None):
         help='Save all timepoints in a single chunk.'
              'Unchunk if you want to display all timepoints as a single RGB '
              'layer in neuroglancer. Chunked by default.')
+    parser.add_argument(
+        '--chunk-mode', choices=('fixed', 'bytes'), default='fixed',
+        help='Chunk size of coarser levels. If "fixed", use the same chunk '
+             'size at every level. If "bytes", keep the number of voxels '
+             'per chunk roughly constant across levels.')
     parser.add_argument(
         '--shard', type=int, default=None, help='Spatial shard size.')
     parser.add_argument(
@@ -733,10 +1857,25 @@ def cli(args=None):
         '--method', choices=('gaussian', 'laplacian'), default='gaussian',
         help='Pyramid method.')
     parser.add_argument(
-        '--fill', default=None, help='Missing value.')
+        '--fill', default=None,
+        help='Missing value, or "auto" to use the background value.')
     parser.add_argument(
-        '--compressor', choices=('blosc', 'zlib'), default='blosc',
-        help='Compressor.')
+        '--write-empty-chunks', action='store_true',
+        help='Store chunks that only contain the fill value.')
+    parser.add_argument(
+        '--compressor', choices=('blosc', 'zlib', 'auto'), default='blosc',
+        help='Compressor. If "auto", select the best codec pipeline '
+             'on a sample of chunks.')
+    parser.add_argument(
+        '--auto-objective', choices=('size', 'speed', 'balanced'),
+        default='balanced',
+        help='Criterion used by "--compressor auto".')
+    parser.add_argument(
+        '--codecs', default=None,
+        help='Codec pipeline, which overrides --compressor. '
+             'Stages are separated by "+" and options follow ":", e.g. '
+             '"delta+shuffle+zstd:level=5" or '
+             '"blosc:cname=zstd,clevel=5,shuffle=bitshuffle".')
     parser.add_argument(
         '--label', action='store_true', default=None,
         help='Segmentation volume.')
@@ -758,6 +1897,25 @@ def cli(args=None):
         help='OME-Zarr specification version. Default "auto" selects the most '
              'recent version compatible with --zarr-version ("0.5" for v3, '
              '"0.4" for v2).')
+    parser.add_argument(
+        '--max-workers', type=int, default=1,
+        help='Number of timepoints/channels processed concurrently.')
+    parser.add_argument(
+        '--parallel', choices=('thread', 'process'), default='thread',
+        help='Type of worker pool used when --max-workers > 1.')
+    parser.add_argument(
+        '--no-consolidate', action='store_false', dest='consolidated',
+        help='Do not write consolidated metadata.')
+    parser.add_argument(
+        '--header-in-attrs', action='store_true',
+        help='Also store the binary nifti header in the group attributes.')
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='Compute the intensity statistics of every chunk.')
+    parser.add_argument(
+        '--no-label-index', action='store_false', dest='label_index',
+        default=None,
+        help='Do not index the chunks that contain each label.')
     parser.add_argument(
         '--validate', action='store_true',
         help='Validate the Zarr with the `ome-zarr-models` package.')
@@ -769,22 +1927,39 @@ def cli(args=None):
         print('Output not specified, using input directory')
         args.output = re.sub(r'\.nii(\.gz)?$', '', args.input) + '.nii.zarr'
 
+    if args.append:
+        return append(
+            args.input, args.output,
+            max_workers=args.max_workers,
+            parallel=args.parallel,
+        )
+
     nii2zarr(
         args.input, args.output,
         chunk=args.chunk,
         chunk_channel=0 if args.unchunk_channels else 1,
         chunk_time=0 if args.unchunk_time else 1,
+        chunk_mode=args.chunk_mode,
         shard=args.shard,
         shard_channel=0 if args.unshard_channels else 1,
         shard_time=0 if args.unshard_time else 1,
         nb_levels=args.levels,
         method=args.method,
         fill_value=args.fill,
+        write_empty_chunks=args.write_empty_chunks,
         compressor=args.compressor,
+        auto_objective=args.auto_objective,
+        codecs=args.codecs,
         label=args.label,
         no_time=args.no_time,
         no_pyramid_axis=args.no_pyramid_axis,
         zarr_version=args.zarr_version,
         ome_version=args.ome_version,
+        max_workers=args.max_workers,
+        parallel=args.parallel,
+        consolidated=args.consolidated,
+        header_in_attrs=args.header_in_attrs,
+        stats=args.stats,
+        label_index=args.label_index,
         validate=args.validate,
     )
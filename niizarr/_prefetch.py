@@ -0,0 +1,49 @@
+"""Read-ahead of sequential reads."""
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+
+def _read_ahead(
+        fetch: Callable[[Any], Any],
+        items: Iterable[Any],
+        depth: int = 4,
+) -> Iterator[Any]:
+    """
+    Apply `fetch` to each item, in order, while the next `depth` items
+    are fetched concurrently in the background.
+
+    Parameters
+    ----------
+    fetch : callable
+        Function that reads (and decodes) one item.
+    items : iterable
+        Items, in the order in which they are consumed.
+    depth : int
+        Number of items fetched ahead of the one being consumed.
+        If 0, items are fetched on demand.
+
+    Yields
+    ------
+    Result of `fetch` for each item.
+    """
+    items = iter(items)
+    if depth <= 0:
+        yield from map(fetch, items)
+        return
+    pool = ThreadPoolExecutor(depth)
+    pending = deque()
+    try:
+        for item in itertools.islice(items, depth):
+            pending.append(pool.submit(fetch, item))
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(items, 1):
+                pending.append(pool.submit(fetch, item))
+            yield result
+    finally:
+        # (`shutdown(cancel_futures=True)` requires python >= 3.9)
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
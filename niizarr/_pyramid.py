@@ -0,0 +1,667 @@
+"""Incremental and out-of-core computation of nifti-zarr pyramid levels."""
+import argparse
+import itertools
+import sys
+from argparse import ArgumentDefaultsHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+from scipy import ndimage
+
+from ._compat import (
+    _array_options, _consolidate, _create_array, _open_zarr, pyzarr_version
+)
+from ._header import JNIFTI_ZARR
+from ._nii2zarr import (
+    _iter_batch_blocks, _level_chunk, _level_shard,
+    _pyramid_shapes, _read_pyramid_params, _update_niizarr_attrs, write_ome_metadata,
+)
+from ._labels import INDEX, _refresh_label_index
+from ._stats import _refresh_stats, _truncate_stats
+
+# Parameters of `skimage.transform.pyramid_reduce` with `downscale=2`
+SIGMA = 2 * 2 / 6.0
+TRUNCATE = 4.0
+RADIUS = int(TRUNCATE * SIGMA + 0.5)
+
+
+def _float_dtype(dtype: np.dtype) -> np.dtype:
+    """Floating point type used by skimage to process `dtype`."""
+    dtype = np.dtype(dtype)
+    if dtype in (np.float32, np.float64):
+        return dtype
+    if dtype == np.float16:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def _axis_coordinates(n_in: int, n_out: int, start: int, stop: int
+                      ) -> np.ndarray:
+    """Input coordinates of output voxels [start, stop) (grid mode)."""
+    return (np.arange(start, stop) + 0.5) * (n_in / n_out) - 0.5
+
+
+def _affected_range(
+        n_in: int, n_out: int, start: int, stop: int
+) -> Tuple[int, int]:
+    """
+    Range of output voxels that depend on input voxels [start, stop).
+
+    Parameters
+    ----------
+    n_in, n_out : int
+        Input and output size along the axis.
+    start, stop : int
+        Range of modified input voxels.
+
+    Returns
+    -------
+    start, stop : int
+        Range of output voxels that must be recomputed.
+    """
+    if n_in == n_out:
+        return start, stop
+    floor = np.floor(_axis_coordinates(n_in, n_out, 0, n_out)).astype(int)
+    mask = (floor + 1 + RADIUS >= start) & (floor - RADIUS <= stop - 1)
+    index = np.flatnonzero(mask)
+    if not len(index):
+        return 0, 0
+    return int(index[0]), int(index[-1]) + 1
+
+
+def _required_range(
+        n_in: int, n_out: int, start: int, stop: int
+) -> Tuple[int, int]:
+    """
+    Range of input voxels needed to compute output voxels [start, stop).
+
+    Parameters
+    ----------
+    n_in, n_out : int
+        Input and output size along the axis.
+    start, stop : int
+        Range of output voxels.
+
+    Returns
+    -------
+    start, stop : int
+        Range of input voxels (smoothing halo included).
+    """
+    if n_in == n_out:
+        return start, stop
+    coord = _axis_coordinates(n_in, n_out, start, stop)
+    return (max(0, int(np.floor(coord[0])) - RADIUS),
+            min(n_in, int(np.floor(coord[-1])) + 2 + RADIUS))
+
+
+def _reduce(
+        crop: np.ndarray,
+        n_in: Sequence[int],
+        n_out: Sequence[int],
+        in_start: Sequence[int],
+        out_region: Sequence[Tuple[int, int]],
+) -> np.ndarray:
+    """
+    Smooth and downsample a crop of a level, as `pyramid_reduce` would.
+
+    The linear interpolation accumulates the corners of each output
+    voxel in the same order as `scipy.ndimage.zoom`, so that results
+    are identical to those of a full `pyramid_reduce`.
+
+    Parameters
+    ----------
+    crop : np.ndarray
+        Crop of the input level, (..., z, y, x), in floating point.
+    n_in, n_out : list[int]
+        Spatial shape of the full input and output levels.
+    in_start : list[int]
+        Position of the crop in the input level.
+    out_region : list[(int, int)]
+        Range of output voxels to compute, along each spatial axis.
+
+    Returns
+    -------
+    np.ndarray
+        Output voxels.
+    """
+    nbatch = crop.ndim - 3
+    sigma = [0] * nbatch + [
+        SIGMA if i != o else 0 for i, o in zip(n_in, n_out)
+    ]
+    crop = ndimage.gaussian_filter(crop, sigma, mode='reflect',
+                                   truncate=TRUNCATE)
+    # (index, weight) of the corners of output voxels along each axis
+    corners = []
+    for d, (i, o, s, (a, b)) in enumerate(
+            zip(n_in, n_out, in_start, out_region)):
+        if i == o:
+            corners.append([(nbatch + d, np.arange(a, b) - s, None)])
+            continue
+        coord = _axis_coordinates(i, o, a, b)
+        index = np.floor(coord).astype(int)
+        weight = coord - index
+        shape = [1] * crop.ndim
+        shape[nbatch + d] = -1
+        corners.append([
+            (nbatch + d, index - s, (1 - weight).reshape(shape)),
+            (nbatch + d, np.minimum(index + 1, i - 1) - s,
+             weight.reshape(shape)),
+        ])
+    out = 0
+    for corner in itertools.product(*corners):
+        value = crop
+        for axis, index, _ in corner:
+            value = np.take(value, index, axis=axis)
+        for _, _, weight in corner:
+            if weight is not None:
+                value = value * weight
+        out = out + value
+    return out
+
+
+def _crop(
+        level: zarr.Array,
+        region: Sequence[Tuple[int, int]],
+        batch: Tuple[slice] = (),
+) -> np.ndarray:
+    """Read a region of a level, (..., z, y, x)."""
+    batch = tuple(batch) + (slice(None),) * (level.ndim - 3 - len(batch))
+    return level[batch + tuple(slice(a, b) for a, b in region)]
+
+
+def _reduce_region(
+        prev: zarr.Array,
+        shape: Sequence[int],
+        region: Sequence[Tuple[int, int]],
+        batch: Tuple[slice] = (),
+) -> np.ndarray:
+    """
+    Compute a region of a pyramid level from the previous level.
+
+    Parameters
+    ----------
+    prev : zarr.Array
+        Previous (finer) level, (..., z, y, x).
+    shape : list[int]
+        Spatial shape of the level to compute, (z, y, x).
+    region : list[(int, int)]
+        Range of voxels to compute along each spatial axis.
+    batch : tuple[slice]
+        Slicer along the batch (time, channel) dimensions.
+
+    Returns
+    -------
+    np.ndarray
+        Values of the region, in floating point.
+    """
+    n_in = prev.shape[-3:]
+    crop_region = [
+        _required_range(i, o, a, b)
+        for i, o, (a, b) in zip(n_in, shape, region)
+    ]
+    crop = _crop(prev, crop_region, batch)
+    crop = crop.astype(_float_dtype(crop.dtype))
+    return _reduce(crop, n_in, shape, [a for a, _ in crop_region], region)
+
+
+def _reduce_labels(
+        level0: zarr.Array,
+        shapes: Sequence[Sequence[int]],
+        region: Sequence[Tuple[int, int]],
+        batch: Tuple[slice] = (),
+) -> np.ndarray:
+    """
+    Compute a region of a label pyramid level from the finest level.
+
+    As in `nii2zarr`, the probability map of each label is reduced
+    from level 0 through every intermediate level, and each voxel takes
+    the label with the largest probability (the smallest label wins
+    ties).
+
+    Parameters
+    ----------
+    level0 : zarr.Array
+        Finest level, (..., z, y, x).
+    shapes : list[list[int]]
+        Spatial shape of levels 0 to N, where N is the level to compute.
+    region : list[(int, int)]
+        Range of voxels to compute along each spatial axis of level N.
+    batch : tuple[slice]
+        Slicer along the batch (time, channel) dimensions.
+
+    Returns
+    -------
+    np.ndarray
+        Labels of the region, with the dtype of `level0`.
+    """
+    # region of each level that the next one depends on
+    regions = [list(region)]
+    for n_in, n_out in zip(shapes[-2::-1], shapes[:0:-1]):
+        regions.insert(0, [
+            _required_range(i, o, a, b)
+            for i, o, (a, b) in zip(n_in, n_out, regions[0])
+        ])
+    crop = _crop(level0, regions[0], batch)
+
+    def probability(label):
+        prob = (crop == label).astype(np.float64)
+        for n_in, n_out, in_region, out_region in zip(
+                shapes[:-1], shapes[1:], regions[:-1], regions[1:]):
+            prob = _reduce(prob, n_in, n_out, [a for a, _ in in_region],
+                           out_region)
+        return prob
+
+    labels = np.unique(crop)
+    maxprob = probability(labels[0])
+    value = np.full(maxprob.shape, labels[0], dtype=crop.dtype)
+    for label in labels[1:]:
+        prob = probability(label)
+        mask = prob > maxprob
+        value[mask] = label
+        maxprob[mask] = prob[mask]
+    return value
+
+
+def _level_paths(omz: zarr.Group) -> List[str]:
+    ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+    if ome:
+        return [dataset["path"] for dataset in ome[0]["datasets"]]
+    paths = []
+    while str(len(paths)) in omz:
+        paths.append(str(len(paths)))
+    return paths
+
+
+# xarray dimension names -> OME axis names
+ARRAY_DIMENSIONS = {"time": "t", "channel": "c", "z": "z", "y": "y", "x": "x"}
+
+
+def _axis_names(omz: zarr.Group, ndim: int) -> List[str]:
+    """
+    Axis names of the levels, in Zarr order.
+
+    Taken from the OME metadata if present, else from the dimension
+    names of the finest level, else from the nifti convention
+    ((t,) z, y, x for 3D/4D data and t, c, z, y, x for 5D data).
+    """
+    ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+    if ome:
+        return [axis["name"] for axis in ome[0]["axes"]]
+    if "0" in omz:
+        names = omz["0"].attrs.get("_ARRAY_DIMENSIONS", None)
+        if names is None:
+            metadata = getattr(omz["0"], "metadata", None)
+            names = getattr(metadata, "dimension_names", None)
+        names = [ARRAY_DIMENSIONS.get(name, name) for name in names or []]
+        if len(names) == ndim and all(n in "tczyx" for n in names):
+            return names
+    if ndim not in (3, 4, 5):
+        raise ValueError(f"Expected 3 to 5 dimensions, not {ndim}")
+    return list("tczyx"[-ndim:] if ndim == 5 else "tzyx"[-ndim:])
+
+
+def _ome_scales(omz: zarr.Group, axes: List[str]) -> dict:
+    """
+    Voxel size and units of the finest level, as expected by
+    `write_ome_metadata`.
+
+    Taken from the OME metadata if present, else from the nifti header,
+    else unit voxels in millimeter and second.
+    """
+    scales = {"space_scale": 1.0, "time_scale": 1.0,
+              "space_unit": "millimeter", "time_unit": "second"}
+    ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+    if ome:
+        ome = ome[0]
+        for transform in ome["datasets"][0]["coordinateTransformations"]:
+            if transform["type"] == "scale":
+                scales["space_scale"] = [
+                    scale for scale, axis in zip(transform["scale"], axes)
+                    if axis in "zyx"
+                ]
+        for transform in ome.get("coordinateTransformations", []):
+            if transform["type"] == "scale" and "t" in axes:
+                scales["time_scale"] = transform["scale"][axes.index("t")]
+        for axis in ome["axes"]:
+            if axis.get("unit") and axis["name"] in "zyx":
+                scales["space_unit"] = axis["unit"]
+            if axis.get("unit") and axis["name"] == "t":
+                scales["time_unit"] = axis["unit"]
+    elif "nifti" in omz:
+        header = omz["nifti"].attrs
+        voxel_size = header["VoxelSize"]
+        scales["space_scale"] = [voxel_size[2], voxel_size[1], voxel_size[0]]
+        if len(voxel_size) > 3:
+            scales["time_scale"] = voxel_size[3]
+        scales["space_unit"] = JNIFTI_ZARR[header["Unit"]["L"]]
+        scales["time_unit"] = JNIFTI_ZARR[header["Unit"]["T"]]
+    return scales
+
+
+def update_region(
+        group: Union[str, Any],
+        bbox: Sequence[Union[slice, Tuple[int, int]]],
+        data: np.ndarray,
+) -> List[Tuple[slice]]:
+    """
+    Overwrite a region of a nifti-zarr and update its pyramid.
+
+    The new voxels are written into the finest level, and only the
+    affected region of each coarser level (extended by the support of
+    the smoothing kernel) is recomputed from the level below it, with
+    the method recorded in the group.
+
+    Since coarser levels are recomputed from the stored values of the
+    previous level, results match a full conversion up to the rounding
+    of stored values. Label levels are instead recomputed from the
+    finest level, with one probability pyramid per label as in
+    `nii2zarr`, and match a full conversion exactly (unless the image
+    has no label 0, which `nii2zarr` writes in place of the smallest
+    label).
+
+    Parameters
+    ----------
+    group : zarr.Store, zarr.Group or path
+        Nifti-zarr to modify.
+    bbox : list[slice | (int, int)]
+        Region of the finest level to overwrite, in nifti voxel order
+        (x, y, z[, t[, c]]). Missing time/channel ranges default to
+        the full range.
+    data : np.ndarray
+        New values, in nifti order, with the shape of the region.
+        Values must be unscaled (as stored).
+
+    Returns
+    -------
+    list[tuple[slice]]
+        Region updated in each level, in Zarr order.
+    """
+    omz = _open_zarr(group, mode="a")
+    params = _read_pyramid_params(omz)
+    if params["method"][0] != "g":
+        raise ValueError(
+            "Only gaussian pyramids can be updated in place: laplacian "
+            "levels do not retain the low-pass image they derive from.")
+    paths = _level_paths(omz)
+    shape0 = omz[paths[0]].shape
+    axes = _axis_names(omz, len(shape0))
+
+    # nifti order (x, y, z, t, c) -> zarr order
+    bbox = list(bbox)
+    bbox += [slice(None)] * (5 - len(bbox))
+    region0 = []
+    for axis, n in zip(axes, shape0):
+        box = bbox["xyztc".index(axis)]
+        if not isinstance(box, slice):
+            box = slice(*box)
+        start, stop, step = box.indices(n)
+        if step != 1:
+            raise ValueError("Bounding box must be contiguous")
+        region0.append((start, stop))
+    data = np.asarray(data)
+    data = data.reshape(data.shape + (1,) * (5 - data.ndim))
+    perm = ["xyztc".index(axis) for axis in axes]
+    extra = [i for i, axis in enumerate("xyztc") if axis not in axes]
+    data = data.transpose(perm + extra).reshape(
+        [data.shape[i] for i in perm])
+    if data.shape != tuple(b - a for a, b in region0):
+        raise ValueError(
+            f"Data shape {data.shape} does not match the bounding box "
+            f"{region0} (in zarr order)")
+
+    if any(a >= b for a, b in region0):
+        return []
+    batch = tuple(slice(a, b) for a, b in region0[:-3])
+    region = region0[-3:]
+    slicer = batch + tuple(slice(a, b) for a, b in region)
+    omz[paths[0]][slicer] = data
+    updated = [slicer]
+
+    shapes = [omz[path].shape[-3:] for path in paths]
+    for level, (prev_path, path) in enumerate(zip(paths[:-1], paths[1:]), 1):
+        n_in, n_out = shapes[level - 1], shapes[level]
+        region = [
+            _affected_range(i, o, a, b)
+            for i, o, (a, b) in zip(n_in, n_out, region)
+        ]
+        if any(a >= b for a, b in region):
+            break
+        if params["label"]:
+            values = _reduce_labels(omz[paths[0]], shapes[:level + 1],
+                                    region, batch)
+        else:
+            values = _reduce_region(omz[prev_path], n_out, region, batch)
+        slicer = batch + tuple(slice(a, b) for a, b in region)
+        omz[path][slicer] = values
+        updated.append(slicer)
+
+    if "stats" in omz.attrs.get("niizarr", {}) or INDEX in omz:
+        for level, slicer in enumerate(updated):
+            _refresh_stats(omz, level, slicer)
+        _refresh_label_index(omz, updated[0])
+        _consolidate(omz, if_exists=True)
+    return updated
+
+
+def _build_level(
+        levels: Sequence[zarr.Array],
+        level: zarr.Array,
+        label: bool = False,
+        max_workers: int = 1,
+) -> None:
+    """
+    Compute a pyramid level from the finer levels, block by block.
+
+    Each block covers one chunk (or shard) of the output level, so that
+    blocks can be written concurrently and only a block and its
+    smoothing halo are held in memory. Values are computed from the
+    previous level, and labels from the finest level (see
+    `_reduce_labels`).
+    """
+    nbatch = level.ndim - 3
+    block_shape = _array_options(level)["shards"] or level.chunks
+    shapes = [prev.shape[-3:] for prev in levels] + [level.shape[-3:]]
+
+    def compute(slicer):
+        batch, spatial = slicer[:nbatch], slicer[nbatch:]
+        region = [(s.start, s.stop) for s in spatial]
+        if label:
+            level[slicer] = _reduce_labels(levels[0], shapes, region, batch)
+        else:
+            level[slicer] = _reduce_region(levels[-1], shapes[-1], region,
+                                           batch)
+
+    blocks = _iter_batch_blocks(level.shape, block_shape)
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers) as pool:
+            for _ in pool.map(compute, blocks):
+                pass
+    else:
+        for slicer in blocks:
+            compute(slicer)
+
+
+def build_pyramid(
+        group: Union[str, Any],
+        *,
+        nb_levels: int = -1,
+        label: Optional[bool] = None,
+        no_pyramid_axis: Optional[Union[str, int]] = None,
+        chunk_mode: Literal['fixed', 'bytes'] = 'fixed',
+        ome_version: Literal["auto", "0.4", "0.5"] = "auto",
+        max_workers: int = 1,
+) -> List[Tuple[int]]:
+    """
+    Build the pyramid of a Zarr group that only contains its finest level.
+
+    Levels 1..N are computed one after the other, each from the level
+    below it, one output chunk (or shard) at a time, so that the volume
+    never needs to fit in memory. Existing coarser levels are replaced.
+    The new levels use the codecs, fill value and time/channel chunking
+    of level 0. The OME `multiscales` metadata is (re)written with
+    `write_ome_metadata`.
+
+    The pyramid is gaussian and matches the one built by `nii2zarr` up
+    to the rounding of stored values. Label levels are computed from
+    level 0, as in `nii2zarr` (see `update_region`), and match exactly;
+    a chunk of level N then needs the matching region of level 0,
+    which is 2**N times larger along each downsampled axis.
+
+    Parameters
+    ----------
+    group : zarr.Store, zarr.Group or path
+        Zarr group with a level "0", in Zarr order (..., z, y, x).
+    nb_levels : int, optional
+        Number of pyramid levels, including level 0.
+        If -1, make all possible levels until the level can be fit into
+        one chunk.
+    label : bool, optional
+        Is this is a label volume? If `None`, use the value recorded in
+        the group, or guess from the intent code.
+    no_pyramid_axis : {'x', 'y', 'z'}, optional
+        Axis that should not be downsampled. If None, use the value
+        recorded in the group (or inferred from existing levels), else
+        downsample across all three dimensions.
+    chunk_mode : {'fixed', 'bytes'}, optional
+        How the spatial chunk size of coarser levels is chosen
+        (see `nii2zarr`).
+    ome_version : {"auto", "0.4", "0.5"}, optional
+        OME-Zarr version. Default: "auto", which keeps the version of
+        existing metadata, or selects the most recent version compatible
+        with the Zarr format of the group.
+    max_workers : int, optional
+        Number of blocks computed concurrently.
+
+    Returns
+    -------
+    list[tuple[int]]
+        Shape of each level, in Zarr order.
+    """
+    omz = _open_zarr(group, mode="a")
+    if "0" not in omz:
+        raise ValueError("The group does not contain a level '0'")
+    level0 = omz["0"]
+    nbatch = level0.ndim - 3
+    axes = _axis_names(omz, level0.ndim)
+    scales = _ome_scales(omz, axes)
+
+    if ome_version == "auto":
+        if "ome" in omz.attrs:
+            ome_version = omz.attrs["ome"]["version"]
+        elif "multiscales" in omz.attrs:
+            ome_version = omz.attrs["multiscales"][0].get("version", "0.4")
+        elif pyzarr_version == 3 and omz.metadata.zarr_format == 3:
+            ome_version = "0.5"
+        else:
+            ome_version = "0.4"
+    name = omz.attrs.get("ome", omz.attrs).get("multiscales", [{}])[0]
+    name = name.get("name", "")
+
+    params = _read_pyramid_params(omz)
+    if label is None:
+        label = params["label"]
+    if no_pyramid_axis is None:
+        no_pyramid_axis = params["no_pyramid_axis"]
+
+    opts = _array_options(level0)
+    chunk0, shard0 = opts.pop("chunks"), opts.pop("shards")
+    if nb_levels == -1:
+        nxyz = np.array(level0.shape[-3:])
+        nb_levels = int(np.ceil(np.log2(np.max(nxyz / chunk0[-3:])))) + 1
+        nb_levels = max(nb_levels, 1)
+    shapes = _pyramid_shapes(level0.shape, nb_levels, no_pyramid_axis)
+
+    # remove previous coarse levels
+    i = 1
+    while str(i) in omz:
+        del omz[str(i)]
+        i += 1
+
+    dimensions = level0.attrs.get("_ARRAY_DIMENSIONS", None)
+    for i, shape in enumerate(shapes[1:], 1):
+        level_opts = dict(opts)
+        level_chunk = _level_chunk(shape[-3:], chunk0[-3:], chunk_mode)
+        level_opts["chunks"] = tuple(chunk0[:nbatch]) + level_chunk
+        if shard0:
+            shard_i = tuple(shard0[-3:])
+            if chunk_mode != "fixed":
+                shard_i = _level_shard(shape[-3:], chunk0[-3:], shard_i,
+                                       level_chunk)
+            level_opts["shards"] = tuple(shard0[:nbatch]) + shard_i
+        _create_array(omz, str(i), shape=shape, dimension_names=axes,
+                      **level_opts)
+        if dimensions:
+            omz[str(i)].attrs["_ARRAY_DIMENSIONS"] = dimensions
+        _build_level([omz[str(j)] for j in range(i)], omz[str(i)], label,
+                     max_workers)
+
+    # record how the pyramid was built, unless it can be inferred
+    # (see `_read_pyramid_params`)
+    intent = omz["nifti"].attrs.get("Intent", "") if "nifti" in omz else ""
+    intent_label = intent in ("label", "neuronames")
+    if ("pyramid" in omz.attrs.get("niizarr", {})
+            or label != intent_label or no_pyramid_axis is not None):
+        _update_niizarr_attrs(omz, pyramid={
+            'method': 'gaussian',
+            'label': bool(label),
+            'no_pyramid_axis': no_pyramid_axis,
+        })
+
+    write_ome_metadata(omz, axes=axes, name=name, ome_version=ome_version,
+                       **scales)
+    _truncate_stats(omz, 1)
+    for i in range(1, len(shapes)):
+        _refresh_stats(omz, i)
+    _consolidate(omz, if_exists=True)
+    return shapes
+
+
+def cli(args=None):
+    """    Command-line entrypoint"""
+    parser = argparse.ArgumentParser(
+        'niizarr-pyramid',
+        description='Build the pyramid of a Zarr that only has level 0.',
+        formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        'input', help='Zarr directory.')
+    parser.add_argument(
+        '--levels', type=int, default=-1,
+        help='Number of levels in the pyramid. '
+             'If -1 (default), use as many levels as possible.')
+    parser.add_argument(
+        '--label', action='store_true', default=None,
+        help='Segmentation volume.')
+    parser.add_argument(
+        '--no-label', action='store_false', dest='label',
+        help='Not a segmentation volume.')
+    parser.add_argument(
+        '--no-pyramid-axis', choices=('x', 'y', 'z'),
+        help='Thick slice axis that should not be downsampled.')
+    parser.add_argument(
+        '--chunk-mode', choices=('fixed', 'bytes'), default='fixed',
+        help='Chunk size of coarser levels. If "fixed", use the chunk '
+             'size of level 0. If "bytes", keep the number of voxels '
+             'per chunk roughly constant across levels.')
+    parser.add_argument(
+        '--ome-version', type=str, default="auto",
+        choices=("auto", "0.4", "0.5"),
+        help='OME-Zarr specification version. Default "auto" keeps the '
+             'version of existing metadata.')
+    parser.add_argument(
+        '--max-workers', type=int, default=1,
+        help='Number of blocks processed concurrently.')
+
+    args = args or sys.argv[1:]
+    args = parser.parse_args(args)
+
+    build_pyramid(
+        args.input,
+        nb_levels=args.levels,
+        label=args.label,
+        no_pyramid_axis=args.no_pyramid_axis,
+        chunk_mode=args.chunk_mode,
+        ome_version=args.ome_version,
+        max_workers=args.max_workers,
+    )
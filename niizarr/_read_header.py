@@ -0,0 +1,177 @@
+"""Read the header of (remote) nifti files without reading their data."""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from ._compat import fsspec
+from ._header import NIFTI_2_HEADER_SIZE, bin2nii_many
+from ._nii2zarr import nii2json_many
+
+# Header and extension flag
+HEADER_SIZE = NIFTI_2_HEADER_SIZE + 4
+# Number of compressed bytes fetched first for gzipped files
+GZIP_BLOCK_SIZE = 4096
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class _LocalFileSystem:
+    """Minimal stand-in for the local fsspec filesystem."""
+
+    async_impl = False
+
+    def cat_file(self, path: str, start: int, end: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+_LOCAL_FS = _LocalFileSystem()
+
+
+def _gunzip_head(data: bytes, size: int) -> bytes:
+    """Decompress (at most) the first `size` bytes of a gzip stream."""
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data, size)
+
+
+def _cat_heads(fs, paths: List[str], size: int,
+               max_workers: int) -> List[Union[bytes, Exception]]:
+    """Fetch the first `size` bytes of each path."""
+    if fs.async_impl:
+        # a single event loop and connection pool for all requests
+        return fs.cat_ranges(paths, [0] * len(paths), [size] * len(paths),
+                             batch_size=max_workers, on_error="return")
+
+    def cat(path):
+        try:
+            return fs.cat_file(path, 0, size)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(cat, paths))
+
+
+def _fetch_headers(fs, paths: List[str], max_workers: int) -> List[bytes]:
+    """Fetch the (decompressed) binary header of each path."""
+    heads = _cat_heads(fs, paths, HEADER_SIZE, max_workers)
+    buffers = [None] * len(paths)
+    todo = []
+    for i, head in enumerate(heads):
+        if isinstance(head, Exception):
+            raise head
+        if head[:2] == GZIP_MAGIC:
+            todo.append(i)
+        else:
+            buffers[i] = head
+
+    # gzipped files: fetch more compressed bytes until the header
+    # can be decompressed (or the file is exhausted)
+    size = GZIP_BLOCK_SIZE
+    while todo:
+        heads = _cat_heads(fs, [paths[i] for i in todo], size, max_workers)
+        retry = []
+        for i, head in zip(todo, heads):
+            if isinstance(head, Exception):
+                raise head
+            buffers[i] = _gunzip_head(head, HEADER_SIZE)
+            if len(buffers[i]) < HEADER_SIZE and len(head) == size:
+                retry.append(i)
+        todo, size = retry, size * 4
+    return buffers
+
+
+def read_headers(
+        urls: Sequence[str],
+        *,
+        raw: bool = False,
+        max_workers: int = 16,
+        store_opt: Optional[dict] = None,
+) -> Union[List[dict], np.ndarray]:
+    """
+    Read the headers of many (remote) nifti files.
+
+    Only the leading bytes of each file are fetched, with a range
+    request. Gzipped files are partially decompressed: the first
+    compressed block is fetched, and larger blocks only if it does not
+    contain the whole header. Files that live on the same filesystem
+    share a single fsspec filesystem (and therefore connection pool),
+    and are fetched concurrently.
+
+    Parameters
+    ----------
+    urls : list[str]
+        Paths or URLs of nifti files (.nii, .nii.gz, .hdr).
+    raw : bool, optional
+        If True, return the binary headers, parsed with `bin2nii_many`,
+        instead of their JSON form.
+    max_workers : int, optional
+        Maximum number of concurrent requests.
+    store_opt : dict, optional
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    list[dict] | np.ndarray
+        Nifti headers in JSON form (see `nii2json`), or structured array
+        of headers if `raw`.
+    """
+    store_opt = store_opt or {}
+    urls = list(urls)
+
+    # group urls by filesystem
+    groups = {}
+    for i, url in enumerate(urls):
+        if fsspec is not None:
+            fs, path = fsspec.core.url_to_fs(url, **store_opt)
+        elif "://" not in url or url.startswith("file://"):
+            # local files can be read without fsspec
+            fs, path = _LOCAL_FS, url.replace("file://", "", 1)
+        else:
+            raise ImportError("fsspec is required to read remote headers")
+        groups.setdefault(id(fs), (fs, [], []))
+        groups[id(fs)][1].append(i)
+        groups[id(fs)][2].append(path)
+
+    buffers = [None] * len(urls)
+    for fs, indices, paths in groups.values():
+        for i, buffer in zip(indices,
+                             _fetch_headers(fs, paths, max_workers)):
+            buffers[i] = buffer
+
+    if raw:
+        return bin2nii_many(buffers)
+    return nii2json_many(buffers)
+
+
+def read_header(
+        url: str,
+        *,
+        raw: bool = False,
+        store_opt: Optional[dict] = None,
+) -> Union[dict, np.ndarray]:
+    """
+    Read the header of a (remote) nifti file.
+
+    Only the leading bytes of the file are fetched
+    (see `read_headers`).
+
+    Parameters
+    ----------
+    url : str
+        Path or URL of a nifti file (.nii, .nii.gz, .hdr).
+    raw : bool, optional
+        If True, return the binary header, parsed with `bin2nii_many`,
+        instead of its JSON form.
+    store_opt : dict, optional
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    dict | np.ndarray
+        Nifti header in JSON form (see `nii2json`), or structured
+        header if `raw`.
+    """
+    return read_headers([url], raw=raw, max_workers=1,
+                        store_opt=store_opt)[0]
@@ -0,0 +1,391 @@
+"""Rechunk / reshard an existing nifti-zarr under a memory budget."""
+import argparse
+import math
+import sys
+import tempfile
+from argparse import ArgumentDefaultsHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import zarr
+
+from ._codecs import _make_codecs
+from ._compat import (
+    _array_options, _consolidate, _create_array, _open_zarr, _same_store,
+    pyzarr_version,
+)
+from ._nii2zarr import (
+    _expand_level_sizes, _iter_batch_blocks, _level_chunk, _level_shard
+)
+from ._pyramid import _axis_names, _level_paths
+from ._labels import _copy_label_index
+from ._stats import _copy_stats
+
+
+def _lcm(a: int, b: int) -> int:
+    return a * b // math.gcd(a, b)
+
+
+def _nbytes(block: Tuple[int], dtype: np.dtype) -> int:
+    return int(np.prod(block)) * np.dtype(dtype).itemsize
+
+
+def _copy_blocks(
+        src: zarr.Array,
+        dst: zarr.Array,
+        block_shape: Tuple[int],
+        max_workers: int = 1,
+) -> None:
+    """
+    Copy `src` into `dst`, one block at a time.
+
+    Blocks are aligned with the grid of `block_shape`. They are copied
+    concurrently only if they cover whole chunks (or shards) of `dst`,
+    so that no two workers write into the same chunk.
+    """
+    write_block = _array_options(dst)["shards"] or dst.chunks
+    aligned = all(
+        b % w == 0 or b >= n
+        for b, w, n in zip(block_shape, write_block, dst.shape)
+    )
+
+    def copy(slicer):
+        dst[slicer] = src[slicer]
+
+    blocks = _iter_batch_blocks(src.shape, block_shape)
+    if max_workers > 1 and aligned:
+        with ThreadPoolExecutor(max_workers) as pool:
+            for _ in pool.map(copy, blocks):
+                pass
+    else:
+        for slicer in blocks:
+            copy(slicer)
+
+
+def _rechunk_array(
+        src: zarr.Array,
+        dst: zarr.Array,
+        max_mem: int,
+        temp: Optional[zarr.Group] = None,
+        max_workers: int = 1,
+) -> bool:
+    """
+    Copy `src` into `dst` (with a different chunking) under `max_mem`.
+
+    As in `rechunker`, a direct copy is used when a block that covers
+    whole read chunks of `src` and whole write chunks of `dst` fits in
+    memory. Otherwise, data is first staged into an uncompressed
+    intermediate array whose chunks are the intersection of the read
+    and write chunks, so that each source chunk is only decoded once.
+
+    Parameters
+    ----------
+    src, dst : zarr.Array
+        Source and destination arrays, with the same shape.
+    max_mem : int
+        Maximum number of bytes held in memory by a copy block.
+    temp : zarr.Group, optional
+        Group where the intermediate array is written.
+        Required if staging is needed.
+    max_workers : int
+        Number of blocks copied concurrently.
+
+    Returns
+    -------
+    bool
+        Whether an intermediate array was used.
+    """
+    src_opts, dst_opts = _array_options(src), _array_options(dst)
+    # source shards are only read as a whole if they fit in memory
+    read_block = src_opts["shards"] or src.chunks
+    if _nbytes(read_block, src.dtype) > max_mem:
+        read_block = src.chunks
+    write_block = dst_opts["shards"] or dst.chunks
+    for name, block in (("read", read_block), ("write", write_block)):
+        if _nbytes(block, dst.dtype) > max_mem:
+            raise ValueError(
+                f"max_mem={max_mem} is smaller than the {name} block "
+                f"{block} of level {dst.basename}")
+
+    direct_block = tuple(
+        min(_lcm(r, w), int(math.ceil(n / w)) * w)
+        for r, w, n in zip(read_block, write_block, dst.shape)
+    )
+    if _nbytes(direct_block, dst.dtype) <= max_mem:
+        _copy_blocks(src, dst, direct_block, max_workers)
+        return False
+
+    if temp is None:
+        raise ValueError("A temporary group is required to stage data")
+    name = "stage_" + dst.basename
+    _create_array(
+        temp, name,
+        shape=src.shape,
+        chunks=tuple(min(r, w) for r, w in zip(read_block, write_block)),
+        dtype=src.dtype,
+        fill_value=src.fill_value,
+        compressors=None,
+        overwrite=True,
+    )
+    try:
+        _copy_blocks(src, temp[name], read_block, max_workers)
+        _copy_blocks(temp[name], dst, write_block, max_workers)
+    finally:
+        del temp[name]
+    return True
+
+
+def _batch_sizes(
+        axes: List[str],
+        current: Tuple[int],
+        shape: Tuple[int],
+        size_time: Optional[int],
+        size_channel: Optional[int],
+) -> Tuple[int]:
+    """Batch (time, channel) chunk or shard sizes. None keeps the
+    current size, 0 spans the whole axis."""
+    sizes = []
+    for axis, c, n in zip(axes, current, shape):
+        size = {"t": size_time, "c": size_channel}.get(axis)
+        sizes.append(c if size is None else (size or n))
+    return tuple(sizes)
+
+
+def rechunk(
+        inp: Union[str, Any],
+        out: Union[str, Any],
+        *,
+        chunk: Optional[Union[int, Tuple[int], List[Tuple[int]]]] = None,
+        chunk_channel: Optional[int] = None,
+        chunk_time: Optional[int] = None,
+        chunk_mode: Literal['fixed', 'bytes'] = 'fixed',
+        shard: Optional[Union[int, Tuple[int], List[Tuple[int]]]] = None,
+        shard_channel: Optional[int] = None,
+        shard_time: Optional[int] = None,
+        codecs: Optional[Union[str, dict, List[Union[str, dict]]]] = None,
+        max_mem: int = 256 * 2**20,
+        temp_store: Optional[Union[str, Any]] = None,
+        max_workers: int = 1,
+) -> dict:
+    """
+    Rechunk and/or reshard every level of a nifti-zarr.
+
+    Levels are copied block by block, under a memory budget, without
+    recomputing the pyramid. When the source and target layouts are
+    too different for a block to cover whole source and target chunks
+    within the budget, data is staged in an intermediate array.
+    The `nifti` header and all group attributes (OME metadata included)
+    are copied as is.
+
+    Parameters
+    ----------
+    inp : zarr.Store, zarr.Group or path
+        Input nifti-zarr.
+    out : zarr.Store, zarr.Group or path
+        Output nifti-zarr, in the same Zarr format as the input.
+        It must be different from the input.
+    chunk : int or tuple of int or list of tuple of int, optional
+        Chunk size for spatial dimensions, in nifti order (x, y, z).
+        A list of tuples allows different chunk sizes to be used at each
+        pyramid level. If None, keep the chunk size of each level.
+    chunk_channel, chunk_time : int, optional
+        Chunk size of the channel and time dimensions. If 0, combine
+        all channels/timepoints in a single chunk. If None, keep the
+        current chunk size.
+    chunk_mode : {'fixed', 'bytes'}, optional
+        How the spatial chunk size of coarser levels is chosen
+        (see `nii2zarr`). Only used if `chunk` is provided.
+    shard : int or tuple of int or list of tuple of int, optional
+        Shard size for spatial dimensions (Zarr v3 only). If None, keep
+        the current shards (which must then be a multiple of the new
+        chunks). If 0, do not shard.
+    shard_channel, shard_time : int, optional
+        Shard size of the channel and time dimensions. If 0, combine
+        all channels/timepoints in a single shard. If None, keep the
+        current size (or use the chunk size if the input is not sharded).
+    codecs : str | dict | list[str | dict], optional
+        Codec pipeline of the output (see `nii2zarr`).
+        If None, keep the codecs of each level.
+    max_mem : int, optional
+        Maximum number of bytes held in memory by a copy block.
+    temp_store : zarr.Store, zarr.Group or path, optional
+        Where intermediate arrays are staged.
+        Default: a local temporary directory.
+    max_workers : int, optional
+        Number of blocks copied concurrently.
+
+    Returns
+    -------
+    dict
+        For each level path, whether data was staged.
+    """
+    inp = _open_zarr(inp, mode="r")
+    zarr_version = inp.metadata.zarr_format if pyzarr_version == 3 else 2
+    if shard and zarr_version == 2:
+        raise ValueError("Sharding is only supported in zarr version 3")
+    # opening the output for writing would erase the input
+    same = _same_store(inp, out)
+    if same:
+        raise ValueError("The output must be different from the input.")
+    if same is None:
+        raise ValueError("Cannot tell whether the output is different "
+                         "from the input: pass a path or a known store.")
+    out = _open_zarr(out, zarr_version=zarr_version)
+
+    paths = _level_paths(inp)
+    axes = _axis_names(inp, inp[paths[0]].ndim)
+    nbatch = len(axes) - 3
+    if chunk is not None:
+        chunk = _expand_level_sizes(chunk)
+    if shard:
+        shard = _expand_level_sizes(shard)
+
+    # create output levels
+    for i, path in enumerate(paths):
+        src = inp[path]
+        opts = _array_options(src)
+        src_chunk, src_shard = opts.pop("chunks"), opts.pop("shards")
+        if codecs:
+            opts.update(_make_codecs(codecs, zarr_version, src.dtype))
+
+        level_chunk = tuple(src_chunk[-3:])
+        chunk_i = level_chunk
+        if chunk is not None:
+            chunk_i = chunk[min(i, len(chunk) - 1)][::-1]
+            level_chunk = _level_chunk(
+                src.shape[-3:], chunk_i, chunk_mode if i > 0 else 'fixed'
+            )
+        chunks = _batch_sizes(axes[:nbatch], src_chunk, src.shape,
+                              chunk_time, chunk_channel) + level_chunk
+
+        if shard:
+            shard_i = shard[min(i, len(shard) - 1)][::-1]
+            if chunk is not None and chunk_mode != 'fixed' and i > 0:
+                shard_i = _level_shard(src.shape[-3:], chunk_i, shard_i,
+                                       level_chunk)
+            shards = tuple(shard_i)
+        elif shard is None and src_shard:
+            shards = tuple(src_shard[-3:])
+        else:
+            shards = None
+        if shards:
+            shards = _batch_sizes(
+                axes[:nbatch], src_shard or chunks, src.shape,
+                shard_time, shard_channel) + shards
+            if any(s % c for s, c in zip(shards, chunks)):
+                raise ValueError(
+                    f"Shards {shards} of level {path} are not a multiple "
+                    f"of chunks {chunks}: specify `shard` explicitly")
+            opts["shards"] = shards
+
+        _create_array(out, path, shape=src.shape, chunks=chunks,
+                      dimension_names=axes, **opts)
+        out[path].attrs.update(dict(src.attrs))
+
+    # copy data
+    staged = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp = temp_store if temp_store is not None else tmpdir
+        temp = _open_zarr(temp, zarr_version=zarr_version)
+        for path in paths:
+            staged[path] = _rechunk_array(
+                inp[path], out[path], max_mem, temp, max_workers
+            )
+
+    # copy metadata
+    if "nifti" in inp:
+        header = inp["nifti"][:]
+        _create_array(
+            out,
+            'nifti',
+            shape=[len(header)],
+            chunks=len(header),
+            dtype='u1',
+            compressors=None,
+            fill_value=None,
+            dimension_separator='/',
+            overwrite=True,
+        )
+        out['nifti'][:] = header
+        out['nifti'].attrs.update(dict(inp['nifti'].attrs))
+    _copy_stats(inp, out)
+    _copy_label_index(inp, out)
+    attrs = dict(inp.attrs)
+    if codecs and "compression" in attrs.get("niizarr", {}):
+        # the recorded codec selection no longer applies
+        attrs["niizarr"] = dict(attrs["niizarr"])
+        del attrs["niizarr"]["compression"]
+    out.attrs.update(attrs)
+    _consolidate(out)
+    return staged
+
+
+def cli(args=None):
+    """    Command-line entrypoint"""
+    parser = argparse.ArgumentParser(
+        'niizarr-rechunk',
+        description='Rechunk / reshard every level of a nifti-zarr.',
+        formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        'input', help='Input zarr directory.')
+    parser.add_argument(
+        'output', help='Output zarr directory.')
+    parser.add_argument(
+        '--chunk', type=int, default=None,
+        help='Spatial chunk size. Default: keep current chunks.')
+    parser.add_argument(
+        '--chunk-time', type=int, default=None,
+        help='Chunk size of the time dimension (0: single chunk). '
+             'Default: keep current chunks.')
+    parser.add_argument(
+        '--chunk-channel', type=int, default=None,
+        help='Chunk size of the channel dimension (0: single chunk). '
+             'Default: keep current chunks.')
+    parser.add_argument(
+        '--chunk-mode', choices=('fixed', 'bytes'), default='fixed',
+        help='Chunk size of coarser levels. If "fixed", use the same chunk '
+             'size at every level. If "bytes", keep the number of voxels '
+             'per chunk roughly constant across levels.')
+    parser.add_argument(
+        '--shard', type=int, default=None,
+        help='Spatial shard size (0: no sharding). '
+             'Default: keep current shards.')
+    parser.add_argument(
+        '--shard-time', type=int, default=None,
+        help='Shard size of the time dimension (0: single shard).')
+    parser.add_argument(
+        '--shard-channel', type=int, default=None,
+        help='Shard size of the channel dimension (0: single shard).')
+    parser.add_argument(
+        '--codecs', default=None,
+        help='Codec pipeline of the output, e.g. '
+             '"delta+shuffle+zstd:level=5". Default: keep current codecs.')
+    parser.add_argument(
+        '--max-mem', type=int, default=256,
+        help='Memory budget of a copy block, in MiB.')
+    parser.add_argument(
+        '--temp-store', default=None,
+        help='Where intermediate arrays are staged. '
+             'Default: a local temporary directory.')
+    parser.add_argument(
+        '--max-workers', type=int, default=1,
+        help='Number of blocks copied concurrently.')
+
+    args = args or sys.argv[1:]
+    args = parser.parse_args(args)
+
+    rechunk(
+        args.input, args.output,
+        chunk=args.chunk,
+        chunk_time=args.chunk_time,
+        chunk_channel=args.chunk_channel,
+        chunk_mode=args.chunk_mode,
+        shard=args.shard,
+        shard_time=args.shard_time,
+        shard_channel=args.shard_channel,
+        codecs=args.codecs,
+        max_mem=args.max_mem * 2**20,
+        temp_store=args.temp_store,
+        max_workers=args.max_workers,
+    )
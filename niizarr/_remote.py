@@ -0,0 +1,194 @@
+"""Shared filesystems and request tuning for remote nifti-zarr stores."""
+import asyncio
+import json
+import threading
+from typing import Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ._compat import fsspec, pyzarr_version
+
+# Protocols that are opened directly, without a shared filesystem
+LOCAL_PROTOCOLS = (None, "file", "local")
+
+# Errors that are not worth retrying (FsspecStore maps the first three
+# to missing keys)
+PERMANENT_ERRORS = (FileNotFoundError, IsADirectoryError, NotADirectoryError,
+                    PermissionError)
+
+# Tunables of remote requests (see `configure_remote`)
+REMOTE_OPTIONS = {
+    "max_concurrency": 16,
+    "retries": 3,
+    "backoff": 0.2,
+}
+
+_FS_POOL = {}
+_SEMAPHORES = {}
+_POOL_LOCK = threading.Lock()
+
+
+def configure_remote(
+        *,
+        max_concurrency: Optional[int] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+) -> dict:
+    """
+    Tune the requests made to remote (non-local) stores.
+
+    Remote filesystems (and therefore their sessions and connection
+    pools) are shared by all groups opened with the same protocol and
+    storage options, across threads. These options apply to all of them.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Maximum number of concurrent requests per host (or bucket).
+    retries : int, optional
+        Number of times a request that failed with a transient error
+        (e.g., a connection reset or a timeout) is retried.
+    backoff : float, optional
+        Delay before the first retry, in seconds. It doubles after each
+        retry.
+
+    Returns
+    -------
+    dict
+        Current options.
+    """
+    with _POOL_LOCK:
+        if max_concurrency is not None:
+            if max_concurrency < 1:
+                raise ValueError("max_concurrency must be positive")
+            REMOTE_OPTIONS["max_concurrency"] = int(max_concurrency)
+            _SEMAPHORES.clear()
+        if retries is not None:
+            REMOTE_OPTIONS["retries"] = max(0, int(retries))
+        if backoff is not None:
+            REMOTE_OPTIONS["backoff"] = max(0.0, float(backoff))
+    return dict(REMOTE_OPTIONS)
+
+
+def clear_remote_pool() -> None:
+    """Forget all shared remote filesystems."""
+    with _POOL_LOCK:
+        _FS_POOL.clear()
+        _SEMAPHORES.clear()
+
+
+def _is_remote(url: Any) -> bool:
+    """Whether a path or URL points to a remote filesystem."""
+    if fsspec is None or not isinstance(url, str) or "::" in url:
+        # chained URLs are left to fsspec
+        return False
+    return fsspec.core.split_protocol(url)[0] not in LOCAL_PROTOCOLS
+
+
+def _pooled_fs(url: str, storage_options: Optional[dict] = None,
+               asynchronous: bool = True) -> Tuple[Any, str]:
+    """
+    Shared filesystem for a URL, and the path of the URL in it.
+
+    Filesystems are keyed by protocol and storage options. Unlike
+    fsspec's instance cache, which keys asynchronous instances by thread,
+    the same instance is returned to all threads.
+    """
+    protocol = fsspec.core.split_protocol(url)[0]
+    cls = fsspec.get_filesystem_class(protocol)
+    options = dict(storage_options or {})
+    if cls.async_impl:
+        options["asynchronous"] = asynchronous
+    key = (protocol, json.dumps(options, sort_keys=True, default=repr))
+    with _POOL_LOCK:
+        if key not in _FS_POOL:
+            _FS_POOL[key] = cls(skip_instance_cache=True, **options)
+        fs = _FS_POOL[key]
+    return fs, cls._strip_protocol(url)
+
+
+def _host(path: str) -> str:
+    """Host (or bucket) of a filesystem path."""
+    return urlsplit(path).netloc or path.split("/")[0]
+
+
+def _semaphore(host: str) -> asyncio.Semaphore:
+    """Semaphore that limits concurrent requests to a host."""
+    # semaphores are bound to the event loop that first waits on them
+    key = (id(asyncio.get_running_loop()), host)
+    with _POOL_LOCK:
+        if key not in _SEMAPHORES:
+            _SEMAPHORES[key] = asyncio.Semaphore(
+                REMOTE_OPTIONS["max_concurrency"])
+        return _SEMAPHORES[key]
+
+
+if pyzarr_version == 3:
+    from zarr.storage import FsspecStore, WrapperStore
+
+    class _RemoteStore(WrapperStore):
+        """
+        Store that limits the number of concurrent requests per host and
+        retries requests that failed with a transient error.
+        """
+
+        def __init__(self, store: FsspecStore) -> None:
+            super().__init__(store)
+            self._hostname = _host(store.path)
+
+        async def _request(self, method: str, *args: Any) -> Any:
+            delay = REMOTE_OPTIONS["backoff"]
+            for attempt in range(REMOTE_OPTIONS["retries"] + 1):
+                try:
+                    async with _semaphore(self._hostname):
+                        return await getattr(self._store, method)(*args)
+                except PERMANENT_ERRORS:
+                    raise
+                except (OSError, asyncio.TimeoutError):
+                    if attempt == REMOTE_OPTIONS["retries"]:
+                        raise
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        async def get(self, key, prototype, byte_range=None):
+            return await self._request("get", key, prototype, byte_range)
+
+        async def get_partial_values(self, prototype, key_ranges):
+            return await self._request(
+                "get_partial_values", prototype, key_ranges)
+
+        async def exists(self, key):
+            return await self._request("exists", key)
+
+        async def set(self, key, value):
+            return await self._request("set", key, value)
+
+        async def delete(self, key):
+            return await self._request("delete", key)
+
+
+def _remote_store(url: str, storage_options: Optional[dict] = None,
+                  mode: str = "r") -> Any:
+    """
+    Zarr store backed by the shared filesystem of a remote URL.
+
+    Parameters
+    ----------
+    url : str
+        Remote URL (e.g., "s3://bucket/image.nii.zarr").
+    storage_options : dict, optional
+        Options passed to the fsspec filesystem.
+    mode : {"r", "w", "a"}
+        Opening mode.
+    """
+    if pyzarr_version == 3:
+        protocol = fsspec.core.split_protocol(url)[0]
+        if not fsspec.get_filesystem_class(protocol).async_impl:
+            # synchronous filesystems are wrapped by zarr itself
+            return FsspecStore.from_url(url, storage_options=storage_options,
+                                        read_only=mode == "r")
+        fs, path = _pooled_fs(url, storage_options)
+        return _RemoteStore(FsspecStore(fs=fs, path=path,
+                                        read_only=mode == "r"))
+    import zarr.storage
+    fs, path = _pooled_fs(url, storage_options, asynchronous=False)
+    return zarr.storage.FSStore(path, fs=fs, mode=mode)
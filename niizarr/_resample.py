@@ -0,0 +1,162 @@
+"""Resample a nifti-zarr onto an arbitrary grid."""
+import itertools
+from typing import Any, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from nibabel import Nifti1Image, Nifti2Image
+from scipy import ndimage
+
+from ._prefetch import _read_ahead
+from ._slice import SliceReader
+from ._zarr2nii import _ome2affine
+
+# Interpolation orders
+ORDERS = {"nearest": 0, "linear": 1}
+
+
+def _source_box(
+        coords: np.ndarray, shape: Sequence[int]
+) -> Optional[Tuple[list, list]]:
+    """
+    Box of source voxels needed to interpolate at `coords` (3, ...),
+    clipped to the volume, or None if all points are outside.
+    """
+    lo = np.floor(coords.reshape(3, -1).min(-1)).astype(int)
+    hi = np.floor(coords.reshape(3, -1).max(-1)).astype(int) + 2
+    lo = np.maximum(lo, 0)
+    hi = np.minimum(hi, shape)
+    if np.any(hi <= lo):
+        return None
+    return lo.tolist(), hi.tolist()
+
+
+def resample(
+        inp: Union[str, Any, SliceReader],
+        affine: np.ndarray,
+        shape: Sequence[int],
+        *,
+        order: Union[int, Literal["linear", "nearest"]] = 1,
+        level: Optional[int] = None,
+        t: int = 0,
+        c: int = 0,
+        scaled: bool = True,
+        block_size: int = 64,
+        max_workers: int = 4,
+        cache_size: int = 64 * 2**20,
+        cache: Optional[Union[bool, int, str, Any]] = None,
+        **store_opt
+) -> Union[Nifti1Image, Nifti2Image]:
+    """
+    Resample a nifti-zarr onto a target grid.
+
+    The output is computed one block at a time. Each block only fetches
+    the source chunks that it needs, so that memory use is bounded by
+    the output volume, the decoded-chunk cache and a few blocks.
+    Blocks are computed concurrently.
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | path | SliceReader
+        Nifti-zarr group, or a reader (whose chunk cache is reused).
+    affine : (4, 4) array
+        Voxel-to-world (mm) affine of the target grid.
+    shape : (int, int, int)
+        Spatial shape of the target grid.
+    order : {0, 1, "nearest", "linear"}, optional
+        Interpolation order. Use "nearest" for label maps.
+    level : int, optional
+        Pyramid level to resample from. By default, the coarsest level
+        whose voxels are no larger than the sampling step of the target
+        grid (along each axis).
+    t, c : int, optional
+        Time point and channel.
+    scaled : bool, optional
+        Apply the intensity scaling of the nifti header.
+    block_size : int, optional
+        Size of the output blocks (voxels along each axis).
+    max_workers : int, optional
+        Number of blocks computed concurrently.
+    cache_size : int, optional
+        Maximum size (in bytes) of the decoded-chunk cache, if a new
+        reader is created.
+    cache : bool | int | str | ChunkCache, optional
+        Local cache of encoded chunks (see `zarr2nii`), if a new reader
+        is created.
+    **store_opt
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    Nifti1Image | Nifti2Image
+        Resampled image. Voxels that fall outside of the source volume
+        are zero.
+    """
+    if isinstance(order, str):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown interpolation: {order!r}")
+        order = ORDERS[order]
+    if order not in (0, 1):
+        raise ValueError("Only nearest (0) and linear (1) interpolation "
+                         "are supported.")
+    if isinstance(inp, SliceReader):
+        reader = inp
+    else:
+        reader = SliceReader(inp, cache_size=cache_size, cache=cache,
+                             **store_opt)
+    affine = np.asarray(affine, dtype=np.float64)
+    shape = tuple(int(n) for n in shape)
+    if len(shape) != 3:
+        raise ValueError("The target shape must be 3D.")
+
+    if level is None:
+        if reader._ome:
+            # sampling step of the target grid along each source axis
+            step = np.linalg.inv(reader.affine(0)) @ affine
+            step = np.sqrt(np.sum(step[:3, :3] ** 2, 1))
+            vx = np.abs(np.diag(_ome2affine(reader._ome, 0))[:3])
+            level = reader.select_level(resolution=(step * vx).tolist())
+        else:
+            level = 0
+    level = reader._level(level)
+    # target voxels -> source voxels
+    mat = np.linalg.inv(reader.affine(level)) @ affine
+    src_shape = reader.shape(level)
+
+    slope, inter = reader.header.get_slope_inter()
+    scale = scaled and (slope is not None or inter is not None)
+    slope = 1.0 if slope is None else slope
+    inter = 0.0 if inter is None else inter
+    dtype = reader._array(level).dtype
+    if scale or order > 0:
+        dtype = np.dtype(np.float32)
+
+    def compute(start):
+        stop = [min(i + block_size, n) for i, n in zip(start, shape)]
+        grid = np.stack(np.meshgrid(
+            *[np.arange(i, j) for i, j in zip(start, stop)],
+            indexing="ij"))
+        coords = np.einsum("ij,j...->i...", mat[:3, :3], grid) \
+            + mat[:3, 3].reshape(3, 1, 1, 1)
+        box = _source_box(coords, src_shape)
+        if box is None:
+            return start, stop, None
+        lo, hi = box
+        src = reader._region(level, lo, hi, t, c)
+        if scale:
+            src = src.astype(np.float32) * slope + inter
+        coords -= np.reshape(lo, (3, 1, 1, 1))
+        data = ndimage.map_coordinates(src, coords, output=dtype,
+                                       order=order, mode="constant",
+                                       cval=0)
+        return start, stop, data
+
+    out = np.zeros(shape, dtype=dtype)
+    starts = itertools.product(*[range(0, n, block_size) for n in shape])
+    for start, stop, data in _read_ahead(compute, starts, max_workers):
+        if data is not None:
+            out[tuple(slice(i, j) for i, j in zip(start, stop))] = data
+
+    header = reader.header.copy()
+    if scale:
+        header.set_slope_inter(None, None)
+    return reader._image_class(out, affine, header)
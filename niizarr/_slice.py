@@ -0,0 +1,296 @@
+"""Read 2D planes of a nifti-zarr without loading the volume."""
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+from nibabel.orientations import io_orientation
+
+from ._compat import _open_zarr
+from ._pyramid import _axis_names, _level_paths
+from ._zarr2nii import _level_transform, _nifti_header, _select_level
+
+# Anatomical planes -> world axis (RAS) normal to the plane
+PLANES = {"sagittal": 0, "coronal": 1, "axial": 2}
+
+
+class SliceReader:
+    """
+    Read 2D planes of a nifti-zarr, at any level and orientation.
+
+    The group metadata and nifti header are read once, when the reader
+    is created. Each plane only fetches the chunks that intersect it,
+    concurrently, and decoded chunks are kept in a small LRU cache so
+    that neighbouring planes are read from memory.
+
+    Parameters
+    ----------
+    group : zarr.Store | zarr.Group | path
+        Nifti-zarr group.
+    cache_size : int, optional
+        Maximum size (in bytes) of the decoded-chunk cache.
+    max_workers : int, optional
+        Number of chunks fetched concurrently.
+    cache : bool | int | str | ChunkCache, optional
+        Local cache of encoded chunks (see `zarr2nii`).
+    **store_opt
+        Options passed to the fsspec filesystem.
+    """
+
+    def __init__(
+            self,
+            group: Union[str, Any],
+            *,
+            cache_size: int = 64 * 2**20,
+            max_workers: int = 8,
+            cache: Optional[Union[bool, int, str, Any]] = None,
+            **store_opt
+    ) -> None:
+        omz = _open_zarr(group, mode="r", store_opt=store_opt, cache=cache)
+        if not isinstance(omz, zarr.Group):
+            raise ValueError("This is not a nifti-zarr group.")
+        self.omz = omz
+        self._ome = omz.attrs.get("ome", omz.attrs).get("multiscales", None)
+        self._paths = _level_paths(omz)
+        if not self._paths:
+            raise ValueError("This is a Zarr group but not an OME-Zarr.")
+        self._arrays = [None] * len(self._paths)
+        self.axes = _axis_names(omz, self._array(0).ndim)
+        self.header, self._image_class = _nifti_header(
+            omz, self._array(0), self._ome)
+        self.cache_size = cache_size
+        self.max_workers = max_workers
+        self._chunks = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nb_levels(self) -> int:
+        """Number of pyramid levels."""
+        return len(self._paths)
+
+    def _array(self, level: int) -> zarr.Array:
+        if self._arrays[level] is None:
+            self._arrays[level] = self.omz[self._paths[level]]
+        return self._arrays[level]
+
+    def _level(self, level: int) -> int:
+        if level < 0:
+            level += self.nb_levels
+        if not 0 <= level < self.nb_levels:
+            raise IndexError(
+                "Pyramid level does not exist. Number of levels:",
+                self.nb_levels)
+        return level
+
+    def shape(self, level: int = 0) -> Tuple[int, int, int]:
+        """Spatial shape of a level, in nifti order (x, y, z)."""
+        shape = self._array(self._level(level)).shape
+        return tuple(shape[self.axes.index(name)] for name in "xyz")
+
+    def affine(self, level: int = 0) -> np.ndarray:
+        """Voxel-to-world (mm) affine of a level."""
+        level = self._level(level)
+        affine = self.header.get_best_affine()
+        if level and self._ome:
+            affine = affine @ _level_transform(self._ome, level)
+        return affine
+
+    def select_level(
+            self,
+            resolution: Optional[Union[float, Sequence[float]]] = None,
+            max_bytes: Optional[int] = None,
+            max_shape: Optional[Union[int, Sequence[int]]] = None,
+    ) -> int:
+        """
+        Cheapest pyramid level that satisfies size and resolution
+        constraints (see `zarr2nii`).
+
+        Parameters
+        ----------
+        resolution : float or (float, float, float), optional
+            Largest acceptable voxel size (mm).
+        max_bytes : int, optional
+            Largest acceptable array size (bytes).
+        max_shape : int or (int, int, int), optional
+            Largest acceptable spatial shape (voxels).
+
+        Returns
+        -------
+        int
+            Index of the selected level.
+        """
+        return _select_level(self.omz, self._ome, self._paths,
+                             resolution, max_bytes, max_shape)
+
+    def _voxel_axis(self, axis: Union[int, str], level: int) -> int:
+        """Voxel axis normal to the plane."""
+        if isinstance(axis, str) and axis in PLANES:
+            ornt = io_orientation(self.affine(level))
+            return int(np.flatnonzero(ornt[:, 0] == PLANES[axis])[0])
+        if isinstance(axis, str) and axis in ("x", "y", "z"):
+            return "xyz".index(axis)
+        if axis in (0, 1, 2):
+            return int(axis)
+        raise ValueError(f"Unknown axis: {axis!r}")
+
+    def _voxel_index(self, position: float, axis: int, level: int,
+                     space: str) -> int:
+        """Voxel index of a plane along a voxel axis."""
+        shape = self.shape(level)
+        if space == "world":
+            # solve for the voxel coordinate along `axis` at which the
+            # world coordinate (along the most aligned world axis) is
+            # `position`, at the center of the other axes
+            affine = self.affine(level)
+            world = int(io_orientation(affine)[axis, 0])
+            center = [(n - 1) / 2 for n in shape]
+            other = sum(affine[world, i] * center[i]
+                        for i in range(3) if i != axis)
+            position = (position - affine[world, 3] - other) \
+                / affine[world, axis]
+        elif space != "voxel":
+            raise ValueError(f"Unknown space: {space!r}")
+        index = int(round(position))
+        if not 0 <= index < shape[axis]:
+            raise IndexError(
+                f"Plane {index} is out of bounds along axis {axis} "
+                f"(size {shape[axis]})")
+        return index
+
+    def _get_chunks(self, level: int, coords: list) -> dict:
+        """Decoded chunks of a level, from the cache or the store."""
+        arr = self._array(level)
+        chunks = {}
+        missing = []
+        with self._lock:
+            for coord in coords:
+                key = (level, coord)
+                if key in self._chunks:
+                    self._chunks.move_to_end(key)
+                    chunks[coord] = self._chunks[key]
+                else:
+                    missing.append(coord)
+
+        def fetch(coord):
+            region = tuple(
+                slice(i * c, min((i + 1) * c, n))
+                for i, c, n in zip(coord, arr.chunks, arr.shape))
+            return coord, arr[region]
+
+        if len(missing) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                fetched = list(pool.map(fetch, missing))
+        else:
+            fetched = list(map(fetch, missing))
+
+        with self._lock:
+            for coord, data in fetched:
+                chunks[coord] = data
+                key = (level, coord)
+                if key in self._chunks:
+                    # fetched concurrently by another thread
+                    self._chunks.move_to_end(key)
+                    continue
+                if data.nbytes > self.cache_size:
+                    continue
+                self._chunks[key] = data
+                self._nbytes += data.nbytes
+                while self._nbytes > self.cache_size:
+                    _, old = self._chunks.popitem(last=False)
+                    self._nbytes -= old.nbytes
+        return chunks
+
+    def _region(self, level: int, start: Sequence[int], stop: Sequence[int],
+                t: int = 0, c: int = 0) -> np.ndarray:
+        """
+        Raw values of a box of voxels (nifti order, at time `t` and
+        channel `c`), assembled from the chunks that intersect it.
+        """
+        arr = self._array(level)
+        bounds = dict(zip("xyz", zip(start, stop)))
+        bounds["t"], bounds["c"] = (t, t + 1), (c, c + 1)
+        ranges, boxes = [], []
+        for name, n, chunk in zip(self.axes, arr.shape, arr.chunks):
+            lo, hi = bounds[name]
+            if not 0 <= lo < hi <= n:
+                raise IndexError(f"Region [{lo}, {hi}) is out of bounds "
+                                 f"along axis {name} (size {n})")
+            ranges.append(range(lo // chunk, (hi - 1) // chunk + 1))
+            boxes.append((lo, hi))
+        coords = list(itertools.product(*ranges))
+        chunks = self._get_chunks(level, coords)
+
+        out = np.empty([hi - lo for lo, hi in boxes], dtype=arr.dtype)
+        for coord, data in chunks.items():
+            src, dst = [], []
+            for i, (lo, hi) in enumerate(boxes):
+                first = coord[i] * arr.chunks[i]
+                lo_, hi_ = max(lo, first), min(hi, first + data.shape[i])
+                src.append(slice(lo_ - first, hi_ - first))
+                dst.append(slice(lo_ - lo, hi_ - lo))
+            out[tuple(dst)] = data[tuple(src)]
+
+        # zarr order (e.g., c, z, y, x) -> nifti order (x, y, z)
+        out = out.reshape([hi - lo for name, (lo, hi) in zip(self.axes, boxes)
+                           if name in "xyz"])
+        names = [name for name in self.axes if name in "xyz"]
+        return out.transpose([names.index(name) for name in "xyz"])
+
+    def plane(
+            self,
+            position: float,
+            axis: Union[int, Literal["x", "y", "z", "sagittal", "coronal",
+                                     "axial"]] = "z",
+            *,
+            level: int = 0,
+            t: int = 0,
+            c: int = 0,
+            space: Literal["voxel", "world"] = "voxel",
+            scaled: bool = True,
+    ) -> np.ndarray:
+        """
+        Read a 2D plane.
+
+        Parameters
+        ----------
+        position : float
+            Position of the plane: a voxel index (at this level) if
+            `space="voxel"`, or a world coordinate (in mm) along the
+            world axis normal to the plane if `space="world"`.
+        axis : {"x", "y", "z", 0, 1, 2, "sagittal", "coronal", "axial"}
+            Voxel axis normal to the plane, or anatomical plane (in which
+            case the voxel axis most aligned with the world axis is used).
+        level : int, optional
+            Pyramid level.
+        t, c : int, optional
+            Time point and channel.
+        space : {"voxel", "world"}, optional
+            Space in which `position` is expressed.
+        scaled : bool, optional
+            Apply the intensity scaling of the nifti header.
+
+        Returns
+        -------
+        np.ndarray
+            Plane, whose dimensions are the two other voxel axes, in
+            nifti order (e.g., (x, y) for an axial plane).
+        """
+        level = self._level(level)
+        axis = self._voxel_axis(axis, level)
+        index = self._voxel_index(position, axis, level, space)
+        start = [0, 0, 0]
+        stop = list(self.shape(level))
+        start[axis], stop[axis] = index, index + 1
+        out = self._region(level, start, stop, t, c)
+        out = out[tuple(0 if i == axis else slice(None) for i in range(3))]
+        if scaled:
+            slope, inter = self.header.get_slope_inter()
+            if slope is not None or inter is not None:
+                slope = 1.0 if slope is None else slope
+                inter = 0.0 if inter is None else inter
+                out = out * slope + inter
+        return out
@@ -0,0 +1,327 @@
+"""Intensity statistics of nifti-zarr levels, computed at write time."""
+import itertools
+import math
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+
+from ._compat import _create_array, _open_zarr, _resize
+
+# Number of histogram bins
+HISTOGRAM_BINS = 64
+
+# Summary fields of each chunk, followed by its histogram
+FIELDS = ("min", "max", "sum", "count")
+
+
+def _has_stats(dtype: np.dtype) -> bool:
+    """Whether statistics can be computed for a data type."""
+    dtype = np.dtype(dtype)
+    return dtype.fields is None and (
+        np.issubdtype(dtype, np.integer)
+        or np.issubdtype(dtype, np.floating)
+        or np.issubdtype(dtype, np.bool_)
+    )
+
+
+def _scale(values: np.ndarray, slope: float, inter: float) -> np.ndarray:
+    if (slope, inter) == (1.0, 0.0):
+        return values
+    return values.astype(np.float64) * slope + inter
+
+
+def _histogram_edges(data: Union[np.ndarray, Iterable[np.ndarray]],
+                     slope: float = 1.0,
+                     inter: float = 0.0,
+                     nbins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """
+    Edges of the histograms of a volume (in scaled units).
+
+    Integer volumes whose range is smaller than the number of bins get
+    one bin per integer value. The volume can also be given as an
+    iterable of blocks.
+    """
+    blocks = [data] if isinstance(data, np.ndarray) else data
+    lo = hi = None
+    for block in blocks:
+        kind = block.dtype.kind
+        values = block[np.isfinite(block)] if kind == "f" else block
+        if values.size == 0:
+            continue
+        block_lo, block_hi = values.min().item(), values.max().item()
+        lo = block_lo if lo is None else min(lo, block_lo)
+        hi = block_hi if hi is None else max(hi, block_hi)
+    if lo is None:
+        return np.linspace(0, 1, nbins + 1)
+    if kind in "iub" and (slope, inter) == (1.0, 0.0) \
+            and hi - lo < nbins:
+        return np.arange(lo, hi + 2) - 0.5
+    lo, hi = sorted([lo * slope + inter, hi * slope + inter])
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, nbins + 1)
+
+
+def _chunk_stats(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Summary fields and histogram of the (scaled) values of a chunk."""
+    values = values.ravel()
+    if values.dtype.kind == "f":
+        values = values[np.isfinite(values)]
+    stats = np.zeros(len(FIELDS) + len(edges) - 1)
+    if values.size == 0:
+        stats[:2] = np.nan
+        return stats
+    stats[0] = values.min()
+    stats[1] = values.max()
+    stats[2] = values.sum(dtype=np.float64)
+    stats[3] = values.size
+    # values outside of the edges (e.g., laplacian pyramids) are
+    # counted in the first or last bin
+    nbins = len(edges) - 1
+    index = (values - edges[0]) * (nbins / (edges[-1] - edges[0]))
+    index = np.clip(index, 0, nbins - 1).astype(np.intp)
+    stats[len(FIELDS):] = np.bincount(index, minlength=nbins)
+    return stats
+
+
+def _block_stats(data: np.ndarray, block: Sequence[int], edges: np.ndarray,
+                 slope: float = 1.0, inter: float = 0.0) -> np.ndarray:
+    """
+    Statistics of each chunk of a region whose origin is aligned with
+    chunks, with shape (*chunk_grid, fields).
+    """
+    ranges = [range(math.ceil(n / c)) for n, c in zip(data.shape, block)]
+    stats = np.zeros([len(r) for r in ranges]
+                     + [len(FIELDS) + len(edges) - 1])
+    for index in itertools.product(*ranges):
+        chunk = data[tuple(slice(i * c, (i + 1) * c)
+                           for i, c in zip(index, block))]
+        stats[index] = _chunk_stats(_scale(chunk, slope, inter), edges)
+    return stats
+
+
+def _reduce(stats: np.ndarray) -> dict:
+    """Global statistics from the statistics of a set of chunks."""
+    stats = stats.reshape([-1, stats.shape[-1]])
+    stats = stats[stats[:, 3] > 0]
+    count = stats[:, 3].sum()
+    return {
+        "min": float(stats[:, 0].min()) if count else math.nan,
+        "max": float(stats[:, 1].max()) if count else math.nan,
+        "mean": float(stats[:, 2].sum() / count) if count else math.nan,
+        "count": int(count),
+        "histogram": stats[:, len(FIELDS):].sum(0).astype(np.int64).tolist(),
+    }
+
+
+def _create_stats_array(group: zarr.Group, name: str,
+                        shape: Sequence[int], block: Sequence[int]) -> None:
+    """Create the per-chunk statistics array of a level."""
+    _create_array(
+        group, name,
+        shape=tuple(shape),
+        chunks=tuple(min(n, 16) for n in shape[:-1]) + tuple(shape[-1:]),
+        dtype="<f8",
+        fill_value=0.0,
+        dimension_separator='/',
+        overwrite=True,
+    )
+    group[name].attrs.update({
+        "fields": list(FIELDS) + ["histogram"],
+        "block": list(block),
+    })
+
+
+class _PyramidStats:
+    """
+    Accumulate the per-chunk statistics of pyramid levels while they
+    are written (see `_write_pyramid`).
+    """
+
+    def __init__(self, arrays: Sequence[zarr.Array], edges: np.ndarray,
+                 slope: float = 1.0, inter: float = 0.0) -> None:
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.slope, self.inter = slope, inter
+        self.blocks = [tuple(arr.chunks) for arr in arrays]
+        self.dtypes = [arr.dtype for arr in arrays]
+        self.stats = [
+            np.zeros([math.ceil(n / c) for n, c in zip(arr.shape, arr.chunks)]
+                     + [len(FIELDS) + len(self.edges) - 1])
+            for arr in arrays
+        ]
+
+    def update(self, level: int, slicer: Tuple[slice],
+               data: np.ndarray) -> None:
+        """
+        Compute the statistics of the chunks of a block of a level.
+
+        `slicer` is the position of the block along the batch
+        dimensions. It must be aligned with chunks.
+        """
+        block = self.blocks[level]
+        data = np.asarray(data, dtype=self.dtypes[level])
+        stats = _block_stats(data, block, self.edges, self.slope, self.inter)
+        self.stats[level][tuple(
+            slice(s.start // c, s.start // c + n)
+            for s, c, n in zip(slicer, block, stats.shape)
+        )] = stats
+
+    def write(self, omz: zarr.Group) -> List[dict]:
+        """
+        Write the per-chunk statistics (`stats/<level>` arrays) and the
+        global statistics of each level (`niizarr.stats` attribute).
+        """
+        group = omz.require_group("stats")
+        levels = []
+        for i, (stats, block) in enumerate(zip(self.stats, self.blocks)):
+            _create_stats_array(group, str(i), stats.shape, block)
+            group[str(i)][...] = stats
+            levels.append(_reduce(stats))
+        niizarr_attrs = dict(omz.attrs.get("niizarr", {}))
+        niizarr_attrs["stats"] = {
+            "bins": self.edges.tolist(),
+            "levels": levels,
+        }
+        omz.attrs["niizarr"] = niizarr_attrs
+        return levels
+
+
+def _refresh_stats(omz: zarr.Group, level: int,
+                   region: Optional[Sequence[slice]] = None) -> None:
+    """
+    Recompute the statistics of the chunks of a level that intersect a
+    region (in zarr order), from the stored data, after it was modified.
+    Nothing is done if the group does not have statistics.
+    """
+    attrs = omz.attrs.get("niizarr", {}).get("stats", None)
+    if attrs is None:
+        return
+    from ._header import bin2nii
+    from ._nii2zarr import _read_nifti_header
+    from ._pyramid import _level_paths
+
+    header = bin2nii(_read_nifti_header(omz))
+    slope, inter = header["scl_slope"].item(), header["scl_inter"].item()
+    if not math.isfinite(slope) or slope == 0:
+        slope, inter = 1.0, 0.0
+    edges = np.asarray(attrs["bins"])
+    arr = omz[_level_paths(omz)[level]]
+    block = tuple(arr.chunks)
+    shape = [math.ceil(n / c) for n, c in zip(arr.shape, block)]
+    shape += [len(FIELDS) + len(edges) - 1]
+
+    group = omz.require_group("stats")
+    name = str(level)
+    if name not in group or list(group[name].attrs["block"]) != list(block):
+        _create_stats_array(group, name, shape, block)
+        region = None
+    elif list(group[name].shape) != shape:
+        _resize(group[name], tuple(shape))
+
+    if region is None:
+        region = [slice(None)] * arr.ndim
+    box = []
+    for s, c, n in zip(region, block, arr.shape):
+        start, stop, _ = s.indices(n)
+        box.append(slice(start // c * c, min(math.ceil(stop / c) * c, n)))
+    stats = _block_stats(arr[tuple(box)], block, edges, slope, inter)
+    group[name][tuple(
+        slice(b.start // c, b.start // c + n)
+        for b, c, n in zip(box, block, stats.shape)
+    )] = stats
+
+    niizarr_attrs = dict(omz.attrs["niizarr"])
+    niizarr_attrs["stats"] = dict(attrs)
+    levels = list(attrs["levels"])[:level]
+    levels += [None] * (level - len(levels))
+    levels.append(_reduce(group[name][...]))
+    levels += list(attrs["levels"])[level + 1:]
+    niizarr_attrs["stats"]["levels"] = levels
+    omz.attrs["niizarr"] = niizarr_attrs
+
+
+def _truncate_stats(omz: zarr.Group, nb_levels: int) -> None:
+    """Remove the statistics of the levels beyond `nb_levels`."""
+    attrs = omz.attrs.get("niizarr", {}).get("stats", None)
+    if attrs is None:
+        return
+    if "stats" in omz:
+        for name in list(omz["stats"].array_keys()):
+            if int(name) >= nb_levels:
+                del omz["stats"][name]
+    niizarr_attrs = dict(omz.attrs["niizarr"])
+    niizarr_attrs["stats"] = dict(attrs, levels=attrs["levels"][:nb_levels])
+    omz.attrs["niizarr"] = niizarr_attrs
+
+
+def _copy_stats(inp: zarr.Group, out: zarr.Group) -> None:
+    """Copy the per-chunk statistics of a nifti-zarr."""
+    if "stats" not in inp:
+        return
+    group = out.require_group("stats")
+    for name, src in inp["stats"].arrays():
+        _create_stats_array(group, name, src.shape, src.attrs["block"])
+        group[name][...] = src[...]
+
+
+def read_stats(
+        inp: Union[str, Any],
+        level: int = 0,
+        region: Optional[Sequence[slice]] = None,
+        **store_opt
+) -> dict:
+    """
+    Read the intensity statistics of a nifti-zarr.
+
+    Statistics are computed by `nii2zarr` (in scaled units, ignoring
+    non-finite values). Global statistics are read from the group
+    attributes, without any request beyond the metadata. Statistics of
+    a region are reduced from the statistics of the chunks that
+    intersect it, so they cover whole chunks.
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | path
+        Nifti-zarr group.
+    level : int, optional
+        Pyramid level.
+    region : sequence of slice, optional
+        Region, in nifti order (x, y, z, t, c), in voxels of the level.
+        Missing dimensions are read entirely.
+    **store_opt
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    dict
+        Keys "min", "max", "mean", "count" (number of finite voxels),
+        "histogram" (counts) and "bins" (edges of the histogram bins).
+    """
+    omz = _open_zarr(inp, mode="r", store_opt=store_opt)
+    attrs = omz.attrs.get("niizarr", {}).get("stats", None)
+    if attrs is None:
+        raise ValueError("This nifti-zarr does not have statistics.")
+    if level < 0:
+        level += len(attrs["levels"])
+    if not 0 <= level < len(attrs["levels"]):
+        raise IndexError("Pyramid level does not exist. Number of levels:",
+                         len(attrs["levels"]))
+    if region is None:
+        return dict(attrs["levels"][level], bins=list(attrs["bins"]))
+
+    from ._pyramid import _axis_names, _level_paths
+    shape = omz[_level_paths(omz)[level]].shape
+    stats = omz["stats"][str(level)]
+    block = stats.attrs["block"]
+    axes = _axis_names(omz, len(block))
+    region = dict(zip("xyztc", region))
+    index = []
+    for name, b, n in zip(axes, block, shape):
+        start, stop, step = region.get(name, slice(None)).indices(n)
+        if step != 1:
+            raise ValueError("Regions must be contiguous.")
+        if start >= stop:
+            raise ValueError(f"Empty region along axis {name}")
+        index.append(slice(start // b, (stop - 1) // b + 1))
+    return dict(_reduce(stats[tuple(index)]), bins=list(attrs["bins"]))
@@ -0,0 +1,190 @@
+"""Direct array access to a nifti-zarr, in nifti axis order."""
+import inspect
+from typing import Any, Literal, Optional, Sequence, Tuple, Union
+
+import dask.array
+import numpy as np
+import zarr
+from dask.base import tokenize
+from nibabel.nifti1 import Nifti1Header
+from nibabel.nifti2 import Nifti2Header
+
+from ._compat import _open_zarr
+from ._zarr2nii import _open_level
+
+
+def _nifti_axes(axes: Sequence[str], ndim: int) -> Tuple[Optional[int], ...]:
+    """
+    Zarr axis of each of the first `ndim` nifti axes (x, y, z, t, c),
+    or None if the zarr array does not have it.
+    """
+    return tuple(
+        axes.index(name) if name in axes else None
+        for name in "xyztc"[:ndim]
+    )
+
+
+class NiftiZarrArray:
+    """
+    View of a zarr array in nifti axis order (x, y, z[, t[, c]]).
+
+    Indexing with integers, slices and Ellipsis is translated into a
+    single selection of the zarr array, whose result is transposed (not
+    copied) into nifti order. Values are not scaled by the slope and
+    intercept of the header.
+
+    Parameters
+    ----------
+    array : zarr.Array
+        Array of a pyramid level.
+    axes : sequence[str]
+        Names of the zarr axes.
+    ndim : int
+        Number of nifti dimensions.
+    """
+
+    def __init__(self, array: zarr.Array, axes: Sequence[str],
+                 ndim: int) -> None:
+        self.zarr = array
+        self.axes = tuple(axes)
+        self._perm = _nifti_axes(self.axes, ndim)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(1 if i is None else self.zarr.shape[i]
+                     for i in self._perm)
+
+    @property
+    def chunks(self) -> Tuple[int, ...]:
+        return tuple(1 if i is None else self.zarr.chunks[i]
+                     for i in self._perm)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.zarr.dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self._perm)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return (f"NiftiZarrArray(shape={self.shape}, dtype={self.dtype}, "
+                f"chunks={self.chunks})")
+
+    def _key(self, key: Any) -> Tuple[Union[int, slice], ...]:
+        """Expand an index into one integer or slice per nifti axis."""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if sum(k is Ellipsis for k in key) > 1:
+            raise IndexError("An index can only have a single ellipsis")
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i + 1:]
+        key = key + (slice(None),) * (self.ndim - len(key))
+        if len(key) > self.ndim:
+            raise IndexError(f"Too many indices: array is {self.ndim}-D")
+        for k in key:
+            if not isinstance(k, (slice, int, np.integer)):
+                raise IndexError("Only integers, slices and Ellipsis are "
+                                 "supported")
+        return key
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        key = self._key(key)
+        # zarr axes absent from nifti have length 1
+        selection = [0] * self.zarr.ndim
+        shape = []
+        for k, i, n in zip(key, self._perm, self.shape):
+            if isinstance(k, slice):
+                shape.append(len(range(*k.indices(n))))
+            elif not -n <= k < n:
+                raise IndexError(f"Index {k} is out of bounds for axis "
+                                 f"with size {n}")
+            if i is not None:
+                selection[i] = k
+        if 0 in shape:
+            return np.empty(shape, dtype=self.dtype)
+        data = self.zarr[tuple(selection)]
+
+        # zarr order -> nifti order (on axes that are not dropped)
+        kept = [i for i, k in enumerate(selection) if isinstance(k, slice)]
+        order = [kept.index(i) for k, i in zip(key, self._perm)
+                 if isinstance(k, slice) and i is not None]
+        data = np.asarray(data).transpose(order)
+        if data.ndim != len(shape):
+            data = data.reshape(shape)
+        return data
+
+    def __array__(self, dtype: Optional[np.dtype] = None,
+                  copy: Optional[bool] = None) -> np.ndarray:
+        data = self[...]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+
+def _to_dask(view: NiftiZarrArray) -> dask.array.Array:
+    """
+    Dask array of a view, with a single graph layer whose tasks read
+    one chunk each (axes are permuted and dropped in zarr index space).
+    """
+    name = "from-niizarr-" + tokenize(view.zarr, view.axes, view.ndim)
+    opt = {}
+    if "inline_array" in inspect.signature(dask.array.from_array).parameters:
+        # dask >= 2021.01: keep the view inside each task
+        opt["inline_array"] = True
+    return dask.array.from_array(view, chunks=view.chunks, name=name,
+                                 fancy=False, **opt)
+
+
+def open_niizarr(
+        inp: Union[str, Any],
+        level: int = 0,
+        *,
+        mode: Literal["r", "a"] = "r",
+        cache: Optional[Union[bool, int, str, Any]] = None,
+        resolution: Optional[Union[float, Sequence[float]]] = None,
+        max_bytes: Optional[int] = None,
+        max_shape: Optional[Union[int, Sequence[int]]] = None,
+        **store_opt
+) -> Tuple[NiftiZarrArray, Union[Nifti1Header, Nifti2Header], np.ndarray]:
+    """
+    Open a nifti-zarr for direct array access, without building a
+    nibabel image or a dask graph.
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | zarr.Array | path
+        Nifti-zarr.
+    level : int
+        Pyramid level.
+    mode : {"r", "a"}
+        Opening mode.
+    cache : bool | int | str | ChunkCache, optional
+        Local cache of encoded chunks (see `zarr2nii`).
+    resolution, max_bytes, max_shape : optional
+        Select the level by resolution or size (see `zarr2nii`).
+    **store_opt
+        Options passed to the fsspec filesystem.
+
+    Returns
+    -------
+    array : NiftiZarrArray
+        View of the level in nifti order, indexed like a numpy array.
+    header : Nifti1Header | Nifti2Header
+        Nifti header of the level.
+    affine : np.ndarray
+        Voxel-to-world affine of the level.
+    """
+    omz = _open_zarr(inp, mode=mode, store_opt=store_opt, cache=cache)
+    array, header, _, axes = _open_level(
+        omz, level, resolution, max_bytes, max_shape)
+    view = NiftiZarrArray(array, axes, len(header.get_data_shape()))
+    header.set_data_shape(view.shape)
+    return view, header, header.get_best_affine()
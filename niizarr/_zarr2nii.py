@@ -1,19 +1,30 @@
 import argparse
 import io
+import itertools
+import math
+import os
 import sys
 from argparse import ArgumentDefaultsHelpFormatter
 from os import PathLike
-from typing import Any, Literal, Optional, Union
+from typing import (
+    Any, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+)
 
 import dask.array
 import numpy as np
 import zarr.storage
 from nibabel import (save, load)
+from nibabel.arraywriters import get_slope_inter, make_array_writer
+from nibabel.openers import Opener
+from nibabel.volumeutils import seek_tell
 from nibabel.nifti1 import Nifti1Image, Nifti1Header
 from nibabel.nifti2 import Nifti2Image, Nifti2Header
 
+from ._cache import ChunkCache
 from ._compat import _open_zarr
 from ._header import bin2nii, get_nibabel_klass
+from ._nii2zarr import _read_nifti_header
+from ._prefetch import _read_ahead
 from ._units import convert_unit, ome_valid_units
 
 
@@ -113,43 +124,137 @@ def default_nifti_header(inp0: zarr.Array, ome: dict) -> Union[Nifti1Header, Nif
     return niiheader
 
 
-def zarr2nii(
-        inp: Union[str, PathLike, Any],
-        out: Optional[Union[str, PathLike]] = None,
-        level: Union[int, str] = 0,
-        mode: Literal["r", "w", "a"] = "r",
-        **store_opt
-) -> Union[Nifti1Image, Nifti2Image]:
+def _nifti_header(
+        omz: Optional[zarr.Group],
+        inp0: zarr.Array,
+        ome: Optional[list],
+) -> Tuple[Union[Nifti1Header, Nifti2Header], type]:
     """
-    Convert a nifti-zarr to nifti
+    Nifti header of a nifti-zarr, and the matching nibabel image class.
 
-    Parameters
-    ----------
-    inp : zarr.Store | zarr.Group | zarr.Array | path
-        Output zarr object
-    out : path or file_like, optional
-        Path to output file. If not provided, do not write a file.
-    level : int
-        Pyramid level to extract
-    mode : {"r", "w", "a"}
-        Opening mode.
+    The binary header is read from the group if it has one, else a
+    default header is built from the OME metadata.
+    """
+    buffer = _read_nifti_header(omz) if omz is not None else None
+    if buffer is None:
+        niiheader = default_nifti_header(inp0, ome)
+        if isinstance(niiheader, Nifti2Header):
+            NiftiImage = Nifti2Image
+        elif isinstance(niiheader, Nifti1Header):
+            NiftiImage = Nifti1Image
+        else:
+            raise ValueError("Unrecognized nifti header.")
+    else:
+        header = bin2nii(buffer)
+        NiftiHeader, NiftiImage = get_nibabel_klass(header)
+
+        niiheader = NiftiHeader.from_fileobj(io.BytesIO(buffer), check=False)
+    return niiheader, NiftiImage
+
+
+def _level_transform(ome: list, level: int) -> np.ndarray:
+    """
+    Transform from the voxels of a pyramid level to the voxels of the
+    finest level (nifti order).
+    """
+    datasets = ome[0]['datasets']
+    phys = []
+    for dataset in (datasets[0], datasets[level]):
+        scales, offsets = [], []
+        for xfrm_ in dataset['coordinateTransformations']:
+            if xfrm_["type"] == "scale":
+                scales = xfrm_["scale"]
+                if offsets:
+                    # not valid OME but let's be robust
+                    offsets = [t * s for t, s in zip(offsets, scales)]
+            elif xfrm_["type"] == "translation":
+                offsets = xfrm_["translation"]
+
+        phys1 = np.eye(4)
+        phys1[[0, 1, 2], [0, 1, 2]] = list(reversed(scales[-3:]))
+        if offsets:
+            phys1[:3, -1] = list(reversed(offsets[-3:]))
+        phys.append(phys1)
+    return np.linalg.inv(phys[0]) @ phys[1]
+
+
+def _select_level(
+        omz: zarr.Group,
+        ome: Optional[list],
+        paths: List[str],
+        resolution: Optional[Union[float, Sequence[float]]] = None,
+        max_bytes: Optional[int] = None,
+        max_shape: Optional[Union[int, Sequence[int]]] = None,
+) -> int:
+    """
+    Cheapest pyramid level that satisfies size and resolution constraints.
+
+    Size constraints (`max_bytes`, `max_shape`) must be satisfied. Among
+    the levels that satisfy them, the coarsest level whose voxels are no
+    larger than `resolution` (in mm) is selected, or the finest level if
+    no resolution is requested or none is fine enough.
 
     Returns
     -------
-    out : nib.Nifti1Image
-        Mapped output file _or_ Nifti object whose dataobj is a dask array
+    int
+        Index of the selected level.
     """
+    names = [axis["name"] for axis in ome[0]["axes"]] if ome else None
+    if max_shape is not None:
+        max_shape = [max_shape] * 3 if np.ndim(max_shape) == 0 \
+            else list(max_shape)
+    fits = []
+    for i, path in enumerate(paths):
+        arr = omz[path]
+        axes = names or list(('x', 'y', 'z', 'c', 't')[:arr.ndim][::-1])
+        shape = [arr.shape[axes.index(name)] if name in axes else 1
+                 for name in "xyz"]
+        if max_bytes is not None and \
+                math.prod(arr.shape) * arr.dtype.itemsize > max_bytes:
+            continue
+        if max_shape is not None and \
+                any(n > m for n, m in zip(shape, max_shape)):
+            continue
+        fits.append(i)
+    if not fits:
+        raise ValueError("No pyramid level satisfies the size constraints")
+    if resolution is None:
+        return fits[0]
+    if not ome:
+        raise ValueError("Selecting a level by resolution requires "
+                         "OME metadata")
+    resolution = [resolution] * 3 if np.ndim(resolution) == 0 \
+        else list(resolution)
+    fine = [
+        i for i in fits
+        if all(v <= r * (1 + 1e-6) for v, r in zip(
+            np.abs(np.diag(_ome2affine(ome, i))[:3]), resolution))
+    ]
+    return fine[-1] if fine else fits[0]
 
-    inp = _open_zarr(inp, mode=mode, store_opt=store_opt)
-
-    # ----------------
-    # prepare metadata
-    # ----------------
 
+def _open_level(
+        inp: Union[zarr.Group, zarr.Array],
+        level: int = 0,
+        resolution: Optional[Union[float, Sequence[float]]] = None,
+        max_bytes: Optional[int] = None,
+        max_shape: Optional[Union[int, Sequence[int]]] = None,
+) -> Tuple[zarr.Array, Union[Nifti1Header, Nifti2Header], type,
+           Tuple[str, ...]]:
+    """
+    Array of a pyramid level of an opened nifti-zarr, along with the
+    nifti header of that level (whose affine maps its voxels), the
+    matching nibabel image class and the names of the zarr axes.
+    """
     # Get OME metadata (if exists)
     ome = inp.attrs.get("ome", inp.attrs).get("multiscales", None)
 
     # Compute number of levels
+    constrained = any(x is not None for x in (resolution, max_bytes,
+                                              max_shape))
+    if constrained and level != 0:
+        raise ValueError("`level` cannot be combined with `resolution`, "
+                         "`max_bytes` or `max_shape`")
     if isinstance(inp, zarr.Group):
         is_group = True
         if ome:
@@ -168,11 +273,16 @@ def zarr2nii(
                     "Pyramid level does not exist. Number of levels:",
                     nb_levels
                 )
-            levels = [{"path": str(level) for level in range(nb_levels)}]
+            levels = [{"path": str(i)} for i in range(nb_levels)]
+        if constrained:
+            level = _select_level(inp, ome, [x["path"] for x in levels],
+                                  resolution, max_bytes, max_shape)
         inp0 = inp[levels[0]["path"]]
     else:
         is_group = False
         inp0 = inp
+        if constrained:
+            raise ValueError("Level selection requires a nifti-zarr group")
         if level not in (0, -1):
             raise IndexError("Pyramid level does not exist -- not an OME zarr")
 
@@ -180,104 +290,95 @@ def zarr2nii(
     # read or build nifti header
     # --------------------------
 
-    if not is_group or 'nifti' not in inp:
-        niiheader = default_nifti_header(inp0, ome)
-        if isinstance(niiheader, Nifti2Header):
-            NiftiImage = Nifti2Image
-        elif isinstance(niiheader, Nifti1Header):
-            NiftiImage = Nifti1Image
-        else:
-            raise ValueError("Unrecognized nifti header.")
-    else:
-        header = bin2nii(np.asarray(inp['nifti']).tobytes())
-        NiftiHeader, NiftiImage = get_nibabel_klass(header)
-
-        niiheader = NiftiHeader.from_fileobj(
-            io.BytesIO(np.asarray(inp['nifti']).tobytes()),
-            check=False)
+    niiheader, NiftiImage = _nifti_header(inp if is_group else None, inp0, ome)
 
     # -----------------------------------
     # create affine at current resolution
     # -----------------------------------
 
     if level != 0:
-
+        xfrm = _level_transform(ome, level)
         qform, qcode = niiheader.get_qform(coded=True)
         sform, scode = niiheader.get_sform(coded=True)
-        datasets = ome[0]['datasets']
+        if qform is not None:
+            niiheader.set_qform(qform @ xfrm, qcode)
+        if sform is not None:
+            niiheader.set_sform(sform @ xfrm, scode)
 
-        xfrm0 = datasets[0]['coordinateTransformations']
-        scales, offsets = [], []
-        for xfrm_ in xfrm0:
-            if xfrm_["type"] == "scale":
-                scales = xfrm_["scale"]
-                if offsets:
-                    # not valid OME but let's be robust
-                    offsets = [t * s for t, s in zip(offsets, scales)]
-            elif xfrm_["type"] == "translation":
-                offsets = xfrm_["translation"]
-
-        phys0 = np.eye(4)
-        phys0[[0, 1, 2], [0, 1, 2]] = list(reversed(scales[-3:]))
-        if offsets:
-            phys0[:3, -1] = list(reversed(offsets[-3:]))
+    array = inp[levels[level]["path"]] if is_group else inp
 
-        xfrm1 = datasets[level]['coordinateTransformations']
-        scales, offsets = [], []
-        for xfrm_ in xfrm1:
-            if xfrm_["type"] == "scale":
-                scales = xfrm_["scale"]
-                if offsets:
-                    # not valid OME but let's be robust
-                    offsets = [t * s for t, s in zip(offsets, scales)]
-            elif xfrm_["type"] == "translation":
-                offsets = xfrm_["translation"]
+    # get zarr axes
+    if ome:
+        axes = tuple(axis['name'] for axis in ome[0]['axes'])
+    else:
+        axes = ('x', 'y', 'z', 'c', 't')[:len(inp0.shape)][::-1]
+    return array, niiheader, NiftiImage, axes
 
-        phys1 = np.eye(4)
-        phys1[[0, 1, 2], [0, 1, 2]] = list(reversed(scales[-3:]))
-        if offsets:
-            phys1[:3, -1] = list(reversed(offsets[-3:]))
 
-        qform = qform @ (np.linalg.inv(phys0) @ phys1)
-        sform = sform @ (np.linalg.inv(phys0) @ phys1)
-        niiheader.set_qform(qform, qcode)
-        niiheader.set_sform(sform, scode)
+def zarr2nii(
+        inp: Union[str, PathLike, Any],
+        out: Optional[Union[str, PathLike]] = None,
+        level: Union[int, str] = 0,
+        mode: Literal["r", "w", "a"] = "r",
+        cache: Optional[Union[bool, int, str, Any]] = None,
+        prefetch: int = 4,
+        max_mem: int = 256 * 2**20,
+        resolution: Optional[Union[float, Sequence[float]]] = None,
+        max_bytes: Optional[int] = None,
+        max_shape: Optional[Union[int, Sequence[int]]] = None,
+        **store_opt
+) -> Union[Nifti1Image, Nifti2Image]:
+    """
+    Convert a nifti-zarr to nifti
 
-    # load/map array with dask
-    if is_group:
-        array = dask.array.from_zarr(inp[levels[level]["path"]])
-    else:
-        array = dask.array.from_zarr(inp)
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | zarr.Array | path
+        Output zarr object
+    out : path or file_like, optional
+        Path to output file. If not provided, do not write a file.
+    level : int
+        Pyramid level to extract
+    mode : {"r", "w", "a"}
+        Opening mode.
+    cache : bool | int | str | ChunkCache, optional
+        Read chunks through a local cache, shared by all calls: True or
+        "memory" for an in-memory cache, an integer for an in-memory
+        cache of that size (in bytes), a directory for an on-disk cache,
+        or a `ChunkCache` instance.
+    prefetch : int, optional
+        When writing a .nii or .nii.gz file, the volume is streamed slab
+        by slab (one row of chunks along z at a time). This is the
+        number of slabs read ahead while the current one is written.
+    max_mem : int, optional
+        Maximum memory (in bytes) used by slabs read ahead. The read-ahead
+        depth is reduced if needed.
+    resolution : float or (float, float, float), optional
+        Select the coarsest level whose voxels are no larger than this
+        (in mm, per spatial axis in nifti order), instead of `level`.
+        If no level is fine enough, the finest level is selected.
+    max_bytes : int, optional
+        Select the finest level whose array is no larger than this
+        (in bytes), instead of `level`.
+    max_shape : int or (int, int, int), optional
+        Select the finest level whose spatial shape is no larger than
+        this, instead of `level`. Size constraints can be combined with
+        `resolution`, in which case they take precedence.
 
-    # -------------------------------
-    # reorder/reshape array as needed
-    # -------------------------------
+    Returns
+    -------
+    out : nib.Nifti1Image
+        Mapped output file _or_ Nifti object whose dataobj is a dask array
+    """
 
-    # get zarr axes
-    if ome:
-        actual_axis_order = tuple(axis['name'] for axis in ome[0]['axes'])
-    else:
-        actual_axis_order = ('x', 'y', 'z', 'c', 't')[:len(inp0.shape)][::-1]
+    inp = _open_zarr(inp, mode=mode, store_opt=store_opt, cache=cache)
 
-    # add axes if needed
+    array, niiheader, NiftiImage, actual_axis_order = _open_level(
+        inp, level, resolution, max_bytes, max_shape)
+    # map the array in nifti order (x, y, z, t, c) with a single layer
+    from ._view import NiftiZarrArray, _to_dask
     nifti_ndim = len(niiheader.get_data_shape())
-    slicer = (Ellipsis,) + (None,) * max(0, 5 - array.ndim)
-    array = array[slicer]
-
-    # permute axes to nifti order (x, y, z, t, c)
-    perm, i = [], len(actual_axis_order)
-    for name in 'xyztc':
-        if name in actual_axis_order:
-            perm += [actual_axis_order.index(name)]
-        else:
-            perm += [i]
-            i += 1
-
-    array = array.transpose(perm)
-
-    # drop axes
-    slicer = (slice(None),) * nifti_ndim + (0,) * (array.ndim - nifti_ndim)
-    array = array[slicer]
+    array = _to_dask(NiftiZarrArray(array, actual_axis_order, nifti_ndim))
 
     # create nibabel image
     img = NiftiImage(array, None, niiheader)
@@ -286,12 +387,129 @@ def zarr2nii(
         if hasattr(out, 'read') and hasattr(img, "to_stream"):
             img.to_stream(out)
         else:
-            save(img, out)
+            if not _write_nifti(img, out, prefetch, max_mem):
+                save(img, out)
             img = load(out)
 
     return img
 
 
+def _slab_regions(array: dask.array.Array) -> Iterator[tuple]:
+    """
+    Regions of a nifti-ordered array that hold one row of chunks along z
+    (at a given time point and channel), in the order of the file.
+    """
+    if array.ndim < 3:
+        yield (slice(None),) * array.ndim
+        return
+    bounds = np.cumsum((0,) + array.chunks[2]).tolist()
+    extra = [range(n) for n in array.shape[3:]]
+    for index in itertools.product(*extra[::-1]):
+        for z0, z1 in zip(bounds[:-1], bounds[1:]):
+            yield (slice(None), slice(None), slice(z0, z1)) + index[::-1]
+
+
+def _iter_slabs(
+        array: dask.array.Array,
+        prefetch: int = 4,
+        max_mem: int = 256 * 2**20,
+) -> Iterator[Tuple[tuple, np.ndarray]]:
+    """Read the slabs of a nifti-ordered array, with read-ahead."""
+    regions = list(_slab_regions(array))
+    if not regions:
+        return
+    shape = array[regions[0]].shape
+    nbytes = max(1, int(np.prod(shape)) * array.dtype.itemsize)
+    depth = min(prefetch, max(1, max_mem // nbytes)) if prefetch > 0 else 0
+
+    def fetch(region):
+        return region, np.asarray(array[region])
+
+    yield from _read_ahead(fetch, regions, depth)
+
+
+def iter_slabs(
+        inp: Union[str, PathLike, Any],
+        level: int = 0,
+        *,
+        prefetch: int = 4,
+        max_mem: int = 256 * 2**20,
+        cache: Optional[Union[bool, int, str, Any]] = None,
+        **store_opt
+) -> Iterator[Tuple[tuple, np.ndarray]]:
+    """
+    Iterate over the slabs of a nifti-zarr, in nifti voxel order.
+
+    Each slab is one row of chunks along z, at a given time point and
+    channel. Slabs are yielded in the order of a nifti file (z, then
+    time, then channel), while the next ones are read concurrently in
+    the background, which hides the latency of the store.
+
+    Parameters
+    ----------
+    inp : zarr.Store | zarr.Group | zarr.Array | path
+        Input nifti-zarr.
+    level : int
+        Pyramid level to read.
+    prefetch : int, optional
+        Number of slabs read ahead of the current one.
+    max_mem : int, optional
+        Maximum memory (in bytes) used by slabs read ahead.
+    cache : bool | int | str | ChunkCache, optional
+        Local chunk cache (see `zarr2nii`).
+
+    Yields
+    ------
+    index : tuple[slice | int]
+        Index of the slab in the (x, y, z, [t, [c]]) volume.
+    slab : np.ndarray
+        Stored (unscaled) values of the slab.
+    """
+    img = zarr2nii(inp, level=level, cache=cache, **store_opt)
+    yield from _iter_slabs(img.dataobj, prefetch, max_mem)
+
+
+def _write_nifti(
+        img: Union[Nifti1Image, Nifti2Image],
+        out: Union[str, PathLike],
+        prefetch: int = 4,
+        max_mem: int = 256 * 2**20,
+) -> bool:
+    """
+    Stream a dask-backed nifti image to a .nii or .nii.gz file.
+
+    The file is identical to the one written by `nibabel.save`, but
+    the volume is never loaded in memory at once.
+
+    Returns
+    -------
+    bool
+        False if the image cannot be streamed (e.g., the output is a
+        header/image pair or the data must be rescaled), in which case
+        nothing was written.
+    """
+    path = os.fspath(out)
+    if not path.endswith((".nii", ".nii.gz")):
+        return False
+    array = img.dataobj
+    header = img.header
+    img.update_header()
+    out_dtype = header.get_data_dtype()
+    if out_dtype.newbyteorder("=") != array.dtype.newbyteorder("="):
+        return False
+    writer = make_array_writer(np.zeros(1, array.dtype), out_dtype,
+                               header.has_data_slope,
+                               header.has_data_intercept)
+    header['scl_slope'], header['scl_inter'] = get_slope_inter(writer)
+
+    with Opener(path, "wb") as f:
+        header.write_to(f)
+        seek_tell(f, header.get_data_offset(), write0=True)
+        for _, slab in _iter_slabs(array, prefetch, max_mem):
+            f.write(slab.astype(out_dtype, copy=False).tobytes(order="F"))
+    return True
+
+
 def cli(args=None):
     """Command-line entrypoint"""
     parser = argparse.ArgumentParser(
@@ -306,6 +524,34 @@ def cli(args=None):
     parser.add_argument(
         '--level', type=int, default=0,
         help='Pyramid level to extract (default: 0 = finest).')
+    parser.add_argument(
+        '--resolution', type=float, default=None,
+        help='Extract the coarsest level whose voxels are no larger '
+             'than this (mm).')
+    parser.add_argument(
+        '--max-bytes', type=int, default=None,
+        help='Extract the finest level whose array is no larger than this '
+             '(bytes).')
+    parser.add_argument(
+        '--max-shape', type=int, default=None,
+        help='Extract the finest level whose spatial dimensions are no '
+             'larger than this (voxels).')
+    parser.add_argument(
+        '--cache', default=None,
+        help='Read chunks through a local cache: "memory", or the '
+             'directory of an on-disk cache.')
+    parser.add_argument(
+        '--cache-size', type=int, default=512,
+        help='Maximum size of the cache (MiB).')
+    parser.add_argument(
+        '--no-validate-cache', action='store_false', dest='validate_cache',
+        help='Do not check the ETag/modification time of cached chunks.')
+    parser.add_argument(
+        '--prefetch', type=int, default=4,
+        help='Number of slabs read ahead while writing.')
+    parser.add_argument(
+        '--max-mem', type=int, default=256,
+        help='Maximum memory used by slabs read ahead (MiB).')
 
     args = args or sys.argv[1:]
     args = parser.parse_args(args)
@@ -320,4 +566,14 @@ def cli(args=None):
             args.output = args.input[:-5] + '.nii.gz'
         else:
             args.output = args.input + '.nii.gz'
-    zarr2nii(args.input, args.output, args.level)
+    cache = None
+    if args.cache:
+        cache = ChunkCache(
+            args.cache_size * 2**20,
+            directory=None if args.cache == "memory" else args.cache,
+            validate=args.validate_cache,
+        )
+    zarr2nii(args.input, args.output, args.level, cache=cache,
+             prefetch=args.prefetch, max_mem=args.max_mem * 2**20,
+             resolution=args.resolution, max_bytes=args.max_bytes,
+             max_shape=args.max_shape)
@@ -4,9 +4,15 @@ import os
 
 import numpy as np
 import skimage as sk
+import zarr
 from jsondiff import JsonDiffer
 from nibabel import Nifti1Image, Nifti2Image
 
+from niizarr._compat import pyzarr_version
+
+# Zarr formats that can be written with the installed zarr-python
+ZARR_VERSIONS = [2, 3] if pyzarr_version >= 3 else [2]
+
 klass_map = {
     1: Nifti1Image,
     2: Nifti2Image
@@ -106,6 +112,22 @@ def compare_zarr_archives(path1, path2):
     return True
 
 
+def assert_same_levels(path1, path2):
+    """
+    Assert that two nifti-zarrs have the same pyramid levels (at least
+    two) with identical values.
+    """
+    omz1 = zarr.open(path1, mode="r")
+    omz2 = zarr.open(path2, mode="r")
+    level = 0
+    while str(level) in omz1:
+        np.testing.assert_array_equal(omz1[str(level)][:],
+                                      omz2[str(level)][:])
+        level += 1
+    assert level > 1, "Expected a pyramid"
+    assert str(level) not in omz2, f"Unexpected level {level}"
+
+
 # This script generates trusted test data.
 if __name__ == '__main__':
     from niizarr import *
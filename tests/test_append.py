@@ -0,0 +1,93 @@
+import itertools
+import os
+import tempfile
+import unittest
+
+import nibabel as nib
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import append, nii2zarr, zarr2nii
+from niizarr._nii2zarr import cli
+
+from ._data import ZARR_VERSIONS, assert_same_levels
+
+
+class TestAppend(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.full_zarr = os.path.join(self.temp_dir.name, 'full.nii.zarr')
+        self.append_zarr = os.path.join(self.temp_dir.name, 'append.nii.zarr')
+        self.img = np.random.rand(32, 24, 16, 5).astype(np.float32)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append(self):
+        for zarr_version, chunk_time in itertools.product(ZARR_VERSIONS,
+                                                          (1, 2)):
+            with self.subTest(zarr_version=zarr_version,
+                              chunk_time=chunk_time):
+                nii2zarr(Nifti1Image(self.img, np.eye(4)), self.full_zarr,
+                         chunk=8, chunk_time=chunk_time,
+                         zarr_version=zarr_version)
+                nii2zarr(Nifti1Image(self.img[..., :3], np.eye(4)),
+                         self.append_zarr, chunk=8, chunk_time=chunk_time,
+                         zarr_version=zarr_version)
+                # one 3D volume, then a 4D image
+                append(self.img[..., 3], self.append_zarr)
+                append(Nifti1Image(self.img[..., 4:], np.eye(4)),
+                       self.append_zarr)
+                assert_same_levels(self.full_zarr, self.append_zarr)
+
+                loaded = zarr2nii(self.append_zarr)
+                self.assertEqual(loaded.shape, self.img.shape)
+                np.testing.assert_array_equal(loaded.get_fdata(), self.img)
+                omz = zarr.open(self.append_zarr, mode="r")
+                self.assertEqual(omz["nifti"].attrs["Dim"], [32, 24, 16, 5])
+
+    def test_append_label(self):
+        img = np.random.randint(0, 4, (16, 16, 16, 3)).astype(np.int16)
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(img, np.eye(4)), self.full_zarr,
+                         chunk=8, label=True, zarr_version=zarr_version)
+                nii2zarr(Nifti1Image(img[..., :2], np.eye(4)),
+                         self.append_zarr, chunk=8, label=True,
+                         zarr_version=zarr_version)
+                append(img[..., 2], self.append_zarr)
+                assert_same_levels(self.full_zarr, self.append_zarr)
+
+    def test_append_cli(self):
+        volume = os.path.join(self.temp_dir.name, 'volume.nii.gz')
+        nib.save(Nifti1Image(self.img[..., 4:], np.eye(4)), volume)
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.img[..., :4], np.eye(4)),
+                         self.append_zarr, chunk=8,
+                         zarr_version=zarr_version)
+                cli([volume, self.append_zarr, '--append'])
+                loaded = zarr2nii(self.append_zarr)
+                np.testing.assert_array_equal(loaded.get_fdata(), self.img)
+
+    def test_no_time(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.img[..., 0], np.eye(4)),
+                         self.append_zarr, chunk=8,
+                         zarr_version=zarr_version)
+                self.assertRaises(ValueError, append, self.img[..., 1],
+                                  self.append_zarr)
+
+    def test_wrong_shape(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.img, np.eye(4)), self.append_zarr,
+                         chunk=8, zarr_version=zarr_version)
+                self.assertRaises(ValueError, append, self.img[1:, ..., 0],
+                                  self.append_zarr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import build_pyramid, nii2zarr, zarr2nii
+from niizarr._compat import _create_array, pyzarr_version
+from niizarr._pyramid import cli
+
+from ._data import ZARR_VERSIONS, assert_same_levels
+
+
+def _multiscales(omz):
+    return omz.attrs.get("ome", omz.attrs)["multiscales"][0]
+
+
+class TestBuildPyramid(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.full_zarr = os.path.join(self.temp_dir.name, 'full.nii.zarr')
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_float(self):
+        img = np.random.rand(40, 36, 20, 2).astype(np.float32)
+        affine = np.diag([0.5, 0.5, 2, 1])
+        ni = Nifti1Image(img, affine)
+        ni.set_qform(affine, 1)
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(ni, self.full_zarr, chunk=8, nb_levels=3,
+                         zarr_version=zarr_version)
+                nii2zarr(ni, self.output_zarr, chunk=8, nb_levels=1,
+                         zarr_version=zarr_version)
+                shapes = build_pyramid(self.output_zarr, nb_levels=3,
+                                       max_workers=2)
+                full = zarr.open(self.full_zarr, mode="r")
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertEqual(len(shapes), 3)
+                for level in range(3):
+                    np.testing.assert_allclose(
+                        omz[str(level)][:], full[str(level)][:], atol=1e-6)
+                self.assertEqual(_multiscales(omz), _multiscales(full))
+                loaded = zarr2nii(self.output_zarr, level=2)
+                expected = zarr2nii(self.full_zarr, level=2)
+                np.testing.assert_allclose(loaded.header.get_best_affine(),
+                                           expected.header.get_best_affine())
+
+    def test_label(self):
+        img = np.random.randint(0, 4, (32, 24, 16)).astype(np.uint8)
+        # checkerboard: labels tie at every voxel of level 1
+        img[:16] = np.indices((16, 24, 16)).sum(0) % 2
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(ni, self.full_zarr, chunk=8, nb_levels=4,
+                         label=True, zarr_version=zarr_version)
+                nii2zarr(ni, self.output_zarr, chunk=8, nb_levels=1,
+                         zarr_version=zarr_version)
+                build_pyramid(self.output_zarr, nb_levels=4, label=True,
+                              max_workers=2)
+                assert_same_levels(self.full_zarr, self.output_zarr)
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertTrue(omz.attrs["niizarr"]["pyramid"]["label"])
+
+    def test_plain_zarr(self):
+        data = np.random.rand(24, 32, 48).astype(np.float32)
+        omz = zarr.open_group(self.output_zarr, mode="w")
+        _create_array(omz, "0", shape=data.shape, dtype=data.dtype,
+                      chunks=(16, 16, 16))
+        omz["0"][:] = data
+        cli([self.output_zarr, '--levels', '-1'])
+        omz = zarr.open(self.output_zarr, mode="r")
+        self.assertEqual(omz["1"].shape, (12, 16, 24))
+        self.assertEqual(omz["2"].shape, (6, 8, 12))
+        self.assertNotIn("3", omz)
+        self.assertEqual(omz["1"].chunks, (16, 16, 16))
+        multiscales = _multiscales(omz)
+        self.assertEqual([axis["name"] for axis in multiscales["axes"]],
+                         ["z", "y", "x"])
+        self.assertEqual(len(multiscales["datasets"]), 3)
+
+    def test_replace_levels(self):
+        img = np.random.rand(32, 32, 32).astype(np.float32)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(ni, self.output_zarr, chunk=8, nb_levels=4,
+                         zarr_version=zarr_version)
+                build_pyramid(self.output_zarr, nb_levels=2)
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertNotIn("2", omz)
+                self.assertEqual(len(_multiscales(omz)["datasets"]), 2)
+
+    @unittest.skipIf(pyzarr_version < 3, "sharding requires zarr-python 3")
+    def test_shard(self):
+        img = np.random.rand(64, 64, 32).astype(np.float32)
+        ni = Nifti1Image(img, np.eye(4))
+        nii2zarr(ni, self.output_zarr, chunk=8, shard=32, nb_levels=1,
+                 zarr_version=3)
+        build_pyramid(self.output_zarr, nb_levels=3, chunk_mode="bytes")
+        omz = zarr.open(self.output_zarr, mode="r")
+        for level in range(1, 3):
+            chunks = omz[str(level)].chunks
+            shards = omz[str(level)].shards
+            self.assertTrue(all(s % c == 0 for s, c in zip(shards, chunks)))
+        nii2zarr(ni, self.full_zarr, chunk=8, shard=32, nb_levels=3,
+                 zarr_version=3)
+        full = zarr.open(self.full_zarr, mode="r")
+        np.testing.assert_allclose(omz["2"][:], full["2"][:], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import ChunkCache, nii2zarr, zarr2nii
+from niizarr._compat import pyzarr_version
+
+
+class TestChunkCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lru(self):
+        cache = ChunkCache(max_bytes=30)
+        for key in "abc":
+            cache.put(key, key.encode() * 10, "v1")
+        cache.get("a")
+        cache.put("d", b"d" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (b"a" * 10, "v1"))
+        self.assertEqual(cache.nbytes, 30)
+        self.assertEqual(len(cache), 3)
+        # entries larger than the cache are not stored
+        cache.put("e", b"e" * 31)
+        self.assertIsNone(cache.get("e"))
+
+    def test_disk(self):
+        directory = os.path.join(self.temp_dir.name, "cache")
+        cache = ChunkCache(max_bytes=30, directory=directory)
+        for key in "abc":
+            cache.put(key, key.encode() * 10, "v1")
+        cache.get("a")
+
+        cache = ChunkCache(max_bytes=20, directory=directory)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertEqual(cache.get("c"), (b"c" * 10, "v1"))
+
+    def test_concurrent_put(self):
+        directory = os.path.join(self.temp_dir.name, "cache")
+        cache = ChunkCache(directory=directory)
+        values = [bytes([i]) * 1000 for i in range(32)]
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda value: cache.put("a", value, "v1"), values))
+        self.assertIn(cache.get("a")[0], values)
+        self.assertEqual(cache.nbytes, 1000)
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(cache._path("a"))])
+
+
+@unittest.skipIf(pyzarr_version < 3, "requires zarr-python 3")
+class TestCachedRead(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.img = np.random.rand(32, 32, 32).astype(np.float32)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hits(self):
+        for directory in (None, os.path.join(self.temp_dir.name, "cache")):
+            with self.subTest(directory=directory):
+                nii2zarr(Nifti1Image(self.img, np.eye(4)), self.output_zarr,
+                         chunk=16, nb_levels=1)
+                cache = ChunkCache(directory=directory)
+                for _ in range(2):
+                    data = zarr2nii(self.output_zarr, cache=cache).get_fdata()
+                    np.testing.assert_array_equal(data, self.img)
+                # 8 chunks and the binary header, read once from the
+                # store, then from the cache
+                self.assertEqual(cache.misses, 9)
+                self.assertEqual(cache.hits, 9)
+
+    def test_validate(self):
+        cache = ChunkCache()
+        nii2zarr(Nifti1Image(self.img, np.eye(4)), self.output_zarr,
+                 chunk=16, nb_levels=1)
+        zarr2nii(self.output_zarr, cache=cache).get_fdata()
+
+        nii2zarr(Nifti1Image(-self.img, np.eye(4)), self.output_zarr,
+                 chunk=16, nb_levels=1)
+        data = zarr2nii(self.output_zarr, cache=cache).get_fdata()
+        np.testing.assert_array_equal(data, -self.img)
+        # stale entries are counted as misses
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 18)
+
+
+if __name__ == '__main__':
+    unittest.main()
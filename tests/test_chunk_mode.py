@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, zarr2nii
+from niizarr._compat import pyzarr_version
+
+from ._data import ZARR_VERSIONS
+
+
+class TestChunkMode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        img = np.random.rand(32, 64, 128).astype(np.float32)
+        self.ni = Nifti1Image(img, np.eye(4))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fixed(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=32, nb_levels=3,
+                         zarr_version=zarr_version)
+                omz = zarr.open(self.output_zarr, mode="r")
+                for level in range(3):
+                    self.assertEqual(omz[str(level)].chunks, (32, 32, 32))
+
+    def test_bytes(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=32, nb_levels=4,
+                         chunk_mode="bytes", zarr_version=zarr_version)
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertEqual(omz["0"].chunks, (32, 32, 32))
+                for level in range(1, 4):
+                    shape = omz[str(level)].shape
+                    chunks = omz[str(level)].chunks
+                    self.assertTrue(
+                        all(c <= n for c, n in zip(chunks, shape)))
+                    self.assertLessEqual(np.prod(chunks), 32 ** 3)
+                    if chunks != shape:
+                        self.assertGreater(np.prod(chunks), 32 ** 3 // 2)
+                # (z, y, x) = (16, 32, 64) has the same number of voxels as
+                # the base chunk, coarser levels fit in a single chunk
+                self.assertEqual(omz["1"].chunks, omz["1"].shape)
+                self.assertEqual(omz["3"].chunks, omz["3"].shape)
+                np.testing.assert_array_almost_equal(
+                    zarr2nii(self.output_zarr).get_fdata(),
+                    self.ni.get_fdata())
+
+    def test_per_level(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr,
+                         chunk=[(32, 32, 32), (16, 16, 8)], nb_levels=3,
+                         zarr_version=zarr_version)
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertEqual(omz["0"].chunks, (32, 32, 32))
+                self.assertEqual(omz["1"].chunks, (8, 16, 16))
+                self.assertEqual(omz["2"].chunks, (8, 16, 16))
+
+    @unittest.skipIf(pyzarr_version < 3, "sharding requires zarr-python 3")
+    def test_bytes_shard(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16, shard=64, nb_levels=3,
+                 chunk_mode="bytes", zarr_version=3)
+        omz = zarr.open(self.output_zarr, mode="r")
+        self.assertEqual(omz["0"].shards, (64, 64, 64))
+        for level in range(1, 3):
+            chunks = omz[str(level)].chunks
+            shards = omz[str(level)].shards
+            self.assertTrue(all(s % c == 0 for s, c in zip(shards, chunks)))
+        np.testing.assert_array_almost_equal(
+            zarr2nii(self.output_zarr).get_fdata(), self.ni.get_fdata())
+
+
+if __name__ == '__main__':
+    unittest.main()
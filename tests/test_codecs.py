@@ -0,0 +1,117 @@
+import itertools
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, zarr2nii
+from niizarr._codecs import (
+    _parse_codecs, _make_codecs, _measure_codecs, _numcodecs_v3,
+    _sample_chunks,
+)
+
+from ._data import ZARR_VERSIONS
+
+
+class TestCodecs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parse(self):
+        stages = _parse_codecs("delta+shuffle+blosc:cname=zstd,clevel=5")
+        self.assertEqual(stages, [
+            {"name": "delta"},
+            {"name": "shuffle"},
+            {"name": "blosc", "cname": "zstd", "clevel": 5},
+        ])
+        self.assertEqual(_parse_codecs([{"name": "ZSTD", "level": 3}]),
+                         [{"name": "zstd", "level": 3}])
+        self.assertRaises(ValueError, _parse_codecs, "foo")
+
+    def test_make(self):
+        codecs = _make_codecs("delta+shuffle+zstd", 2, "<i2")
+        self.assertEqual(len(codecs["filters"]), 2)
+        self.assertEqual(codecs["compressors"].codec_id, "zstd")
+        self.assertRaises(ValueError, _make_codecs, "zstd+delta", 2, "<i2")
+        self.assertRaises(ValueError, _make_codecs, "delta", 2, "<f4")
+        self.assertRaises(ValueError, _make_codecs, "bitround", 2, "<f4")
+        self.assertRaises(ValueError, _make_codecs,
+                          "bitround:keepbits=8", 2, "<i2")
+
+    def test_roundtrip_int(self):
+        img = np.random.randint(0, 1000, (32, 32, 32)).astype(np.int16)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                if zarr_version == 3 and _numcodecs_v3() is None:
+                    # zarr-python < 3.1.3 with numcodecs >= 0.16
+                    self.assertRaises(ValueError, nii2zarr, ni,
+                                      self.output_zarr, codecs="delta+shuffle+zstd:level=5",
+                                      zarr_version=zarr_version)
+                    continue
+                nii2zarr(ni, self.output_zarr, chunk=16,
+                         codecs="delta+shuffle+zstd:level=5",
+                         zarr_version=zarr_version)
+                loaded = zarr2nii(self.output_zarr)
+                np.testing.assert_array_equal(
+                    np.asarray(loaded.dataobj), img)
+
+    def test_roundtrip_bitround(self):
+        img = np.random.rand(32, 32, 32).astype(np.float32)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                if zarr_version == 3 and _numcodecs_v3() is None:
+                    # zarr-python < 3.1.3 with numcodecs >= 0.16
+                    self.assertRaises(ValueError, nii2zarr, ni,
+                                      self.output_zarr, codecs="bitround:keepbits=10+blosc",
+                                      zarr_version=zarr_version)
+                    continue
+                nii2zarr(ni, self.output_zarr, chunk=16,
+                         codecs="bitround:keepbits=10+blosc",
+                         zarr_version=zarr_version)
+                loaded = np.asarray(zarr2nii(self.output_zarr).dataobj)
+                np.testing.assert_allclose(loaded, img, rtol=2 ** -10)
+                self.assertFalse(np.array_equal(loaded, img))
+
+    def test_measure(self):
+        data = np.random.randint(0, 100, (4, 64, 64)).astype(np.int16)
+        samples = _sample_chunks(data, (2, 32, 32), nb_samples=3)
+        self.assertEqual(len(samples), 3)
+        results = _measure_codecs(samples, ["zstd", "delta+zstd"], repeat=1)
+        self.assertEqual([r["codecs"] for r in results],
+                         ["zstd", "delta+zstd"])
+        for result in results:
+            self.assertEqual(result["nbytes"], 3 * 2 * 32 * 32 * 2)
+            self.assertGreater(result["cbytes"], 0)
+
+    def test_auto(self):
+        img = np.random.randint(0, 1000, (32, 32, 32)).astype(np.int16)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version, objective in itertools.product(
+                ZARR_VERSIONS, ("size", "speed", "balanced")):
+            with self.subTest(zarr_version=zarr_version, objective=objective):
+                nii2zarr(ni, self.output_zarr, chunk=16, compressor="auto",
+                         auto_objective=objective, zarr_version=zarr_version)
+                omz = zarr.open(self.output_zarr, mode="r")
+                selection = omz.attrs["niizarr"]["compression"]
+                self.assertEqual(selection["objective"], objective)
+                results = selection["candidates"]
+                if objective == "size":
+                    self.assertEqual(
+                        selection["codecs"],
+                        max(results, key=lambda r: r["ratio"])["codecs"])
+                loaded = zarr2nii(self.output_zarr)
+                np.testing.assert_array_equal(
+                    np.asarray(loaded.dataobj), img)
+
+
+if __name__ == '__main__':
+    unittest.main()
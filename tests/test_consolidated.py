@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import append, nii2zarr, zarr2nii
+from niizarr._compat import _open_zarr, pyzarr_version
+
+from ._data import ZARR_VERSIONS
+
+
+def _is_consolidated(path, zarr_version):
+    if zarr_version == 2:
+        return os.path.exists(os.path.join(path, ".zmetadata"))
+    with open(os.path.join(path, "zarr.json")) as f:
+        return json.load(f).get("consolidated_metadata") is not None
+
+
+class TestConsolidated(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        img = np.random.rand(32, 32, 16, 2).astype(np.float32)
+        self.ni = Nifti1Image(img, np.eye(4))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write(self):
+        for zarr_version in ZARR_VERSIONS:
+            for consolidated in (True, False):
+                with self.subTest(zarr_version=zarr_version,
+                                  consolidated=consolidated):
+                    nii2zarr(self.ni, self.output_zarr, chunk=16,
+                             zarr_version=zarr_version,
+                             consolidated=consolidated)
+                    self.assertEqual(
+                        _is_consolidated(self.output_zarr, zarr_version),
+                        consolidated)
+                    np.testing.assert_array_equal(
+                        zarr2nii(self.output_zarr).get_fdata(),
+                        self.ni.get_fdata())
+
+    def test_append_refresh(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=16,
+                         zarr_version=zarr_version)
+                append(self.ni, self.output_zarr)
+                omz = _open_zarr(self.output_zarr, mode="r")
+                self.assertEqual(omz["0"].shape, (4, 16, 32, 32))
+                self.assertEqual(zarr2nii(self.output_zarr).shape,
+                                 (32, 32, 16, 4))
+
+    @unittest.skipIf(pyzarr_version < 3, "requires zarr-python 3")
+    def test_requests(self):
+        from zarr.storage import LocalStore, WrapperStore
+
+        class CountingStore(WrapperStore):
+            keys = []
+
+            async def get(self, key, prototype, byte_range=None):
+                self.keys.append(key)
+                return await self._store.get(key, prototype, byte_range)
+
+        counts = {}
+        for consolidated in (True, False):
+            nii2zarr(self.ni, self.output_zarr, chunk=16,
+                     consolidated=consolidated)
+            store = CountingStore(LocalStore(self.output_zarr,
+                                             read_only=True))
+            CountingStore.keys = []
+            zarr2nii(store)
+            counts[consolidated] = [
+                key for key in CountingStore.keys if key.endswith(
+                    ("zarr.json", ".zarray", ".zattrs", ".zgroup",
+                     ".zmetadata"))
+            ]
+        # a single (concurrent) batch of metadata requests for the group
+        self.assertEqual(len(counts[True]), 4)
+        self.assertGreater(len(counts[False]), len(counts[True]))
+
+
+if __name__ == '__main__':
+    unittest.main()
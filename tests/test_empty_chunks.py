@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, zarr2nii
+from niizarr._nii2zarr import _infer_fill_value
+
+from ._data import ZARR_VERSIONS
+METADATA = (".zarray", ".zattrs", ".zgroup", "zarr.json")
+
+
+def count_chunks(path):
+    """Number of stored chunk objects of an array."""
+    return sum(
+        name not in METADATA
+        for _, _, files in os.walk(path) for name in files
+    )
+
+
+class TestEmptyChunks(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        # mask with a single non-zero 16^3 chunk out of 4^3
+        self.data = np.zeros((64, 64, 64), dtype=np.uint8)
+        self.data[20:28, 20:28, 20:28] = 1
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_skip(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.data, np.eye(4)), self.output_zarr,
+                         chunk=16, nb_levels=1, fill_value=0,
+                         zarr_version=zarr_version)
+                self.assertEqual(
+                    count_chunks(os.path.join(self.output_zarr, "0")), 1)
+                report = zarr.open_group(self.output_zarr, mode="r") \
+                    .attrs["niizarr"]["empty_chunks"]
+                self.assertEqual(report["chunks"], 64)
+                self.assertEqual(report["skipped"], 63)
+                self.assertEqual(report["bytes"], 63 * 16 ** 3)
+                np.testing.assert_array_equal(
+                    np.asarray(zarr2nii(self.output_zarr).dataobj),
+                    self.data)
+
+    def test_write_empty(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.data, np.eye(4)), self.output_zarr,
+                         chunk=16, nb_levels=1, fill_value=0,
+                         write_empty_chunks=True, zarr_version=zarr_version)
+                self.assertEqual(
+                    count_chunks(os.path.join(self.output_zarr, "0")), 64)
+                attrs = zarr.open_group(self.output_zarr, mode="r").attrs
+                self.assertNotIn("empty_chunks", attrs.get("niizarr", {}))
+
+    def test_auto(self):
+        # light-sheet like: constant background of 100
+        data = np.full((64, 64, 64), 100, dtype=np.uint16)
+        data[24:40, 24:40, 24:40] = 1000
+        self.assertEqual(_infer_fill_value(data), 100)
+        self.assertEqual(_infer_fill_value(np.random.rand(8, 8, 8)), 0)
+
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(data, np.eye(4)), self.output_zarr,
+                         chunk=16, nb_levels=1, fill_value="auto",
+                         zarr_version=zarr_version)
+                group = zarr.open_group(self.output_zarr, mode="r")
+                self.assertEqual(group["0"].fill_value, 100)
+                self.assertEqual(
+                    group.attrs["niizarr"]["empty_chunks"]["skipped"], 56)
+                np.testing.assert_array_equal(
+                    np.asarray(zarr2nii(self.output_zarr).dataobj), data)
@@ -0,0 +1,80 @@
+import base64
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import append, nii2zarr, zarr2nii
+from niizarr._compat import _open_zarr, pyzarr_version
+
+from ._data import ZARR_VERSIONS
+
+
+class TestHeaderInAttrs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        img = np.random.rand(32, 32, 16, 2).astype(np.float32)
+        affine = np.diag([0.5, 0.5, 2, 1])
+        self.ni = Nifti1Image(img, affine)
+        self.ni.header.set_xyzt_units("mm", "sec")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_roundtrip(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=16,
+                         zarr_version=zarr_version, header_in_attrs=True)
+                omz = _open_zarr(self.output_zarr, mode="r")
+                encoded = omz.attrs["niizarr"]["nifti_header"]
+                self.assertEqual(base64.b64decode(encoded),
+                                 np.asarray(omz["nifti"]).tobytes())
+
+                ni = zarr2nii(self.output_zarr)
+                np.testing.assert_array_equal(ni.get_fdata(),
+                                              self.ni.get_fdata())
+                np.testing.assert_allclose(ni.header.get_best_affine(),
+                                           self.ni.affine)
+
+    def test_default(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        omz = _open_zarr(self.output_zarr, mode="r")
+        self.assertNotIn("nifti_header", omz.attrs.get("niizarr", {}))
+
+    def test_append(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=16,
+                         zarr_version=zarr_version, header_in_attrs=True)
+                append(self.ni, self.output_zarr)
+                omz = _open_zarr(self.output_zarr, mode="r")
+                encoded = omz.attrs["niizarr"]["nifti_header"]
+                self.assertEqual(base64.b64decode(encoded),
+                                 np.asarray(omz["nifti"]).tobytes())
+                self.assertEqual(zarr2nii(self.output_zarr).shape,
+                                 (32, 32, 16, 4))
+
+    @unittest.skipIf(pyzarr_version < 3, "requires zarr-python 3")
+    def test_requests(self):
+        from zarr.storage import LocalStore, WrapperStore
+
+        class CountingStore(WrapperStore):
+            keys = []
+
+            async def get(self, key, prototype, byte_range=None):
+                self.keys.append(key)
+                return await self._store.get(key, prototype, byte_range)
+
+        nii2zarr(self.ni, self.output_zarr, chunk=16, header_in_attrs=True)
+        CountingStore.keys = []
+        zarr2nii(CountingStore(LocalStore(self.output_zarr, read_only=True)))
+        self.assertFalse([key for key in CountingStore.keys
+                          if key.startswith("nifti")])
+
+
+if __name__ == '__main__':
+    unittest.main()
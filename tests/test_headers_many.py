@@ -0,0 +1,88 @@
+import json
+import os.path as op
+import unittest
+
+import nibabel as nib
+import numpy as np
+from nibabel import Nifti1Header, Nifti2Header
+
+from niizarr import bin2nii, bin2nii_many, nii2json, nii2json_many
+
+HERE = op.dirname(op.abspath(__file__))
+DATA = op.join(HERE, "data")
+
+
+def _make_headers():
+    headers = []
+    for klass in (Nifti1Header, Nifti2Header):
+        for endianness in ("<", ">"):
+            header = klass(endianness=endianness)
+            header.set_data_shape((10, 20, 30, 4))
+            header.set_data_dtype(np.int16)
+            header.set_zooms((0.5, 0.6, 0.7, 2.0))
+            header.set_xyzt_units("mm", "sec")
+            header.set_intent("t test", (12.0,), name="stat")
+            header.set_dim_info(0, 1, 2)
+            header["descrip"] = b"some description"
+            header.set_sform(np.diag([0.5, 0.6, 0.7, 1]), code=2)
+            header.set_qform(np.diag([0.5, 0.6, 0.7, 1]), code=1)
+            headers.append(header)
+            header = klass(endianness=endianness)
+            header.set_data_shape((8, 8, 8))
+            header.set_data_dtype(np.float32)
+            header.set_intent("label")
+            header["scl_slope"] = np.nan
+            headers.append(header)
+    return headers
+
+
+class TestHeadersMany(unittest.TestCase):
+    def setUp(self):
+        self.headers = _make_headers()
+        self.buffers = [h.binaryblock for h in self.headers]
+
+    def test_bin2nii_many(self):
+        parsed = bin2nii_many(self.buffers)
+        self.assertEqual(len(parsed), len(self.buffers))
+        for buffer, header in zip(self.buffers, parsed):
+            expected = bin2nii(buffer)
+            for name in expected.dtype.names:
+                np.testing.assert_array_equal(header[name], expected[name])
+        self.assertRaises(ValueError, bin2nii_many, [b"\0" * 348])
+
+    def test_nii2json_many(self):
+        jsonheaders = nii2json_many(self.buffers)
+        for buffer, jsonheader in zip(self.buffers, jsonheaders):
+            expected = nii2json(bin2nii(buffer))
+            self.assertEqual(json.dumps(jsonheader), json.dumps(expected))
+
+    def test_nibabel_headers(self):
+        img = nib.load(op.join(DATA, "example4d.nii.gz"))
+        jsonheaders = nii2json_many([img.header] + self.headers)
+        self.assertEqual(jsonheaders[0], nii2json(img.header))
+        self.assertEqual(jsonheaders[1:],
+                         [nii2json(h) for h in self.headers])
+
+    def test_extensions(self):
+        buffers = [buffer + b"\1\0\0\0" for buffer in self.buffers]
+        jsonheaders = nii2json_many(buffers)
+        for jsonheader in jsonheaders:
+            self.assertEqual(jsonheader["NIFTIExtension"], [1, 0, 0, 0])
+        jsonheaders = nii2json_many(buffers, extensions=False)
+        for jsonheader in jsonheaders:
+            self.assertEqual(jsonheader["NIFTIExtension"], [0, 0, 0, 0])
+
+    def test_columnar(self):
+        columns = nii2json_many(self.buffers, columnar=True)
+        jsonheaders = nii2json_many(self.buffers)
+        self.assertEqual(columns["Affine"].shape, (len(self.buffers), 3, 4))
+        self.assertEqual(columns["Intent"].tolist(),
+                         [h["Intent"] for h in jsonheaders])
+        self.assertEqual(columns["Unit.L"].tolist(),
+                         [h["Unit"]["L"] for h in jsonheaders])
+        self.assertEqual(columns["Dim"].tolist(),
+                         [h["Dim"] for h in jsonheaders])
+
+
+if __name__ == '__main__':
+    unittest.main()
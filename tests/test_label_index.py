@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import (
+    append, nii2zarr, read_label, read_label_volumes, rechunk, update_region,
+)
+
+from ._data import ZARR_VERSIONS
+
+
+class TestLabelIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.labels = np.zeros((48, 40, 32), dtype=np.int16)
+        self.labels[5:20, 10:12, 3:30] = 17
+        self.labels[30:40, 30:40, 20:25] = 3
+        self.labels[0, 0, 0] = 3
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_label(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.labels, np.eye(4)),
+                         self.output_zarr, chunk=16, label=True,
+                         zarr_version=zarr_version)
+                mask, bbox = read_label(self.output_zarr, 17)
+                self.assertEqual(bbox, (slice(5, 20), slice(10, 12),
+                                        slice(3, 30)))
+                np.testing.assert_array_equal(mask,
+                                              self.labels[bbox] == 17)
+
+                mask, bbox = read_label(self.output_zarr, 3)
+                self.assertEqual(bbox, (slice(0, 40), slice(0, 40),
+                                        slice(0, 25)))
+                self.assertEqual(mask.sum(), (self.labels == 3).sum())
+
+                self.assertRaises(ValueError, read_label,
+                                  self.output_zarr, 5)
+
+    def test_only_label_chunks(self):
+        nii2zarr(Nifti1Image(self.labels, np.eye(4)), self.output_zarr,
+                 chunk=16, label=True)
+        index = zarr.open_group(self.output_zarr, mode="r")["label_index"]
+        labels = index["labels"][:]
+        chunks = index["chunks"][:]
+        # label 17 spans x in [5, 20), z in [3, 30): 2 x 1 x 2 chunks
+        self.assertEqual((labels == 17).sum(), 4)
+        self.assertEqual(
+            sorted(map(tuple, chunks[labels == 17].tolist())),
+            [(0, 0, 0), (0, 0, 1), (1, 0, 0), (1, 0, 1)])
+
+    def test_volumes(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                affine = np.diag([0.5, 2.0, 1.5, 1.0])
+                affine[:3, -1] = [10, -20, 5]
+                img = Nifti1Image(self.labels, affine)
+                img.header.set_xyzt_units("micron")
+                nii2zarr(img, self.output_zarr, chunk=16, label=True,
+                         zarr_version=zarr_version)
+                volumes = read_label_volumes(self.output_zarr)
+                self.assertEqual(sorted(volumes), [3, 17])
+                for label, stats in volumes.items():
+                    voxels = np.argwhere(self.labels == label)
+                    self.assertEqual(stats["count"], len(voxels))
+                    self.assertAlmostEqual(
+                        stats["volume"], len(voxels) * 1.5 * 1e-9)
+                    centroid = affine[:3, :3] @ voxels.mean(0) + affine[:3, -1]
+                    np.testing.assert_allclose(
+                        stats["centroid"], centroid * 1e-3)
+
+    def test_not_label(self):
+        nii2zarr(Nifti1Image(self.labels, np.eye(4)), self.output_zarr,
+                 chunk=16)
+        self.assertRaises(ValueError, read_label, self.output_zarr, 17)
+
+    def test_updates(self):
+        img = np.stack([self.labels, self.labels], -1)
+        nii2zarr(Nifti1Image(img[..., :1], np.eye(4)), self.output_zarr,
+                 chunk=16, label=True)
+        new = img[..., 1].copy()
+        new[40:48, 0:8, 0:8] = 9
+        append(new, self.output_zarr)
+        mask, bbox = read_label(self.output_zarr, 9)
+        self.assertEqual(bbox, (slice(40, 48), slice(0, 8), slice(0, 8),
+                                slice(1, 2)))
+        self.assertTrue(mask.all())
+
+        update_region(self.output_zarr,
+                      (slice(5, 20), slice(10, 12), slice(3, 30),
+                       slice(0, 2)),
+                      np.full((15, 2, 27, 2), 4, dtype=np.int16))
+        self.assertRaises(ValueError, read_label, self.output_zarr, 17)
+        mask, bbox = read_label(self.output_zarr, 4)
+        self.assertEqual(mask.sum(), 15 * 2 * 27 * 2)
+        self.assertEqual(read_label_volumes(self.output_zarr)[4]["count"],
+                         15 * 2 * 27 * 2)
+
+        rechunked = os.path.join(self.temp_dir.name, 'rechunked.nii.zarr')
+        rechunk(self.output_zarr, rechunked, chunk=32)
+        mask, bbox = read_label(rechunked, 4)
+        self.assertEqual(mask.sum(), 15 * 2 * 27 * 2)
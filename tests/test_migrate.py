@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import migrate, nii2zarr, zarr2nii
+from niizarr._codecs import _numcodecs_v3
+from niizarr._compat import pyzarr_version
+from niizarr._migrate import cli
+
+
+@unittest.skipIf(pyzarr_version < 3, "Zarr v3 requires zarr-python 3")
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.v2_zarr = os.path.join(self.temp_dir.name, 'v2.nii.zarr')
+        self.v3_zarr = os.path.join(self.temp_dir.name, 'v3.nii.zarr')
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        img = np.random.randint(0, 1000, (40, 32, 24, 2)).astype(np.int16)
+        self.ni = Nifti1Image(img, np.diag([0.5, 0.5, 2, 1]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertMigrated(self, v3_zarr, output_zarr):
+        expected = zarr.open(v3_zarr, mode="r")
+        omz = zarr.open(output_zarr, mode="r")
+        self.assertEqual(omz.metadata.zarr_format, 3)
+        self.assertEqual(dict(omz.attrs), dict(expected.attrs))
+        np.testing.assert_array_equal(omz["nifti"][:], expected["nifti"][:])
+        for level in range(3):
+            np.testing.assert_array_equal(
+                omz[str(level)][:], expected[str(level)][:])
+            self.assertEqual(omz[str(level)].metadata.dimension_names,
+                             ("t", "z", "y", "x"))
+        np.testing.assert_array_equal(
+            zarr2nii(output_zarr).get_fdata(), self.ni.get_fdata())
+
+    def test_verbatim(self):
+        nii2zarr(self.ni, self.v3_zarr, chunk=16, nb_levels=3,
+                 zarr_version=3)
+        for codecs in (None, "delta+shuffle+zstd:level=3", "zlib", "gzip",
+                       "lz4"):
+            with self.subTest(codecs=codecs):
+                nii2zarr(self.ni, self.v2_zarr, chunk=16, nb_levels=3,
+                         codecs=codecs, zarr_version=2)
+                verbatim = migrate(self.v2_zarr, self.output_zarr,
+                                   max_workers=2)
+                self.assertMigrated(self.v3_zarr, self.output_zarr)
+                if codecs not in (None, "gzip") and _numcodecs_v3() is None:
+                    # no Zarr v3 equivalent here: chunks are re-encoded
+                    self.assertFalse(any(verbatim.values()))
+                    continue
+                self.assertTrue(all(verbatim.values()))
+                chunk = os.path.join("0", "0", "1", "0", "1")
+                with open(os.path.join(self.v2_zarr, chunk), "rb") as f:
+                    v2_bytes = f.read()
+                with open(os.path.join(self.output_zarr, "0", "c", chunk[2:]),
+                          "rb") as f:
+                    v3_bytes = f.read()
+                self.assertEqual(v2_bytes, v3_bytes)
+
+    def test_shard(self):
+        nii2zarr(self.ni, self.v3_zarr, chunk=16, nb_levels=3,
+                 zarr_version=3)
+        nii2zarr(self.ni, self.v2_zarr, chunk=16, nb_levels=3,
+                 zarr_version=2)
+        cli([self.v2_zarr, self.output_zarr, '--shard', '32',
+             '--shard-time', '0', '--max-workers', '2'])
+        omz = zarr.open(self.output_zarr, mode="r")
+        self.assertEqual(omz["0"].shards, (2, 32, 32, 32))
+        self.assertEqual(omz["0"].chunks, (1, 16, 16, 16))
+        self.assertMigrated(self.v3_zarr, self.output_zarr)
+
+    def test_not_v2(self):
+        nii2zarr(self.ni, self.v3_zarr, nb_levels=1, zarr_version=3)
+        self.assertRaises(ValueError, migrate, self.v3_zarr, self.output_zarr)
+
+
+if __name__ == '__main__':
+    unittest.main()
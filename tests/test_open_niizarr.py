@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, open_niizarr, zarr2nii
+
+from ._data import ZARR_VERSIONS
+
+
+class TestOpenNiizarr(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.data = np.random.rand(20, 18, 16, 3).astype(np.float32)
+        self.affine = np.diag([0.5, 0.6, 0.7, 1.0])
+        self.affine[:3, -1] = [10, 20, 30]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_index(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(Nifti1Image(self.data, self.affine),
+                         self.output_zarr, chunk=8,
+                         zarr_version=zarr_version)
+                array, header, affine = open_niizarr(self.output_zarr)
+                self.assertEqual(array.shape, self.data.shape)
+                self.assertEqual(header.get_data_shape(), self.data.shape)
+                np.testing.assert_allclose(affine, self.affine)
+                for key in [
+                    (...,),
+                    (slice(2, 9), 3),
+                    (5, ..., 1),
+                    (slice(None, None, 2), slice(1, 17), slice(4, 5), -1),
+                    (-1, -2, -3, slice(0, 0)),
+                ]:
+                    np.testing.assert_array_equal(array[key], self.data[key])
+                np.testing.assert_array_equal(np.asarray(array), self.data)
+
+    def test_level(self):
+        nii2zarr(Nifti1Image(self.data, self.affine), self.output_zarr,
+                 chunk=8)
+        array, header, affine = open_niizarr(self.output_zarr, level=1)
+        img = zarr2nii(self.output_zarr, level=1)
+        self.assertEqual(array.shape, img.shape)
+        np.testing.assert_allclose(affine, img.header.get_best_affine())
+        np.testing.assert_array_equal(array[...], np.asarray(img.dataobj))
+
+    def test_missing_axes(self):
+        # 3D volume: the view has no time axis
+        data = self.data[..., 0]
+        nii2zarr(Nifti1Image(data, self.affine), self.output_zarr, chunk=8)
+        array, _, _ = open_niizarr(self.output_zarr)
+        self.assertEqual(array.ndim, 3)
+        np.testing.assert_array_equal(array[:, 4], data[:, 4])
+        self.assertRaises(IndexError, array.__getitem__, (0, 0, 0, 0))
+        self.assertRaises(IndexError, array.__getitem__, (20,))
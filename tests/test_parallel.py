@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr
+
+from ._data import ZARR_VERSIONS, assert_same_levels
+
+
+class RecordingDataobj:
+    """Array-like data object that records the size of each read."""
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.reads = []
+
+    def __getitem__(self, slicer):
+        data = self.array[slicer]
+        self.reads.append(data.size)
+        return data
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.serial_zarr = os.path.join(self.temp_dir.name, 'serial.nii.zarr')
+        self.parallel_zarr = os.path.join(self.temp_dir.name,
+                                          'parallel.nii.zarr')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_4d(self):
+        img = np.random.rand(32, 32, 16, 5).astype(np.float32)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            for chunk_time, parallel in ((1, 'thread'), (2, 'thread'),
+                                         (1, 'process')):
+                with self.subTest(zarr_version=zarr_version,
+                                  chunk_time=chunk_time, parallel=parallel):
+                    nii2zarr(ni, self.serial_zarr, chunk=8,
+                             chunk_time=chunk_time, zarr_version=zarr_version)
+                    nii2zarr(ni, self.parallel_zarr, chunk=8,
+                             chunk_time=chunk_time, zarr_version=zarr_version,
+                             max_workers=2, parallel=parallel)
+                    assert_same_levels(self.serial_zarr, self.parallel_zarr)
+
+    def test_5d_label(self):
+        img = np.random.randint(0, 4, (16, 16, 16, 3, 2)).astype(np.int16)
+        ni = Nifti1Image(img, np.eye(4))
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(ni, self.serial_zarr, chunk=8, label=True,
+                         zarr_version=zarr_version)
+                nii2zarr(ni, self.parallel_zarr, chunk=8, label=True,
+                         zarr_version=zarr_version, max_workers=3)
+                assert_same_levels(self.serial_zarr, self.parallel_zarr)
+
+    def test_blockwise_read(self):
+        img = np.random.randint(0, 4, (16, 16, 16, 6)).astype(np.int16)
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                dataobj = RecordingDataobj(img)
+                options = dict(chunk=8, chunk_time=2, label=True, stats=True,
+                               fill_value='auto', zarr_version=zarr_version)
+                nii2zarr(Nifti1Image(img, np.eye(4)), self.serial_zarr,
+                         **options)
+                nii2zarr(Nifti1Image(dataobj, np.eye(4)), self.parallel_zarr,
+                         **options)
+                assert_same_levels(self.serial_zarr, self.parallel_zarr)
+                # the image is read one block of timepoints (or less) at
+                # a time
+                self.assertTrue(dataobj.reads)
+                self.assertLessEqual(max(dataobj.reads), img[..., :2].size)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import gzip
+import os
+import os.path as op
+import tempfile
+import unittest
+from unittest import mock
+
+
+import niizarr._read_header
+from niizarr import bin2nii, nii2json, read_header, read_headers
+
+HERE = op.dirname(op.abspath(__file__))
+DATA = op.join(HERE, "data")
+
+
+class TestReadHeader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.files = [op.join(DATA, "example4d.nii.gz"),
+                      op.join(DATA, "example_nifti2.nii.gz")]
+        # uncompressed copies
+        for path in list(self.files):
+            out = op.join(self.temp_dir.name,
+                          op.basename(path)[:-3])
+            with gzip.open(path, "rb") as f, open(out, "wb") as g:
+                g.write(f.read())
+            self.files.append(out)
+        self.expected = []
+        for path in self.files:
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rb") as f:
+                buffer = f.read(544)
+            header = bin2nii(buffer)
+            extension = buffer[header["sizeof_hdr"]] != 0
+            self.expected.append(nii2json(header, extensions=extension))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_header(self):
+        for path, expected in zip(self.files, self.expected):
+            with self.subTest(path=op.basename(path)):
+                self.assertEqual(read_header(path), expected)
+
+    def test_read_headers(self):
+        self.assertEqual(read_headers(self.files, max_workers=4),
+                         self.expected)
+        headers = read_headers(self.files, raw=True)
+        self.assertEqual(headers["sizeof_hdr"].tolist(), [348, 540] * 2)
+
+    def test_small_gzip_block(self):
+        with mock.patch.object(niizarr._read_header, "GZIP_BLOCK_SIZE", 16):
+            self.assertEqual(read_headers(self.files), self.expected)
+
+    @unittest.skipIf(niizarr._read_header.fsspec is None,
+                     "requires fsspec")
+    def test_memory_filesystem(self):
+        urls = []
+        for i, path in enumerate(self.files):
+            url = f"memory://niizarr-test/{i}/{op.basename(path)}"
+            with open(path, "rb") as f, \
+                    niizarr._read_header.fsspec.open(url, "wb") as g:
+                g.write(f.read())
+            urls.append(url)
+        self.assertEqual(read_headers(urls), self.expected)
+
+    @unittest.skipIf(niizarr._read_header.fsspec is None,
+                     "requires fsspec")
+    def test_fetched_bytes(self):
+        path = self.files[2]
+        fs = niizarr._read_header.fsspec.filesystem("file")
+        with mock.patch.object(type(fs), "cat_file",
+                               autospec=True,
+                               side_effect=type(fs).cat_file) as cat:
+            read_header(path)
+        self.assertLessEqual(cat.call_args.args[3], 544)
+        self.assertGreater(os.path.getsize(path), 544)
+
+
+if __name__ == '__main__':
+    unittest.main()
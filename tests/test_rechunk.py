@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+
+from niizarr import nii2zarr, rechunk, zarr2nii
+from niizarr._compat import pyzarr_version
+from niizarr._rechunk import cli
+
+from ._data import ZARR_VERSIONS
+
+
+class TestRechunk(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_zarr = os.path.join(self.temp_dir.name, 'input.nii.zarr')
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.img = np.random.rand(48, 40, 24, 6).astype(np.float32)
+        self.ni = Nifti1Image(self.img, np.diag([0.5, 0.5, 2, 1]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertSameContent(self, inp, out):
+        inp = zarr.open(inp, mode="r")
+        out = zarr.open(out, mode="r")
+        self.assertEqual(dict(inp.attrs), dict(out.attrs))
+        np.testing.assert_array_equal(inp["nifti"][:], out["nifti"][:])
+        self.assertEqual(dict(inp["nifti"].attrs), dict(out["nifti"].attrs))
+        level = 0
+        while str(level) in inp:
+            np.testing.assert_array_equal(
+                inp[str(level)][:], out[str(level)][:])
+            level += 1
+        self.assertNotIn(str(level), out)
+
+    def test_direct(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.input_zarr, chunk=8, nb_levels=3,
+                         zarr_version=zarr_version)
+                staged = rechunk(self.input_zarr, self.output_zarr,
+                                 chunk=16, chunk_time=0, max_workers=2)
+                self.assertFalse(any(staged.values()))
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertEqual(omz["0"].chunks, (6, 16, 16, 16))
+                self.assertSameContent(self.input_zarr, self.output_zarr)
+                np.testing.assert_array_equal(
+                    zarr2nii(self.output_zarr).get_fdata(),
+                    self.ni.get_fdata())
+
+    def test_staged(self):
+        # (t, z, y, x) chunks (6, 4, 40, 48) -> (1, 24, 8, 8)
+        max_mem = 6 * 24 * 40 * 48 * 4 - 1
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.input_zarr, chunk=(48, 40, 4),
+                         nb_levels=2, chunk_time=0, zarr_version=zarr_version)
+                staged = rechunk(self.input_zarr, self.output_zarr,
+                                 chunk=(8, 8, 24), chunk_time=1,
+                                 max_mem=max_mem)
+                self.assertTrue(staged["0"])
+                omz = zarr.open(self.output_zarr, mode="r")
+                self.assertEqual(omz["0"].chunks, (1, 24, 8, 8))
+                self.assertSameContent(self.input_zarr, self.output_zarr)
+
+    def test_max_mem(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.input_zarr, chunk=16,
+                         zarr_version=zarr_version)
+                self.assertRaises(ValueError, rechunk, self.input_zarr,
+                                  self.output_zarr, chunk=16, max_mem=1024)
+
+    def test_same_output(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.input_zarr, chunk=16, nb_levels=3,
+                         zarr_version=zarr_version)
+                same = os.path.join(self.temp_dir.name, '.',
+                                    'input.nii.zarr/')
+                for out in (self.input_zarr, same,
+                            zarr.open_group(self.input_zarr, mode="r")):
+                    self.assertRaises(ValueError, rechunk, self.input_zarr,
+                                      out, chunk=8)
+                # an output whose location is unknown is refused
+                self.assertRaises(ValueError, rechunk, self.input_zarr,
+                                  object(), chunk=8)
+                # the input is untouched
+                np.testing.assert_array_equal(
+                    np.asarray(zarr2nii(self.input_zarr).dataobj), self.img)
+                self.assertEqual(
+                    len(zarr2nii(self.input_zarr, level=2).shape), 4)
+
+    @unittest.skipIf(pyzarr_version < 3, "sharding requires zarr-python 3")
+    def test_shard(self):
+        nii2zarr(self.ni, self.input_zarr, chunk=8, nb_levels=2,
+                 zarr_version=3)
+        cli([self.input_zarr, self.output_zarr, '--shard', '32',
+             '--shard-time', '0', '--codecs', 'zstd'])
+        omz = zarr.open(self.output_zarr, mode="r")
+        self.assertEqual(omz["0"].shards, (6, 32, 32, 32))
+        self.assertEqual(omz["0"].chunks, (1, 8, 8, 8))
+        self.assertSameContent(self.input_zarr, self.output_zarr)
+
+        # remove sharding
+        output2 = os.path.join(self.temp_dir.name, 'output2.nii.zarr')
+        rechunk(self.output_zarr, output2, shard=0)
+        self.assertIsNone(zarr.open(output2, mode="r")["0"].shards)
+        self.assertSameContent(self.input_zarr, output2)
+
+
+if __name__ == '__main__':
+    unittest.main()
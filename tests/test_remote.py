@@ -0,0 +1,153 @@
+import threading
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import configure_remote, nii2zarr, zarr2nii
+from niizarr._compat import fsspec, pyzarr_version
+from niizarr._remote import REMOTE_OPTIONS, _FS_POOL, clear_remote_pool
+
+if fsspec is not None:
+    from fsspec.asyn import AsyncFileSystem
+else:
+    AsyncFileSystem = object
+
+
+class ObjectFileSystem(AsyncFileSystem):
+    """
+    In-memory object store that counts sessions and can fail the first
+    requests with a transient error.
+    """
+    protocol = "niizarrtest"
+    objects = {}
+    sessions = 0
+
+    def __init__(self, fail=0, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+        self._session = None
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        if path.startswith("niizarrtest://"):
+            path = path[len("niizarrtest://"):]
+        return path.rstrip("/")
+
+    async def _request(self):
+        if self._session is None:
+            type(self).sessions += 1
+            self._session = True
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionResetError("transient error")
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        await self._request()
+        path = self._strip_protocol(path)
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        return self.objects[path][start:end]
+
+    async def _pipe_file(self, path, value, **kwargs):
+        await self._request()
+        self.objects[self._strip_protocol(path)] = bytes(value)
+
+    async def _exists(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        return path in self.objects or any(
+            k.startswith(path + "/") for k in self.objects)
+
+    async def _info(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        if path in self.objects:
+            return {"name": path, "size": len(self.objects[path]), "type": "file"}
+        if await self._exists(path):
+            return {"name": path, "size": 0, "type": "directory"}
+        raise FileNotFoundError(path)
+
+    async def _ls(self, path, detail=True, **kwargs):
+        path = self._strip_protocol(path)
+        names = set()
+        for key in self.objects:
+            if key.startswith(path + "/"):
+                names.add(path + "/" + key[len(path) + 1:].split("/")[0])
+        infos = [await self._info(n) for n in sorted(names)]
+        return infos if detail else [i["name"] for i in infos]
+
+    async def _rm_file(self, path, **kwargs):
+        self.objects.pop(self._strip_protocol(path), None)
+
+    async def _rm(self, path, recursive=False, **kwargs):
+        paths = path if isinstance(path, list) else [path]
+        for p in paths:
+            p = self._strip_protocol(p)
+            for key in list(self.objects):
+                if key == p or (recursive and key.startswith(p + "/")):
+                    del self.objects[key]
+
+
+@unittest.skipIf(fsspec is None, "requires fsspec")
+class TestRemote(unittest.TestCase):
+    def setUp(self):
+        fsspec.register_implementation(
+            "niizarrtest", ObjectFileSystem, clobber=True)
+        ObjectFileSystem.objects = {}
+        ObjectFileSystem.sessions = 0
+        clear_remote_pool()
+        self.options = dict(REMOTE_OPTIONS)
+        configure_remote(backoff=0)
+        img = np.random.rand(32, 32, 16).astype(np.float32)
+        self.ni = Nifti1Image(img, np.eye(4))
+        self.url = "niizarrtest://bucket/image.nii.zarr"
+
+    def tearDown(self):
+        configure_remote(**self.options)
+        clear_remote_pool()
+
+    def test_roundtrip(self):
+        zarr_versions = [2, 3] if pyzarr_version >= 3 else [2]
+        for zarr_version in zarr_versions:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.url, chunk=16,
+                         zarr_version=zarr_version)
+                np.testing.assert_array_equal(
+                    zarr2nii(self.url).get_fdata(), self.ni.get_fdata())
+
+    def test_shared_across_threads(self):
+        nii2zarr(self.ni, self.url, chunk=16)
+        threads = [threading.Thread(target=zarr2nii, args=(self.url,))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(_FS_POOL), 1)
+        self.assertEqual(ObjectFileSystem.sessions, 1)
+
+    def test_options_key(self):
+        nii2zarr(self.ni, self.url, chunk=16)
+        zarr2nii(self.url)
+        zarr2nii(self.url, fail=0)
+        self.assertEqual(len(_FS_POOL), 2)
+
+    @unittest.skipIf(pyzarr_version < 3, "requires zarr-python 3")
+    def test_retries(self):
+        nii2zarr(self.ni, self.url, chunk=16)
+        np.testing.assert_array_equal(
+            zarr2nii(self.url, fail=2).get_fdata(), self.ni.get_fdata())
+        clear_remote_pool()
+        configure_remote(retries=0)
+        with self.assertRaises(ConnectionResetError):
+            zarr2nii(self.url, fail=1)
+
+    def test_configure(self):
+        options = configure_remote(max_concurrency=4, retries=1)
+        self.assertEqual(options["max_concurrency"], 4)
+        self.assertEqual(options["retries"], 1)
+        with self.assertRaises(ValueError):
+            configure_remote(max_concurrency=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import nibabel as nib
+import numpy as np
+from scipy import ndimage
+
+from niizarr import SliceReader, nii2zarr, resample
+
+
+class TestResample(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.data = (np.random.rand(40, 36, 20) * 1000).astype(np.int16)
+        self.affine = np.array([[-0.5, 0, 0, 10],
+                                [0, 0.5, 0, -8],
+                                [0, 0, 2.0, 4],
+                                [0, 0, 0, 1]])
+        self.ni = nib.Nifti1Image(self.data, self.affine)
+        self.ni.header.set_slope_inter(2.0, -1.0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_identity(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        img = resample(self.output_zarr, self.affine, self.data.shape,
+                       level=0, block_size=16)
+        np.testing.assert_allclose(img.get_fdata(), self.data * 2.0 - 1.0)
+        np.testing.assert_allclose(img.affine, self.affine)
+
+    def test_linear(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        # rotated, shifted grid that partially covers the volume
+        theta = np.pi / 7
+        rot = np.array([[np.cos(theta), -np.sin(theta), 0, 3],
+                        [np.sin(theta), np.cos(theta), 0, -2],
+                        [0, 0, 1, 5],
+                        [0, 0, 0, 1]])
+        affine = self.affine @ rot @ np.diag([0.7, 0.7, 1.3, 1])
+        shape = (50, 45, 17)
+        img = resample(self.output_zarr, affine, shape, level=0,
+                       block_size=16)
+
+        mat = np.linalg.inv(self.affine) @ affine
+        expected = ndimage.affine_transform(
+            self.data * 2.0 - 1.0, mat, output_shape=shape, order=1,
+            mode="constant", cval=0)
+        np.testing.assert_allclose(img.get_fdata(), expected,
+                                   rtol=1e-5, atol=1e-2)
+
+    def test_nearest_labels(self):
+        labels = np.random.randint(0, 5, self.data.shape).astype(np.uint8)
+        nii2zarr(nib.Nifti1Image(labels, self.affine), self.output_zarr,
+                 chunk=16, label=True)
+        reader = SliceReader(self.output_zarr)
+        # 1 mm grid on the finest level: nearest neighbour
+        affine = self.affine @ np.diag([2, 2, 1, 1]) \
+            @ np.array([[1, 0, 0, 0.25], [0, 1, 0, 0.25],
+                        [0, 0, 1, 0], [0, 0, 0, 1]])
+        img = resample(reader, affine, (20, 18, 20), order="nearest",
+                       level=0)
+        self.assertEqual(img.get_data_dtype(), np.uint8)
+        mat = np.linalg.inv(self.affine) @ affine
+        expected = ndimage.affine_transform(
+            labels, mat, output_shape=(20, 18, 20), order=0)
+        np.testing.assert_array_equal(np.asarray(img.dataobj), expected)
+
+    def test_level(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16, nb_levels=2)
+        reader = SliceReader(self.output_zarr)
+        # the target grid has the voxel size of the second level
+        affine = reader.affine(1)
+        img = resample(reader, affine, reader.shape(1))
+        np.testing.assert_allclose(
+            img.get_fdata(),
+            reader._region(1, (0, 0, 0), reader.shape(1)) * 2.0 - 1.0)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from nibabel import Nifti1Image
+
+from niizarr import SliceReader, nii2zarr, zarr2nii
+
+
+class TestSelectLevel(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        img = np.random.rand(64, 64, 32).astype(np.float32)
+        ni = Nifti1Image(img, np.diag([0.5, 0.5, 1.0, 1.0]))
+        ni.header.set_xyzt_units("mm")
+        # levels: 0.5 x 0.5 x 1, 1 x 1 x 2, 2 x 2 x 4, 4 x 4 x 8 mm
+        nii2zarr(ni, self.output_zarr, chunk=8)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertLevel(self, level, **constraints):
+        expected = zarr2nii(self.output_zarr, level=level)
+        selected = zarr2nii(self.output_zarr, **constraints)
+        self.assertEqual(selected.shape, expected.shape)
+        np.testing.assert_allclose(selected.header.get_best_affine(),
+                                   expected.header.get_best_affine())
+        self.assertEqual(
+            SliceReader(self.output_zarr).select_level(**constraints), level)
+
+    def test_resolution(self):
+        self.assertLevel(0, resolution=0.5)
+        self.assertLevel(1, resolution=(1, 1, 2))
+        self.assertLevel(1, resolution=3)
+        self.assertLevel(3, resolution=10)
+        # no level is fine enough: finest level
+        self.assertLevel(0, resolution=0.1)
+
+    def test_size(self):
+        self.assertLevel(0, max_bytes=64 * 64 * 32 * 4)
+        self.assertLevel(1, max_bytes=64 * 64 * 32 * 4 - 1)
+        self.assertLevel(2, max_shape=16)
+        self.assertLevel(2, max_shape=(16, 20, 20))
+        # size constraints take precedence over resolution
+        self.assertLevel(2, resolution=1, max_shape=16)
+        with self.assertRaises(ValueError):
+            zarr2nii(self.output_zarr, max_shape=4)
+
+    def test_exclusive(self):
+        with self.assertRaises(ValueError):
+            zarr2nii(self.output_zarr, level=1, resolution=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
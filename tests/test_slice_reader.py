@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import nibabel as nib
+import numpy as np
+
+from niizarr import SliceReader, nii2zarr, zarr2nii
+
+from ._data import ZARR_VERSIONS
+
+
+class TestSliceReader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.data = (np.random.rand(40, 36, 20, 2) * 1000).astype(np.int16)
+        # LPS-like voxel axes: x is flipped in world space
+        affine = np.array([[-0.5, 0, 0, 10],
+                           [0, 0.5, 0, -8],
+                           [0, 0, 2.0, 4],
+                           [0, 0, 0, 1]])
+        self.ni = nib.Nifti1Image(self.data, affine)
+        self.ni.header.set_slope_inter(2.0, -1.0)
+        self.ni.header.set_xyzt_units("mm", "sec")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_planes(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=16,
+                         zarr_version=zarr_version)
+                reader = SliceReader(self.output_zarr)
+                self.assertEqual(reader.shape(), (40, 36, 20))
+                np.testing.assert_array_equal(
+                    reader.plane(7, "z", t=1, scaled=False),
+                    self.data[:, :, 7, 1])
+                np.testing.assert_array_equal(
+                    reader.plane(5, "y", scaled=False),
+                    self.data[:, 5, :, 0])
+                np.testing.assert_array_equal(
+                    reader.plane(39, 0, scaled=False),
+                    self.data[39, :, :, 0])
+                np.testing.assert_array_equal(
+                    reader.plane(3, "axial"),
+                    self.data[:, :, 3, 0] * 2.0 - 1.0)
+
+    def test_world(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        reader = SliceReader(self.output_zarr)
+        # world z = 2 * k + 4
+        np.testing.assert_array_equal(
+            reader.plane(16.0, "axial", space="world", scaled=False),
+            self.data[:, :, 6, 0])
+        # world x = -0.5 * i + 10
+        np.testing.assert_array_equal(
+            reader.plane(5.0, "sagittal", space="world", scaled=False),
+            self.data[10, :, :, 0])
+        with self.assertRaises(IndexError):
+            reader.plane(100.0, "axial", space="world")
+
+    def test_levels(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=8)
+        reader = SliceReader(self.output_zarr)
+        self.assertGreater(reader.nb_levels, 1)
+        ni1 = zarr2nii(self.output_zarr, level=1)
+        data1 = np.asarray(ni1.dataobj)
+        self.assertEqual(reader.shape(1), data1.shape[:3])
+        np.testing.assert_array_equal(
+            reader.plane(2, "x", level=1, t=1, scaled=False),
+            data1[2, :, :, 1])
+        np.testing.assert_allclose(reader.affine(1),
+                                   ni1.header.get_best_affine())
+
+    def test_chunk_cache(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        reader = SliceReader(self.output_zarr)
+        fetched = []
+        get_chunks = reader._get_chunks
+
+        def count(level, coords):
+            fetched.extend(c for c in coords
+                           if (level, c) not in reader._chunks)
+            return get_chunks(level, coords)
+
+        reader._get_chunks = count
+        for k in range(16):
+            reader.plane(k, "z")
+        # a single row of chunks along z: 3 x 3 chunks
+        self.assertEqual(len(fetched), 9)
+
+    def test_concurrent_fetch(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        reader = SliceReader(self.output_zarr, max_workers=1)
+        arr = reader._array(0)
+        barrier = threading.Barrier(2)
+
+        class SlowArray:
+            # both threads miss the cache before either inserts the chunk
+            chunks, shape = arr.chunks, arr.shape
+
+            def __getitem__(self, index):
+                barrier.wait(timeout=10)
+                return arr[index]
+
+        reader._arrays[0] = SlowArray()
+        coord = (0,) * arr.ndim
+        threads = [threading.Thread(target=reader._get_chunks,
+                                    args=(0, [coord])) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(reader._chunks), 1)
+        self.assertEqual(reader._nbytes,
+                         sum(v.nbytes for v in reader._chunks.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+import nibabel as nib
+import numpy as np
+import zarr
+
+from niizarr import (
+    append, build_pyramid, nii2zarr, read_stats, rechunk, update_region,
+)
+
+from ._data import ZARR_VERSIONS
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_zarr = os.path.join(self.temp_dir.name, 'output.nii.zarr')
+        self.data = (np.random.rand(40, 36, 20, 3) * 1000).astype(np.int16)
+        self.ni = nib.Nifti1Image(self.data, np.eye(4))
+        self.ni.header.set_slope_inter(0.5, 10.0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_global(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                nii2zarr(self.ni, self.output_zarr, chunk=16, stats=True,
+                         zarr_version=zarr_version)
+                stats = read_stats(self.output_zarr)
+                scaled = self.data * 0.5 + 10.0
+                self.assertAlmostEqual(stats["min"], scaled.min())
+                self.assertAlmostEqual(stats["max"], scaled.max())
+                self.assertAlmostEqual(stats["mean"], scaled.mean())
+                self.assertEqual(stats["count"], self.data.size)
+                self.assertEqual(sum(stats["histogram"]), self.data.size)
+                self.assertEqual(len(stats["bins"]),
+                                 len(stats["histogram"]) + 1)
+                # coarse levels have statistics too
+                coarse = read_stats(self.output_zarr, level=-1)
+                self.assertLessEqual(coarse["max"], stats["max"])
+                # the JSON header gets the intensity range
+                nifti = zarr.open_group(self.output_zarr, mode="r")["nifti"]
+                self.assertAlmostEqual(nifti.attrs["MinIntensity"],
+                                       scaled.min())
+                self.assertAlmostEqual(nifti.attrs["MaxIntensity"],
+                                       scaled.max())
+
+    def test_region(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16, stats=True)
+        # whole chunks: x in [16, 32), y in [0, 16), first timepoint
+        stats = read_stats(self.output_zarr,
+                           region=(slice(20, 30), slice(0, 16), slice(None),
+                                   slice(0, 1)))
+        block = self.data[16:32, 0:16, :, 0] * 0.5 + 10.0
+        self.assertAlmostEqual(stats["min"], block.min())
+        self.assertAlmostEqual(stats["max"], block.max())
+        self.assertAlmostEqual(stats["mean"], block.mean())
+        self.assertEqual(stats["count"], block.size)
+
+    def test_labels(self):
+        labels = np.random.randint(0, 4, (32, 32, 32)).astype(np.uint8)
+        nii2zarr(nib.Nifti1Image(labels, np.eye(4)), self.output_zarr,
+                 chunk=16, stats=True, label=True)
+        stats = read_stats(self.output_zarr)
+        # one bin per label
+        self.assertEqual(stats["bins"], [-0.5, 0.5, 1.5, 2.5, 3.5])
+        self.assertEqual(stats["histogram"],
+                         np.bincount(labels.ravel()).tolist())
+
+    def test_no_stats(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16)
+        with self.assertRaises(ValueError):
+            read_stats(self.output_zarr)
+
+    def test_updates(self):
+        nii2zarr(self.ni, self.output_zarr, chunk=16, stats=True)
+        # append: the new timepoints are included
+        new = (np.random.rand(40, 36, 20, 1) * 1000).astype(np.int16)
+        new[0, 0, 0, 0] = 2000
+        append(new, self.output_zarr)
+        stats = read_stats(self.output_zarr)
+        self.assertEqual(stats["count"], self.data.size + new.size)
+        self.assertAlmostEqual(stats["max"], 2000 * 0.5 + 10.0)
+
+        # update_region: only the chunks involved are recomputed
+        update_region(self.output_zarr, (slice(0, 4), slice(0, 4),
+                                         slice(0, 4), slice(0, 1)),
+                      np.full((4, 4, 4, 1), -100, dtype=np.int16))
+        stats = read_stats(self.output_zarr)
+        self.assertAlmostEqual(stats["min"], -100 * 0.5 + 10.0)
+        self.assertAlmostEqual(stats["max"], 2000 * 0.5 + 10.0)
+
+        # build_pyramid: statistics of the new levels
+        shapes = build_pyramid(self.output_zarr, nb_levels=2)
+        group = zarr.open_group(self.output_zarr, mode="r")
+        self.assertEqual(
+            len(group.attrs["niizarr"]["stats"]["levels"]), len(shapes))
+        self.assertEqual(sorted(group["stats"].array_keys()),
+                         [str(i) for i in range(len(shapes))])
+
+        # rechunk: statistics are carried over
+        rechunked = os.path.join(self.temp_dir.name, 'rechunked.nii.zarr')
+        rechunk(self.output_zarr, rechunked, chunk=32)
+        self.assertEqual(
+            read_stats(rechunked, region=(slice(0, 4),)),
+            read_stats(self.output_zarr, region=(slice(0, 4),)))
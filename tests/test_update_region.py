@@ -0,0 +1,155 @@
+import itertools
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import zarr
+from nibabel import Nifti1Image
+from skimage.transform import pyramid_gaussian
+
+from niizarr import nii2zarr, update_region
+
+from ._data import ZARR_VERSIONS
+
+
+def label_pyramid(img, nb_levels):
+    """Reference label pyramid: argmax of one gaussian pyramid per label."""
+    labels = np.unique(img)
+    levels = [np.zeros_like(img)]
+    maxprob = [np.zeros(img.shape)]
+    for label in labels:
+        probs = pyramid_gaussian(img == label, nb_levels - 1, 2,
+                                 preserve_range=True, channel_axis=None)
+        for i, prob in enumerate(probs):
+            if i == len(levels):
+                levels.append(np.zeros(prob.shape, dtype=img.dtype))
+                maxprob.append(prob)
+                continue
+            mask = prob > maxprob[i]
+            levels[i][mask] = label
+            maxprob[i][mask] = prob[mask]
+    return levels
+
+
+class TestUpdateRegion(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.full_zarr = os.path.join(self.temp_dir.name, 'full.nii.zarr')
+        self.update_zarr = os.path.join(self.temp_dir.name, 'update.nii.zarr')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, img, path, **kwargs):
+        nii2zarr(Nifti1Image(img, np.eye(4)), path, chunk=8, nb_levels=4,
+                 **kwargs)
+
+    def test_float(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                img = np.random.rand(40, 33, 20).astype(np.float32)
+                new = np.random.rand(5, 7, 3).astype(np.float32)
+                edited = img.copy()
+                edited[10:15, 20:27, 0:3] = new
+                self.convert(img, self.update_zarr,
+                             zarr_version=zarr_version)
+                self.convert(edited, self.full_zarr,
+                             zarr_version=zarr_version)
+                update_region(self.update_zarr,
+                              [(10, 15), (20, 27), (0, 3)], new)
+
+                full = zarr.open(self.full_zarr, mode="r")
+                updated = zarr.open(self.update_zarr, mode="r")
+                for level in range(4):
+                    np.testing.assert_allclose(updated[str(level)][:],
+                                               full[str(level)][:],
+                                               rtol=1e-5, atol=1e-6)
+
+    def test_4d(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                img = np.random.rand(16, 16, 16, 3).astype(np.float32)
+                new = np.random.rand(4, 4, 4, 3).astype(np.float32)
+                edited = img.copy()
+                edited[-4:, :4, 6:10] = new
+                self.convert(img, self.update_zarr,
+                             zarr_version=zarr_version)
+                self.convert(edited, self.full_zarr,
+                             zarr_version=zarr_version)
+                update_region(self.update_zarr,
+                              (slice(12, 16), slice(0, 4), slice(6, 10)),
+                              new)
+
+                full = zarr.open(self.full_zarr, mode="r")
+                updated = zarr.open(self.update_zarr, mode="r")
+                for level in range(4):
+                    np.testing.assert_allclose(updated[str(level)][:],
+                                               full[str(level)][:],
+                                               rtol=1e-5, atol=1e-6)
+
+    def test_label(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                img = np.random.randint(0, 5, (24, 24, 24)) \
+                    .astype(np.int16)
+                new = np.full((6, 6, 6), 7, dtype=np.int16)
+                edited = img.copy()
+                edited[3:9, 3:9, 3:9] = new
+                self.convert(img, self.update_zarr, label=True,
+                             zarr_version=zarr_version)
+                self.convert(edited, self.full_zarr, label=True,
+                             zarr_version=zarr_version)
+                updated_regions = update_region(
+                    self.update_zarr, [(3, 9), (3, 9), (3, 9)], new)
+                self.assertEqual(len(updated_regions), 4)
+
+                full = zarr.open(self.full_zarr, mode="r")
+                updated = zarr.open(self.update_zarr, mode="r")
+                for level in range(4):
+                    np.testing.assert_array_equal(updated[str(level)][:],
+                                                  full[str(level)][:])
+
+    def test_label_ties(self):
+        # in these patterns, many voxels of coarse levels have labels
+        # with the same probability
+        x, y, z = np.meshgrid(*map(np.arange, (32, 28, 24)), indexing="ij")
+        patterns = {
+            "checker": (x + y + z) % 2,
+            "blocks": (x // 2 + y // 2 + z // 2) % 3,
+        }
+        for zarr_version, name in itertools.product(ZARR_VERSIONS, patterns):
+            with self.subTest(zarr_version=zarr_version, pattern=name):
+                img = patterns[name].astype(np.int16)
+                new = img[4:11, 10:15, 3:12][::-1].copy()
+                edited = img.copy()
+                edited[4:11, 10:15, 3:12] = new
+                self.convert(img, self.update_zarr, label=True,
+                             zarr_version=zarr_version)
+                self.convert(edited, self.full_zarr, label=True,
+                             zarr_version=zarr_version)
+                update_region(self.update_zarr,
+                              [(4, 11), (10, 15), (3, 12)], new)
+
+                full = zarr.open(self.full_zarr, mode="r")
+                updated = zarr.open(self.update_zarr, mode="r")
+                reference = label_pyramid(edited.T, 4)
+                for level in range(4):
+                    np.testing.assert_array_equal(full[str(level)][:],
+                                                  reference[level])
+                    np.testing.assert_array_equal(updated[str(level)][:],
+                                                  full[str(level)][:])
+
+    def test_laplacian(self):
+        for zarr_version in ZARR_VERSIONS:
+            with self.subTest(zarr_version=zarr_version):
+                img = np.random.rand(16, 16, 16).astype(np.float32)
+                self.convert(img, self.update_zarr, method="laplacian",
+                             zarr_version=zarr_version)
+                self.assertRaises(ValueError, update_region,
+                                  self.update_zarr, [(0, 2), (0, 2), (0, 2)],
+                                  img[:2, :2, :2])
+
+
+if __name__ == '__main__':
+    unittest.main()
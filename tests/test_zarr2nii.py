@@ -1,11 +1,14 @@
+import gzip
 import os.path as op
 import tempfile
+import time
 import unittest
 
 import nibabel as nib
 import numpy as np
 
-from niizarr import zarr2nii
+from niizarr import iter_slabs, nii2zarr, zarr2nii
+from niizarr._prefetch import _read_ahead
 
 HERE = op.dirname(op.abspath(__file__))
 DATA = op.join(HERE, "data")
@@ -41,3 +44,59 @@ class Testzarr2nii(unittest.TestCase):
         self.assertEqual(str(loaded.header.extensions),
                          str(converted.header.extensions))
         np.testing.assert_array_almost_equal(loaded.get_fdata(), converted.get_fdata())
+
+    def test_stream_same_file(self):
+        for name in ("example4d", "example_nifti2"):
+            zarr_file = op.join(DATA, name + ".nii.zarr")
+            for ext in (".nii", ".nii.gz"):
+                for prefetch in (0, 2):
+                    with self.subTest(name=name, ext=ext, prefetch=prefetch):
+                        ref = op.join(self.temp_dir.name, "ref" + ext)
+                        out = op.join(self.temp_dir.name, "out" + ext)
+                        nib.save(zarr2nii(zarr_file), ref)
+                        zarr2nii(zarr_file, out, prefetch=prefetch)
+                        read = gzip.open if ext == ".nii.gz" else open
+                        with read(ref, "rb") as f1, read(out, "rb") as f2:
+                            self.assertEqual(f1.read(), f2.read())
+
+    def test_iter_slabs(self):
+        data = np.random.rand(16, 12, 20, 3).astype(np.float32)
+        zarr_file = op.join(self.temp_dir.name, "slabs.nii.zarr")
+        nii2zarr(nib.Nifti1Image(data, np.eye(4)), zarr_file, chunk=8)
+
+        order = []
+        for index, slab in iter_slabs(zarr_file, prefetch=3):
+            np.testing.assert_array_equal(slab, data[index])
+            order.append((index[3], index[2].start))
+        # z rows of chunks, then time points, in file order
+        self.assertEqual(order, [(t, z) for t in range(3) for z in (0, 8, 16)])
+
+        # a memory cap smaller than a slab still reads one slab at a time
+        slabs = list(iter_slabs(zarr_file, prefetch=3, max_mem=1))
+        self.assertEqual(len(slabs), 9)
+
+    def test_read_ahead_stop(self):
+        # closing the reader early cancels the reads not yet started
+        started = []
+
+        def fetch(i):
+            started.append(i)
+            time.sleep(0.01)
+            return i
+
+        reader = _read_ahead(fetch, range(100), depth=2)
+        self.assertEqual(next(reader), 0)
+        reader.close()
+        self.assertLessEqual(len(started), 4)
+
+    def test_single_layer_graph(self):
+        data = np.random.rand(16, 12, 20, 3).astype(np.float32)
+        zarr_file = op.join(self.temp_dir.name, "graph.nii.zarr")
+        nii2zarr(nib.Nifti1Image(data, np.eye(4)), zarr_file, chunk=8)
+
+        array = zarr2nii(zarr_file).dataobj
+        self.assertEqual(len(array.__dask_graph__().layers), 1)
+        self.assertEqual(array.chunksize, (8, 8, 8, 1))
+        self.assertEqual(array.npartitions, 2 * 2 * 3 * 3)
+        np.testing.assert_array_equal(array[2:14, 5, :, 1].compute(),
+                                      data[2:14, 5, :, 1])